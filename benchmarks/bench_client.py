@@ -0,0 +1,92 @@
+"""
+End-to-end throughput of the sync and async clients, and of a fleet of census maximizers,
+against a local `nstools.mockserver.MockNationStates` replaying the fixtures.
+
+    python benchmarks/bench_client.py [--requests 500] [--nations 20] [--latency 0.05] [--policy "1000;w=1"]
+
+The server enforces `--policy` and adds `--latency` to every response, so this shows how close the clients get to
+the rate limit, and how much they lose to 429s (see --error-rate) and latency.
+"""
+from nstools.mockserver import MockNationStates
+from nstools.nsapi import NationStatesAPI
+from nstools.ratelimit import LocalRateLimiter, parse_policy
+from nstools.async_nsapi import AsyncNationStatesAPI
+from nstools.nation import Nation
+from nstools.fleet import FleetMaximizer
+from nstools.census_maximizer import NormalizedScorer
+from concurrent.futures import ThreadPoolExecutor
+from run import fixtures, fixture_predictor
+import argparse
+import asyncio
+import time
+
+
+def fixture_responses() -> dict:
+    return {
+        "nation": (fixtures / "nation.xml").read_bytes(),
+        "region?q=nations": (fixtures / "region_nations.xml").read_bytes(),
+        "c=issue": (fixtures / "issue_answer.xml").read_bytes(),
+    }
+
+
+def limiter(server) -> LocalRateLimiter:
+    # the clients assume the policy of the real API until the first response, so start them on the server's
+    return LocalRateLimiter(*parse_policy(server.policy))
+
+
+def sync_client(server, requests: int, threads: int):
+    api = NationStatesAPI("nstools benchmarks", limiter=limiter(server), base_url=server.url)
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        list(executor.map(lambda i: api.nation(f"nation_{i}").shard("policies"), range(requests)))
+
+
+def async_client(server, requests: int, connections: int):
+    async def run():
+        async with AsyncNationStatesAPI(
+            "nstools benchmarks", max_connections=connections, limiter=limiter(server), base_url=server.url,
+        ) as api:
+            await asyncio.gather(*[api.nation(f"nation_{i}").shard("policies") for i in range(requests)])
+    asyncio.run(run())
+
+
+def fleet(server, nations: int, threads: int) -> int:
+    """ Answer the issues of a fleet of nations, returning the number of answered issues """
+    api = NationStatesAPI("nstools benchmarks", limiter=limiter(server), base_url=server.url)
+    fleet_nations = [Nation(api.nation(f"nation_{i}", password="benchmark"), load=False) for i in range(nations)]
+    # the answers patch the nations, so each one answers the issues of the fixture once
+    maximizer = FleetMaximizer(fleet_nations, fixture_predictor(), NormalizedScorer(), max_workers=threads, update_every=100)
+    return sum(1 for _ in maximizer.run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure client throughput against a local mock server")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--nations", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--policy", default="1000;w=1", help="rate limit enforced by the server")
+    parser.add_argument("--error-rate", type=float, default=0, help="probability of a 429 response")
+    args = parser.parse_args()
+
+    with MockNationStates(
+        responses=fixture_responses(), policy=args.policy, latency=args.latency, error_rates={429: args.error_rate},
+    ) as server:
+        for name, run in (
+            ("sync client", lambda: sync_client(server, args.requests, args.threads)),
+            ("async client", lambda: async_client(server, args.requests, args.threads)),
+            ("fleet maximizer", lambda: fleet(server, args.nations, args.threads)),
+        ):
+            server.reset()
+            start = time.perf_counter()
+            issues = run()
+            seconds = time.perf_counter() - start
+
+            requests = sum(server.stats.values())
+            line = f"{name:<16} {requests:>6} requests in {seconds:6.2f} s  {requests / seconds:8.1f} req/s"
+            if issues is not None:
+                line += f"  {issues / seconds * 60:8.1f} issues/min"
+            print(f"{line}  {server.stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Import-time benchmark: measures how long fresh interpreters take to import parts of nstools.
+
+    python benchmarks/bench_import.py [--max-ms 50]
+
+With --max-ms, exits with an error if importing the package itself is slower than that (median),
+so it can be used to catch import-time regressions.
+"""
+import subprocess
+import statistics
+import argparse
+import time
+import sys
+
+
+targets = {
+    "python": "pass",
+    "nstools": "import nstools",
+    "nstools.utils (census tables)": "import nstools.utils as u; u.census_names",
+    "nstools.utils (entity table)": "import nstools.utils as u; u.unescape('&eacute;')",
+    "nstools.nation": "import nstools.nation",
+    "nstools.census_maximizer": "import nstools.census_maximizer",
+}
+
+
+def measure(statement: str, repeat: int) -> float:
+    """ Median wall time (in ms) of starting an interpreter and running `statement` """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-c", statement], check=True)
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure the import time of nstools")
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--max-ms", type=float, help="maximal import time of the package, on top of interpreter startup")
+    args = parser.parse_args()
+
+    results = {name: measure(statement, args.repeat) for name, statement in targets.items()}
+    baseline = results["python"]
+    for name, ms in results.items():
+        print(f"{name:<32} {ms:8.1f} ms  (+{ms - baseline:.1f} ms)")
+
+    if args.max_ms is not None and results["nstools"] - baseline > args.max_ms:
+        sys.exit(f"Importing nstools took {results['nstools'] - baseline:.1f} ms, more than {args.max_ms} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""
+Micro-benchmark of `utils.unescape` on the (synthetic) API responses of the fixtures.
+
+Compares the current implementation (on str and on bytes) with the original regex-based one,
+and checks that their output is identical.
+
+    python benchmarks/bench_unescape.py
+"""
+from nstools.utils import unescape, entities_to_escape
+import pathlib
+import timeit
+import re
+
+
+fixtures = pathlib.Path(__file__).parent / "fixtures"
+
+
+def regex_unescape(text):
+    """ The original implementation of utils.unescape """
+    return re.sub(r"&\w+;", lambda m: entities_to_escape.get(m.group(0), m.group(0)), text)
+
+
+def throughput(function, text, number):
+    seconds = min(timeit.repeat(lambda: function(text), number=number, repeat=5)) / number
+    return len(text) / seconds / 2**20 # MB/s
+
+
+def main():
+    print(f"{'fixture':<24} {'regex':>12} {'str':>12} {'bytes':>12}")
+    for path in sorted(fixtures.glob("*.xml")):
+        text = path.read_text(encoding="utf-8")
+        data = text.encode("utf-8")
+
+        assert unescape(text) == regex_unescape(text)
+        assert unescape(data) == regex_unescape(text).encode("utf-8")
+
+        # also measure the same response without any entities, which takes the fast path
+        plain = regex_unescape(text).replace("&", "")
+
+        number = max(1, 2_000_000 // len(text))
+        for name, sample in ((path.name, text), (f"{path.stem} (no &)", plain)):
+            results = [
+                throughput(regex_unescape, sample, number),
+                throughput(unescape, sample, number),
+                throughput(unescape, sample.encode("utf-8"), number),
+            ]
+            print(f"{name:<24} " + " ".join(f"{r:>7.1f} MB/s" for r in results))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Offline benchmark suite for the hot paths of nstools: parsing responses, predicting and scoring issue outcomes,
+and a full `CensusMaximizer` cycle. Everything runs on the (synthetic, see `fixtures/README.md`) responses and
+Trotterdam pages in `fixtures/`, against a client whose session replays them, so no requests are sent.
+
+    python benchmarks/run.py [--filter maximizer] [--repeat 7] [--output results.json]
+    python benchmarks/run.py --baseline results.json [--tolerance 0.2]
+
+Results are printed as a table and, with --output, written as JSON. With --baseline, each benchmark is compared
+with the results of an earlier run, and the script exits with an error if any is slower by more than the tolerance
+(a fraction of the baseline median), so it can be used to catch performance regressions.
+"""
+from nstools.utils import unescape
+from nstools.parser import parse_response
+from nstools.ratelimit import LocalRateLimiter
+from nstools.nsapi import NationStatesAPI
+from nstools.nation import Nation
+from nstools.trotterdam import TrotterdamIssue, parse_result
+from nstools.census_maximizer import CensusMaximizer, TrotterdamPredictor, NormalizedScorer
+import lxml.html as lh
+import xmltodict
+import statistics
+import argparse
+import platform
+import pathlib
+import timeit
+import json
+import time
+import sys
+
+
+fixtures = pathlib.Path(__file__).parent / "fixtures"
+
+
+class FixtureResponse:
+    def __init__(self, content: bytes, status_code: int = 200):
+        self.content = content
+        self.status_code = status_code
+        # an unlimited budget, as the limiter is reconciled with these headers
+        self.headers = {"Ratelimit-Policy": "1000000000;w=30", "Ratelimit-Reset": "30", "RateLimit-Remaining": "1000000000"}
+
+
+class FixtureSession:
+    """ Stands in for the `requests.Session` of a client, answering from the fixtures """
+    def __init__(self):
+        self.headers = {}
+        self.nation = (fixtures / "nation.xml").read_bytes()
+        self.issue_answer = (fixtures / "issue_answer.xml").read_bytes()
+
+    def get(self, url, headers=None):
+        return FixtureResponse(self.issue_answer if "c=issue" in url else self.nation)
+
+
+def fixture_api() -> NationStatesAPI:
+    # the limiter never runs out, so only the work of the client itself is measured
+    api = NationStatesAPI("nstools benchmarks", limiter=LocalRateLimiter(1_000_000_000, 30))
+    api.client.session = FixtureSession()
+    return api
+
+
+def trotterdam_pages() -> dict:
+    return {
+        int(path.stem.split("_")[1]): path.read_bytes()
+        for path in sorted(fixtures.glob("trotterdam_*.html"))
+    }
+
+
+def fixture_predictor() -> TrotterdamPredictor:
+    predictor = TrotterdamPredictor()
+    for issue_id, page in trotterdam_pages().items():
+        predictor.issue_memo[issue_id] = TrotterdamIssue(issue_id, page)
+    return predictor
+
+
+def fixture_nation() -> Nation:
+    return Nation(fixture_api().nation("testlandia", password="benchmark"))
+
+
+# Each benchmark is a function preparing its inputs, returning the callable to time.
+
+def bench_unescape():
+    data = (fixtures / "nation.xml").read_bytes()
+    return lambda: unescape(data)
+
+
+def bench_xmltodict():
+    data = unescape((fixtures / "nation.xml").read_bytes())
+    return lambda: xmltodict.parse(data, dict_constructor=dict)
+
+
+def bench_parse_response():
+    data = unescape((fixtures / "nation.xml").read_bytes())
+    return lambda: parse_response(data)
+
+
+def bench_nation_update():
+    nation = fixture_nation()
+    return nation.update
+
+
+def bench_trotterdam_page():
+    pages = trotterdam_pages()
+    return lambda: [TrotterdamIssue(issue_id, page) for issue_id, page in pages.items()]
+
+
+def bench_parse_result():
+    results = [
+        row[1].text_content().strip()
+        for page in trotterdam_pages().values()
+        for row in lh.fromstring(page).xpath('//tr')[1:]
+    ]
+    return lambda: [parse_result(result) for result in results]
+
+
+def bench_predictor():
+    nation = fixture_nation()
+    predictor = fixture_predictor()
+    state = nation.snapshot()
+    return lambda: [predictor(state, issue, option_id) for issue in nation.issues for option_id in issue.options]
+
+
+def bench_predict_options():
+    nation = fixture_nation()
+    predictor = fixture_predictor()
+    state = nation.snapshot()
+    return lambda: [predictor.predict_options(state, issue, list(issue.options)) for issue in nation.issues]
+
+
+def bench_score_prediction():
+    nation = fixture_nation()
+    predictor = fixture_predictor()
+    scorer = NormalizedScorer(policy_weights={"Welfare": 1, "Autocracy": -1})
+    state = nation.snapshot()
+    predictions = [predictor(state, issue, option_id) for issue in nation.issues for option_id in issue.options]
+    return lambda: [scorer.score_prediction(state, prediction) for prediction in predictions]
+
+
+def bench_maximizer_run():
+    nation = fixture_nation()
+    predictor = fixture_predictor()
+    scorer = NormalizedScorer()
+
+    def cycle():
+        # answers all issues of the fixture, patching the nation from the answers instead of updating it
+        nation.update()
+        for _ in CensusMaximizer(nation, predictor, scorer, update_every=len(nation.issues) + 1).run():
+            pass
+    return cycle
+
+
+benchmarks = {
+    "unescape": bench_unescape,
+    "xmltodict": bench_xmltodict,
+    "parse_response": bench_parse_response,
+    "nation_update": bench_nation_update,
+    "trotterdam_page": bench_trotterdam_page,
+    "parse_result": bench_parse_result,
+    "predictor": bench_predictor,
+    "predict_options": bench_predict_options,
+    "score_prediction": bench_score_prediction,
+    "maximizer_run": bench_maximizer_run,
+}
+
+
+def measure(function, repeat: int, min_time: float = 0.2) -> dict:
+    """ Time `function`, with enough calls per repetition to take about `min_time` seconds """
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    times = [t / number * 1e6 for t in timer.repeat(repeat=repeat, number=number)]
+    return {'median_us': statistics.median(times), 'min_us': min(times), 'number': number, 'repeat': repeat}
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> list:
+    """ The names of the benchmarks that are slower than the baseline by more than the tolerance """
+    regressions = []
+    print(f"\n{'benchmark':<20} {'baseline':>12} {'now':>12} {'change':>8}")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        before, now = baseline[name]['median_us'], result['median_us']
+        change = now / before - 1
+        flag = " ⚠️" if change > tolerance else ""
+        print(f"{name:<20} {before:>9.1f} µs {now:>9.1f} µs {change:>+7.1%}{flag}")
+        if change > tolerance:
+            regressions.append(name)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the hot paths of nstools on the fixtures")
+    parser.add_argument("--filter", help="only run benchmarks whose name contains this")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per repetition")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with the results in this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed slowdown relative to the baseline")
+    args = parser.parse_args()
+
+    results = {}
+    print(f"{'benchmark':<20} {'median':>12} {'min':>12}")
+    for name, setup in benchmarks.items():
+        if args.filter and args.filter not in name:
+            continue
+        results[name] = measure(setup(), args.repeat, args.min_time)
+        print(f"{name:<20} {results[name]['median_us']:>9.1f} µs {results[name]['min_us']:>9.1f} µs")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'time': time.time(),
+                'results': results,
+            }, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)['results']
+        if regressions := compare(results, baseline, args.tolerance):
+            sys.exit(f"Slower than the baseline: {', '.join(regressions)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -27,3 +27,6 @@ for issue, choice, initial_dict, new_dict, predicted_scores in maximizer.run():
     else:
         print(f"\tchose {choice}, score changed by {score:.3e}")
         print(f"\tprediction was: {predicted_scores[choice]:.3e}")
+
+summary = maximizer.summary()
+print(f"answered {summary['issues']} issues ({summary['issues_per_minute']:.1f} per minute)")
@@ -1,5 +1,36 @@
-from . import nsapi
-from . import utils
-from . import nation
-from . import trotterdam
-from . import census_maximizer
\ No newline at end of file
+import importlib
+
+# submodules are imported on first access (e.g. `nstools.nation`), so importing the package itself is cheap
+_submodules = (
+    "nsapi",
+    "utils",
+    "nation",
+    "trotterdam",
+    "census_maximizer",
+    "fleet",
+    "parser",
+    "trotterdam_index",
+    "dump",
+    "async_nsapi",
+    "sse",
+    "ratelimit",
+    "coalesce",
+    "cache",
+    "nation_table",
+    "bulk",
+    "outcome_log",
+    "lookahead",
+    "mockserver",
+    "metrics",
+    "scheduler",
+)
+
+
+def __getattr__(name):
+    if name in _submodules:
+        return importlib.import_module(f".{name}", __name__)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_submodules))
@@ -0,0 +1,185 @@
+# Generated by scripts/compile_data.py from the YAML files in nstools/data, do not edit.
+
+census_id_to_name = {
+    0: 'Civil Rights',
+    1: 'Economy',
+    2: 'Political Freedom',
+    3: 'Population',
+    4: 'Wealth Gaps',
+    5: 'Death Rate',
+    6: 'Compassion',
+    7: 'Eco-Friendliness',
+    8: 'Social Conservatism',
+    9: 'Nudity',
+    10: 'Industry: Automobile Manufacturing',
+    11: 'Industry: Cheese Exports',
+    12: 'Industry: Basket Weaving',
+    13: 'Industry: Information Technology',
+    14: 'Industry: Pizza Delivery',
+    15: 'Industry: Trout Fishing',
+    16: 'Industry: Arms Manufacturing',
+    17: 'Sector: Agriculture',
+    18: 'Industry: Beverage Sales',
+    19: 'Industry: Timber Woodchipping',
+    20: 'Industry: Mining',
+    21: 'Industry: Insurance',
+    22: 'Industry: Furniture Restoration',
+    23: 'Industry: Retail',
+    24: 'Industry: Book Publishing',
+    25: 'Industry: Gambling',
+    26: 'Sector: Manufacturing',
+    27: 'Government Size',
+    28: 'Welfare',
+    29: 'Public Healthcare',
+    30: 'Law Enforcement',
+    31: 'Business Subsidization',
+    32: 'Religiousness',
+    33: 'Income Equality',
+    34: 'Niceness',
+    35: 'Rudeness',
+    36: 'Intelligence',
+    37: 'Ignorance',
+    38: 'Political Apathy',
+    39: 'Health',
+    40: 'Cheerfulness',
+    41: 'Weather',
+    42: 'Compliance',
+    43: 'Safety',
+    44: 'Lifespan',
+    45: 'Ideological Radicality',
+    46: 'Defense Forces',
+    47: 'Pacifism',
+    48: 'Economic Freedom',
+    49: 'Taxation',
+    50: 'Freedom From Taxation',
+    51: 'Corruption',
+    52: 'Integrity',
+    53: 'Authoritarianism',
+    54: 'Youth Rebelliousness',
+    55: 'Culture',
+    56: 'Employment',
+    57: 'Public Transport',
+    58: 'Tourism',
+    59: 'Weaponization',
+    60: 'Recreational Drug Use',
+    61: 'Obesity',
+    62: 'Secularism',
+    63: 'Environmental Beauty',
+    64: 'Charmlessness',
+    65: 'Influence',
+    66: 'World Assembly Endorsements',
+    67: 'Averageness',
+    68: 'Human Development Index',
+    69: 'Primitiveness',
+    70: 'Scientific Advancement',
+    71: 'Inclusiveness',
+    72: 'Average Income',
+    73: 'Average Income of Poor',
+    74: 'Average Income of Rich',
+    75: 'Public Education',
+    76: 'Economic Output',
+    77: 'Crime',
+    78: 'Foreign Aid',
+    79: 'Black Market',
+    80: 'Residency',
+    81: 'Survivors',
+    82: 'Zombies',
+    83: 'Dead',
+    84: 'Percentage Zombies',
+    85: 'Average Disposable Income',
+    86: 'International Artwork',
+    87: 'Patriotism',
+    88: 'Food Quality',
+}
+
+census_distribution = {
+    'Civil Rights': [50.44844308633456, 24.510206472209557],
+    'Economy': [66.89578000404656, 25.568331816232543],
+    'Political Freedom': [52.70097438766036, 26.11676548023715],
+    'Population': [5581891435.966857, 7076189241.306377],
+    'Wealth Gaps': [16.387701167551352, 51.200177469766416],
+    'Death Rate': [45.578268221418206, 49.76243682069942],
+    'Compassion': [40.6090309978339, 15.803272224578931],
+    'Eco-Friendliness': [1094.8921911421214, 2208.5552742894893],
+    'Social Conservatism': [52.69574905977005, 23.69285854244462],
+    'Nudity': [171.63057963985622, 220.58333474443296],
+    'Industry: Automobile Manufacturing': [1924.841754248156, 2679.024228476188],
+    'Industry: Cheese Exports': [2014.1226388921943, 2147.416657709095],
+    'Industry: Basket Weaving': [2254.1232509141973, 2425.943445301411],
+    'Industry: Information Technology': [5966.762970561281, 10820.177565441518],
+    'Industry: Pizza Delivery': [1453.6184153852566, 2077.180625983338],
+    'Industry: Trout Fishing': [2057.4779511913544, 2816.2233599294727],
+    'Industry: Arms Manufacturing': [6733.276798189759, 12005.346587939031],
+    'Sector: Agriculture': [2476.1648712242036, 3178.7636552056],
+    'Industry: Beverage Sales': [1649.8431945799907, 2774.4271107678414],
+    'Industry: Timber Woodchipping': [2759.2259396348572, 3355.3670324855493],
+    'Industry: Mining': [3119.8663042715, 4272.738579236434],
+    'Industry: Insurance': [1649.3886483559315, 2163.13367372042],
+    'Industry: Furniture Restoration': [2247.392700282963, 2631.7336132106134],
+    'Industry: Retail': [2763.1945164793647, 5609.499630359592],
+    'Industry: Book Publishing': [2955.263774498865, 4822.91783973675],
+    'Industry: Gambling': [2001.9367233879216, 3332.4598961467404],
+    'Sector: Manufacturing': [10918.465285613123, 13679.662576307768],
+    'Government Size': [14.8761804348861, 9.246586143933497],
+    'Welfare': [1361.679889046916, 1630.8060521986674],
+    'Public Healthcare': [1909.516603062293, 2211.8893717450505],
+    'Law Enforcement': [2572.5861591904495, 3174.976807904061],
+    'Business Subsidization': [2068.933802877248, 3169.4108046767774],
+    'Religiousness': [763.3065537299756, 2071.2893648619697],
+    'Income Equality': [32.851448787222395, 24.752205748546622],
+    'Niceness': [12.217927239294466, 11.255171594772118],
+    'Rudeness': [54.58449263288187, 57.05988483535062],
+    'Intelligence': [32.98679747566114, 28.871788989559704],
+    'Ignorance': [13.092694145580923, 13.371143780605925],
+    'Political Apathy': [48.91268768893862, 8.37378672394261],
+    'Health': [3.9872456618504684, 5.153205514662673],
+    'Cheerfulness': [48.89925912261075, 6.571360927910257],
+    'Weather': [97.82878591321321, 182.2718072948868],
+    'Compliance': [63.986758795315524, 19.031292073280135],
+    'Safety': [62.90729407179073, 35.94520001351506],
+    'Lifespan': [71.96981418557046, 10.633082396339423],
+    'Ideological Radicality': [19.73577765347171, 12.251255147914783],
+    'Defense Forces': [2919.123742085407, 4289.327496986665],
+    'Pacifism': [59.3413314667587, 40.49630975959787],
+    'Economic Freedom': [28.33900832520054, 55.476045003469466],
+    'Taxation': [35.82841984837305, 25.453829680340288],
+    'Freedom From Taxation': [30.367008075265996, 176.905813792906],
+    'Corruption': [27.467181690509623, 67.27720762121288],
+    'Integrity': [87.06662046844875, 17.13286828226194],
+    'Authoritarianism': [1146.3664969591296, 1589.784245955144],
+    'Youth Rebelliousness': [-4.374369564117747, 19.25529570765467],
+    'Culture': [69.49345707076718, 39.208572748093914],
+    'Employment': [65.85797933874461, 10.779078154298965],
+    'Public Transport': [949.7692392446002, 993.9282886788689],
+    'Tourism': [654.1267084811124, 397.868340528165],
+    'Weaponization': [1.6606993406488777, 4.228130242650334],
+    'Recreational Drug Use': [145.1618262181334, 109.45233743879824],
+    'Obesity': [11.046698959796245, 6.2498036336149925],
+    'Secularism': [21.419198453976342, 18.983005516025507],
+    'Environmental Beauty': [575.5116894087263, 584.8509483692084],
+    'Charmlessness': [25.40710855490229, 89.15499252659382],
+    'Influence': [1851.4140933609033, 20416.67520206672],
+    'World Assembly Endorsements': [1.717223482075365, 16.372171722736006],
+    'Averageness': [35.264222376282405, 12.251255162877246],
+    'Human Development Index': [60.29755064149865, 12.710034893223737],
+    'Primitiveness': [-64.01082195734452, 149.13833337901113],
+    'Scientific Advancement': [90.09786032229655, 143.27856347668114],
+    'Inclusiveness': [103.14923139177836, 51.41892839536463],
+    'Average Income': [71280.59726651949, 56984.11900919248],
+    'Average Income of Poor': [34867.739968579655, 37185.602153427375],
+    'Average Income of Rich': [168871.20754683297, 220067.3724455486],
+    'Public Education': [2575.2525723024924, 3517.0963747354517],
+    'Economic Output': [489857446094342.6, 1227991709586487.5],
+    'Crime': [7.4863208147866045, 9.558577538824172],
+    'Foreign Aid': [319.9377771297993, 666.7861640205449],
+    'Black Market': [109341273547149.05, 992057539142664.2],
+    'Residency': [492.54513159060383, 785.6580051949071],
+    'Survivors': [796771890.0934736, 2798398802.4740252],
+    'Zombies': [704802036.1216674, 1406047836.7969937],
+    'Dead': [3754292371.8347416, 5718258433.406721],
+    'Percentage Zombies': [59.524893715163195, 45.69437539221688],
+    'Average Disposable Income': [39681.040302837355, 30279.5629896824],
+    'International Artwork': [106.66637109996874, 10287.247650239466],
+    'Patriotism': [17.352959522506012, 19.93024296249609],
+    'Food Quality': [30.345256539953827, 46.54109256583365],
+}
@@ -0,0 +1,280 @@
+"""
+Asynchronous counterpart of `nstools.nsapi`, built on aiohttp.
+
+Requires the `async` extra (`pip install nstools[async]`).
+All coroutines sharing an `AsyncRateLimitedClient` draw from the same rate limit budget,
+so a single event loop can keep many requests in flight without exceeding the API limit.
+"""
+from nstools.utils import *
+from nstools.nsapi import NSAPIException, MAX_RETRIES, base_url, logger
+from nstools.parser import parse_response
+from nstools.ratelimit import RateLimiter, LocalRateLimiter, parse_policy
+from nstools.metrics import Hooks
+import aiohttp
+import asyncio
+import xmltodict
+import time
+
+
+class AsyncRateLimitedClient(Hooks):
+    """
+    An asynchronous client for the NationStates API that respects the rate limit.
+
+    Attributes
+    ----------
+    session : aiohttp.ClientSession
+        The aiohttp session used to make requests, created on first use
+    headers : dict
+        The headers sent with every request
+    policy : str
+        The rate limit policy of the API, formated as "{requests};w={seconds}"
+    limiter : RateLimiter
+        The rate limiter backend shared by all requests made through this client (see `nstools.ratelimit`).
+        It can also be shared with other (sync or async) clients, or between processes with a `SharedRateLimiter`.
+    max_connections : int
+        The maximum number of simultaneous connections to the server
+    base_url : str
+        The URL of the API, e.g. of a local `nstools.mockserver.MockNationStates` for load tests
+    hooks : list
+        Callables receiving a `nstools.metrics.RequestEvent` after every request, see `add_hook`
+
+    Methods
+    -------
+    request(headers, **kwargs)
+        Send a request to the API and parse the response
+    close()
+        Close the underlying session
+    """
+    def __init__(
+        self, policy: str = "50;w=30", headers: dict = None, max_connections: int = 100, limiter: RateLimiter = None,
+        base_url: str = base_url,
+    ):
+        self.headers = dict(headers) if headers is not None else {}
+        self.policy = policy
+        self.limiter = limiter if limiter is not None else LocalRateLimiter(*parse_policy(policy))
+        self.max_connections = max_connections
+        self.base_url = base_url
+        self.hooks = []
+        self.session = None
+        self._acquire_lock = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        """ Close the underlying aiohttp session """
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def _get_session(self):
+        # aiohttp sessions must be created inside a running event loop
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(limit=self.max_connections)
+            self.session = aiohttp.ClientSession(headers=self.headers, connector=connector)
+        return self.session
+
+    async def acquire(self):
+        """ Wait until a request may be sent, and take a token for it """
+        # the lock is created lazily so that it binds to the running event loop
+        if self._acquire_lock is None:
+            self._acquire_lock = asyncio.Lock()
+
+        # waiters queue up on the lock, so they are served in order of arrival
+        async with self._acquire_lock:
+            while (waittime := self.limiter.try_acquire()) > 0:
+                logger.warning(f"⚠️ Rate limit reached. Waiting {round(waittime)} seconds before continuing...")
+                await asyncio.sleep(waittime)
+
+    async def request(self, headers: dict = None, parser = None, _retry: int = 0, **kwargs):
+        """
+        Sends a request to the NationStates API with the given parameters
+
+        Parameters
+        ----------
+        headers : dict
+            The headers to send with the request
+        parser : callable
+            Function parsing the (utf-8 encoded) response body, defaults to xmltodict (see also `nstools.parser.parse_response`)
+        **kwargs : dict
+            The query parameters that will be sent as query string to the API
+        """
+        start = time.perf_counter()
+        await self.acquire()
+        sent = time.perf_counter()
+
+        query = "&".join([f"{k}={format_for_query(v)}" for k, v in kwargs.items()])
+        url = f"{self.base_url}?{query}"
+        async with self._get_session().get(url, headers=headers) as response:
+            status = response.status
+            response_headers = response.headers
+            body = await response.read()
+        received = time.perf_counter()
+
+        # see RateLimitedClient.request on why html entities are unescaped
+        content = unescape(body)
+        unescaped = time.perf_counter()
+
+        if self.hooks and status != 200: # successful requests are reported after parsing
+            self._report(kwargs, status, _retry, len(body), start, sent, received, unescaped, unescaped)
+
+        if status == 200: # OK
+            policy = response_headers.get("Ratelimit-Policy", self.policy)
+            seconds_until_reset = int(response_headers.get('Ratelimit-Reset'))
+            remaining = int(response_headers.get('RateLimit-Remaining'))
+
+            self.policy = policy
+            self.limiter.reconcile(*parse_policy(policy), remaining, seconds_until_reset)
+
+            try:
+                if parser is None:
+                    response_content = xmltodict.parse(content, dict_constructor=dict)
+                else:
+                    response_content = parser(content)
+                return response_headers, response_content
+            except Exception as e:
+                raise NSAPIException(0, f"Failed to parse XML response:\n{content.decode('utf-8')}")
+            finally:
+                if self.hooks:
+                    self._report(kwargs, 200, _retry, len(body), start, sent, received, unescaped, time.perf_counter())
+
+        elif status == 429: # We were blocked due to the rate limit
+            if _retry < MAX_RETRIES:
+                waittime = int(response_headers.get("Retry-after"))
+                logger.warning(f"⚠️ Rate limit exceeded. Waiting {waittime} seconds before retrying...")
+
+                # block the shared limiter, so other coroutines back off as well
+                self.limiter.block(waittime)
+                return await self.request(headers = headers, parser = parser, _retry = _retry+1, **kwargs)
+            else:
+                raise NSAPIException(0, f"Retrying request failed {MAX_RETRIES} times.")
+
+        elif status == 524:
+            raise NSAPIException(524, "The server took too long to respond.")
+
+        else:
+            message = html_to_plaintext(content.decode('utf-8')).split("Error:")[0].strip()
+            raise NSAPIException(status, message)
+
+
+class AsyncNationStatesAPI:
+    """
+    A class to interact with the official NationStates API from asyncio code
+
+    Attributes
+    ----------
+    client : AsyncRateLimitedClient
+
+    Methods
+    -------
+    request(**kwargs)
+        Send a world request
+    shard(shard, **kwargs)
+        Request a single world shard
+    shards(shards, **kwargs)
+        Request multiple world shards in one request
+    nation(name, password)
+        Get an AsyncNationAPI sharing this client
+    region(name)
+        Get an AsyncRegionAPI sharing this client
+    """
+    def __init__(self, contact_info: str, max_connections: int = 100, limiter: RateLimiter = None, base_url: str = base_url):
+        headers = {'User-Agent': contact_info}
+        self.client = AsyncRateLimitedClient(
+            headers=headers, max_connections=max_connections, limiter=limiter, base_url=base_url,
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        await self.client.close()
+
+    async def request(self, **kwargs):
+        headers, content = await self.client.request(**kwargs)
+        return headers, content['WORLD']
+
+    async def shard(self, shard: str, **kwargs):
+        headers, content = await self.request(q=shard, **kwargs)
+        return content[shard_key(shard)]
+
+    async def shards(self, shards: list, **kwargs):
+        headers, content = await self.request(q=format_for_query(shards), **kwargs)
+        return [content[shard_key(s)] for s in shards]
+
+    async def parsed_shards(self, shards: list, **kwargs):
+        """ Like `shards`, but decodes known shards into plain python types (see `nstools.parser`) """
+        headers, content = await self.request(q=format_for_query(shards), parser=parse_response, **kwargs)
+        return [content[shard_key(s)] for s in shards]
+
+    def nation(self, name: str, password: str = None):
+        return AsyncNationAPI(self.client, name, password)
+
+    def region(self, name: str):
+        return AsyncRegionAPI(self.client, name)
+
+
+class AsyncNationAPI(AsyncNationStatesAPI):
+    def __init__(self, client: AsyncRateLimitedClient, name: str, password: str = None):
+        self.client = client
+        self.name = name
+        self.password = password
+
+        self.auth_headers = {'X-Password': password} if password is not None else {}
+
+    def __str__(self):
+        if self.password:
+            return f"AsyncNationAPI(\"{self.name}\", password=...)"
+        else:
+            return f"AsyncNationAPI(\"{self.name}\")"
+
+    async def request(self, **kwargs):
+        headers, content = await self.client.request(nation=self.name, headers=self.auth_headers, **kwargs)
+
+        if self.password is not None:
+            if autologin := headers.get('X-Autologin'):
+                self.auth_headers['X-Autologin'] = autologin
+            if pin := headers.get('X-Pin'):
+                self.auth_headers['X-Pin'] = pin
+
+        return headers, content['NATION']
+
+    async def command(self, command: str, prepare_and_execute: bool = None, **kwargs):
+        kwargs.pop('prepare_and_execute', None)
+
+        if prepare_and_execute is None:
+            prepare_and_execute = command not in ("issue",) # all others require two steps
+
+        if not prepare_and_execute:
+            headers, content = await self.request(c=command, **kwargs)
+            return content[shard_key(command)]
+
+        else:
+            headers, content = await self.request(c=command, **kwargs, mode="prepare")
+            if 'ERROR' in content:
+                raise NSAPIException(0, content['ERROR'])
+            token = content['SUCCESS']
+            headers, content = await self.request(c=command, **kwargs, mode="execute", token=token)
+            if 'ERROR' in content:
+                raise NSAPIException(0, content['ERROR'])
+            return headers, content['SUCCESS']
+
+
+class AsyncRegionAPI(AsyncNationStatesAPI):
+    def __init__(self, client: AsyncRateLimitedClient, name: str):
+        self.client = client
+        self.name = name
+
+    def __str__(self):
+        return f"AsyncRegionAPI(\"{self.name}\")"
+
+    async def request(self, **kwargs):
+        headers, content = await self.client.request(region=self.name, **kwargs)
+
+        return headers, content['REGION']
@@ -0,0 +1,118 @@
+"""
+Bulk collection of census scores through the world and region `censusranks` shards.
+
+A censusranks page lists 20 nations with their score on one scale, so collecting one scale for N nations costs
+about N / 20 requests instead of N. Pages are requested from a thread pool, so as many requests are in flight as
+the rate limit allows. Nations missing from the pages (e.g. because ranks shifted while paging, or because a page
+failed) are requested individually afterwards.
+"""
+from nstools.nsapi import NationAPI, RegionAPI
+from nstools.parser import parse_response
+from nstools.utils import census_id_to_name, census_names
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import logging
+import re
+
+
+logger = logging.getLogger("bulk")
+
+PAGE_SIZE = 20
+
+_census_position = {census_name: i for i, census_name in enumerate(census_names)}
+
+
+def _normalize(name: str) -> str:
+    return name.lower().replace(" ", "_")
+
+
+class CensusCollector:
+    """
+    Collects census scores of all nations in the world or in a region.
+
+    Attributes
+    ----------
+    api : NationStatesAPI | RegionAPI
+        The API whose `censusranks` shard is paged through: the world for a NationStatesAPI, or a region
+    workers : int
+        The number of requests in flight at once (the rate limit of the shared client still applies)
+    fill_gaps : bool
+        Whether nations missing from the pages are requested individually
+    max_gap_requests : int
+        The maximal number of individual requests for missing nations, None for no limit
+    """
+    def __init__(self, api, workers: int = 8, fill_gaps: bool = True, max_gap_requests: int = None):
+        self.api = api
+        self.workers = workers
+        self.fill_gaps = fill_gaps
+        self.max_gap_requests = max_gap_requests
+
+    def _page(self, census_id: int, start: int) -> list:
+        headers, content = self.api.request(q="censusranks", scale=census_id, start=start, parser=parse_response)
+        return content['CENSUSRANKS']
+
+    def _nations(self) -> list:
+        # the world separates nations by commas, regions by colons
+        return [_normalize(name) for name in re.split("[,:]", self.api.shard("nations")) if name]
+
+    def _nation_scores(self, name: str, census_ids: list) -> dict:
+        nation = NationAPI(self.api.client, name)
+        try:
+            census, = nation.parsed_shards(["census"], scale=census_ids, mode="score")
+        except Exception as e:
+            logger.warning(f"⚠️ Could not get the census scores of {name}: {e!r}")
+            return {}
+        return census
+
+    def collect(self, census_ids: list):
+        """
+        Collect the scores on the given census scales, as a `NationTable` with one row per nation
+        (scales that were not collected are NaN).
+        """
+        from nstools.nation_table import NationTable
+
+        census_ids = list(census_ids)
+        names = self._nations()
+        rows = {name: i for i, name in enumerate(names)}
+        census = np.full((len(names), len(census_names)), np.nan)
+        pages = -(-len(names) // PAGE_SIZE)
+
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {
+                executor.submit(self._page, census_id, 1 + page * PAGE_SIZE): census_id
+                for census_id in census_ids for page in range(pages)
+            }
+            logger.info(f"Requesting {len(futures)} censusranks pages for {len(names)} nations")
+
+            failed = 0
+            for future, census_id in futures.items():
+                column = _census_position[census_id_to_name[census_id]]
+                try:
+                    page = future.result()
+                except Exception as e: # the nations of a failed page are left NaN, to be filled in below
+                    logger.warning(f"⚠️ Could not get a censusranks page of scale {census_id}: {e!r}")
+                    failed += 1
+                    continue
+                for name, rank, score in page:
+                    if (row := rows.get(_normalize(name))) is not None and score is not None:
+                        census[row, column] = score
+
+            if failed:
+                logger.warning(f"⚠️ {failed} of {len(futures)} censusranks pages failed")
+
+            if self.fill_gaps:
+                columns = [_census_position[census_id_to_name[census_id]] for census_id in census_ids]
+                missing = np.flatnonzero(np.isnan(census[:, columns]).any(axis=1))
+                if self.max_gap_requests is not None:
+                    missing = missing[:self.max_gap_requests]
+                if len(missing) > 0:
+                    logger.info(f"Requesting {len(missing)} nations missing from the censusranks pages")
+
+                gap_futures = {executor.submit(self._nation_scores, names[row], census_ids): row for row in missing}
+                for future, row in gap_futures.items():
+                    for census_id, score in future.result().items():
+                        if score is not None and census_id in census_id_to_name:
+                            census[row, _census_position[census_id_to_name[census_id]]] = score
+
+        region = self.api.name if isinstance(self.api, RegionAPI) else None
+        return NationTable(names, census, regions=[region] * len(names))
@@ -0,0 +1,227 @@
+"""
+Opt-in cache of public API responses.
+
+Responses are cached under a normalized form of their query, for the shortest TTL of the requested shards.
+An in-memory LRU serves repeated requests within one process, and an optional SQLite tier keeps responses
+between runs (or shares them between processes). Authenticated requests and commands are never cached.
+"""
+from requests.structures import CaseInsensitiveDict
+from collections import OrderedDict
+from contextlib import closing, contextmanager
+import threading
+import sqlite3
+import pickle
+import time
+import zlib
+import os
+
+
+# how long (in seconds) shards stay fresh; shards not listed here use the `default_ttl` of the cache
+default_ttls = {
+    'census': 600,
+    'censusranks': 600,
+    'policies': 600,
+    'notables': 600,
+    'region': 600,
+    'nations': 600,
+    'numnations': 3600,
+    'numregions': 3600,
+    'regions': 3600,
+    'founded': 24 * 3600,
+    'foundedtime': 24 * 3600,
+    'happenings': 0,
+    'lastactivity': 0,
+    'lastlogin': 0,
+}
+
+# target parameters, whose values are normalized like nation and region names
+_name_params = ("nation", "region")
+
+
+class ResponseCache:
+    """
+    Storage of cached responses: an in-memory LRU, optionally backed by an SQLite database.
+
+    Responses are stored pickled, also in memory, so every hit decodes a new copy that the caller is free to modify
+    (which is several times faster than a deep copy). Only use database files you trust.
+
+    Attributes
+    ----------
+    max_entries : int
+        The maximal number of responses kept in memory
+    path : str
+        The location of the database file, or None to only cache in memory
+    ttls : dict
+        The TTL (in seconds) of each shard, a TTL of 0 disables caching of requests including that shard
+    default_ttl : float
+        The TTL of shards not in `ttls`, and of requests without shards
+    stats : dict
+        The number of `hits` (split in `memory_hits` and `disk_hits`), `misses` and `bypassed` requests
+    """
+    def __init__(self, max_entries: int = 1024, path: str = None, ttls: dict = None, default_ttl: float = 300):
+        self.max_entries = max_entries
+        self.path = path
+        self.ttls = {**default_ttls, **(ttls or {})}
+        self.default_ttl = default_ttl
+        self.stats = {'hits': 0, 'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'bypassed': 0}
+
+        self._memory = OrderedDict() # key -> (expires, pickled response)
+        self._lock = threading.Lock()
+
+        if path is not None:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+            with self._connect() as db:
+                db.execute("PRAGMA journal_mode=WAL")
+                db.execute("""
+                    CREATE TABLE IF NOT EXISTS responses (
+                        key     TEXT PRIMARY KEY,
+                        expires REAL,
+                        data    BLOB
+                    )
+                """)
+
+    @contextmanager
+    def _connect(self):
+        """ A connection that is committed and closed at the end of the with block """
+        # the context manager of a connection only commits, it doesn't close it
+        with closing(sqlite3.connect(self.path, timeout=30)) as db, db:
+            yield db
+
+    @property
+    def hit_rate(self) -> float:
+        """ The fraction of cacheable requests that were served from the cache """
+        lookups = self.stats['hits'] + self.stats['misses']
+        return self.stats['hits'] / lookups if lookups else 0.0
+
+    def ttl(self, shards: list) -> float:
+        """ The TTL of a request for the given shards """
+        if not shards:
+            return self.default_ttl
+        return min(self.ttls.get(shard, self.default_ttl) for shard in shards)
+
+    def get(self, key: str, persistent: bool = True):
+        """ Get a fresh response from the cache, or None """
+        now = time.time()
+        data = None
+        with self._lock:
+            if (entry := self._memory.get(key)) is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self.stats['hits'] += 1
+                    self.stats['memory_hits'] += 1
+                    data = entry[1]
+                else:
+                    del self._memory[key]
+        if data is not None: # decoded outside of the lock
+            return pickle.loads(data)
+
+        if self.path is not None and persistent:
+            with self._connect() as db:
+                row = db.execute("SELECT expires, data FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[0] > now:
+                data = zlib.decompress(row[1])
+                with self._lock:
+                    self._remember(key, row[0], data)
+                    self.stats['hits'] += 1
+                    self.stats['disk_hits'] += 1
+                return pickle.loads(data)
+
+        with self._lock:
+            self.stats['misses'] += 1
+        return None
+
+    def store(self, key: str, response: tuple, ttl: float, persistent: bool = True):
+        """ Add a response to the cache for `ttl` seconds """
+        expires = time.time() + ttl
+        headers, content = response
+        data = pickle.dumps((CaseInsensitiveDict(headers), content), pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            self._remember(key, expires, data)
+
+        if self.path is not None and persistent:
+            with self._connect() as db:
+                db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?)", (key, expires, zlib.compress(data)))
+                db.execute("DELETE FROM responses WHERE expires <= ?", (time.time(),))
+
+    def _remember(self, key: str, expires: float, data: bytes):
+        self._memory[key] = (expires, data)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+        if self.path is not None:
+            with self._connect() as db:
+                db.execute("DELETE FROM responses")
+
+
+class CachingClient:
+    """
+    Wraps a `RateLimitedClient` (or anything with the same `request` method) to serve public responses from a cache.
+
+    Requests with headers (i.e. authenticated requests) and commands (`c=`) always go to the wrapped client.
+
+    Attributes
+    ----------
+    client : RateLimitedClient
+        The client used on cache misses
+    cache : ResponseCache
+        The cache storing the responses
+    """
+    def __init__(self, client, cache: ResponseCache = None):
+        self.client = client
+        self.cache = cache if cache is not None else ResponseCache()
+
+    def __getattr__(self, name):
+        # expose the attributes of the wrapped client (e.g. `limiter` and `policy`)
+        return getattr(self.client, name)
+
+    @staticmethod
+    def _key(parser, shards: list, kwargs: dict):
+        """ Normalized form of a query, so that equivalent requests share an entry """
+        params = []
+        for k, v in sorted(kwargs.items()):
+            v = str(v)
+            if k in _name_params:
+                v = v.lower().replace(" ", "_")
+            params.append(f"{k}={v}")
+        if shards:
+            params.append("q=" + "+".join(shards))
+
+        if parser is None:
+            parser_name = "xmltodict"
+        else:
+            parser_name = f"{parser.__module__}.{parser.__qualname__}"
+            if "<" in parser_name: # lambdas and local functions don't have a unique name
+                parser_name += f"@{id(parser):x}"
+        return parser_name + "?" + "&".join(params)
+
+    def request(self, headers: dict = None, parser = None, **kwargs):
+        """ Same as `RateLimitedClient.request`, but serves public responses from the cache when possible """
+        if headers or 'c' in kwargs:
+            with self.cache._lock:
+                self.cache.stats['bypassed'] += 1
+            return self.client.request(headers=headers, parser=parser, **kwargs)
+
+        q = kwargs.pop('q', None)
+        shards = sorted({s.lower() for s in str(q).split("+") if s}) if q is not None else []
+
+        ttl = self.cache.ttl(shards)
+        if ttl <= 0:
+            with self.cache._lock:
+                self.cache.stats['bypassed'] += 1
+            return self.client.request(headers=headers, parser=parser, **({'q': q} if q is not None else {}), **kwargs)
+
+        key = self._key(parser, shards, kwargs)
+        # responses of parsers that can't be identified by name (lambdas, local functions) are only kept in memory
+        persistent = "<" not in key.split("?")[0]
+
+        # the cache stores and returns copies, so callers can't modify the cached response
+        if (response := self.cache.get(key, persistent)) is None:
+            if q is not None:
+                kwargs['q'] = q
+            response = self.client.request(headers=headers, parser=parser, **kwargs)
+            self.cache.store(key, response, ttl, persistent)
+        return response
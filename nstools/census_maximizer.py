@@ -1,7 +1,23 @@
-from nstools.nation import Nation
-from nstools.trotterdam import TrotterdamIssue, PolicyChange
+from nstools.nation import Nation, CensusView
+from nstools.trotterdam import TrotterdamIssue, TrotterdamCache, PolicyChange
+from nstools.trotterdam_index import TrotterdamIndex
 from nstools.utils import census_names, census_mean, census_std
-from copy import deepcopy
+from concurrent.futures import Executor, ThreadPoolExecutor, ProcessPoolExecutor
+import numpy as np
+import pickle
+import time
+
+
+def census_vector(census: dict, default: float = 0) -> np.ndarray:
+    """ Convert a dictionary mapping census names to values to an array ordered like `utils.census_names` """
+    if isinstance(census, CensusView): # already stored in this order
+        vector = census.vector()
+        return np.where(np.isnan(vector), default, vector)
+
+    return np.array([
+        value if (value := census.get(census_name)) is not None else default
+        for census_name in census_names
+    ], dtype=float)
 
 
 class OutcomePrediction:
@@ -26,7 +42,14 @@ class OutcomePrediction:
         self.policies = policies
         self.notables = notables
         self.resign_WA = resign_WA
-    
+        self._census_vector = None
+
+    def census_vector(self) -> np.ndarray:
+        """ The census changes as an array, ordered like `utils.census_names` """
+        if self._census_vector is None:
+            self._census_vector = census_vector(self.census_changes)
+        return self._census_vector
+
     @staticmethod
     def calc_actual_change(old_dict, new_dict):
         """ Calculate the actual change in census values between two nation dictionaries. """
@@ -46,20 +69,44 @@ class OutcomePrediction:
 class Predictor:
     """
     A class that predicts the outcome of an issue.
+
+    `version` identifies what the predictor knows: predictions may be reused (e.g. by `nstools.lookahead`) as long as
+    it doesn't change. It is None if predictions may change at any time, so they are never reused across decisions.
     """
+    version = None
+
     def __init__(self):
         pass
     
     def __call__(self, nation_dict, issue, option_id) -> OutcomePrediction:
         raise NotImplementedError()
 
+    def predict_options(self, nation_dict, issue, option_ids) -> dict:
+        """
+        Predict the outcomes of several options of an issue, as a dictionary by option id.
+        Subclasses may override this to share work between the options; by default each option is predicted on its own.
+        """
+        return {option_id: self(nation_dict, issue, option_id) for option_id in option_ids}
+
+    def prefetch(self, issue):
+        """
+        Prepare to predict the options of an issue that will be answered later, e.g. by downloading its data.
+        A `CensusMaximizer` with a thread pool calls this from a worker thread while it waits for the API.
+        """
+        pass
+
 
 class Scorer:
     """
     A class that scores a nation based on its state, or an OutcomePrediction on how much it would increase the score of the nation.
     In principle, `score(nation + outcome) = score(nation) + score(outcome)`, but the CensusMaximizer only uses the outcome score.
     The nation score is meant to be used to track the progress of the nation over time.
+
+    A scorer is `linear` if the score of a prediction only depends on the prediction (e.g. a weighted sum of its census
+    changes) and not on the state of the nation, which lets `nstools.lookahead` bound the value of issue chains.
     """
+    linear = False
+
     def __init__(self):
         pass
     
@@ -69,55 +116,335 @@ class Scorer:
     def score_prediction(self, nation_dict, prediction: OutcomePrediction) -> float:
         raise NotImplementedError()
 
+    def score_predictions_batch(self, nation_dict, predictions: list) -> np.ndarray:
+        """ Score many predictions at once. Subclasses may override this with a vectorized implementation. """
+        return np.array([self.score_prediction(nation_dict, prediction) for prediction in predictions], dtype=float)
+
+
+_worker_predictor = None # the predictor of a PredictorPool worker process
+
+
+def _init_worker(predictor: Predictor):
+    global _worker_predictor
+    _worker_predictor = predictor
+
+
+def _predict_in_worker(nation_dict, issue, option_ids) -> dict:
+    return _worker_predictor.predict_options(nation_dict, issue, option_ids)
+
+
+class PredictorPool(ProcessPoolExecutor):
+    """
+    A process pool predicting options with a copy of one predictor per worker process.
+
+    The predictor is sent to each worker once, when it starts, so its memoized issues (e.g. the downloaded
+    Trotterdam pages of a `TrotterdamPredictor`) are kept between tasks. Tasks only send the nation and the issue.
+    Pass it as the `executor` of a `CensusMaximizer` with the same predictor.
+    """
+    def __init__(self, predictor: Predictor, max_workers: int = None):
+        try:
+            pickle.dumps(predictor)
+        except Exception as e:
+            raise ValueError(
+                f"{type(predictor).__name__} cannot be sent to worker processes, use a ThreadPoolExecutor instead: {e}"
+            ) from e
+        super().__init__(max_workers=max_workers, initializer=_init_worker, initargs=(predictor,))
+        self.predictor = predictor
+
+
+class IssueRecord(tuple):
+    """
+    The record of an issue handled by `CensusMaximizer.run`: a tuple `(issue, choice, initial_dict, new_dict,
+    option_scores)`, with the time spent in each phase in `timings` (seconds, by phase) and the number of
+    `requests` made for it.
+    """
+    def __new__(cls, issue, choice, initial_dict, new_dict, option_scores, timings: dict = None, requests: int = 0):
+        record = super().__new__(cls, (issue, choice, initial_dict, new_dict, option_scores))
+        record.timings = timings if timings is not None else {}
+        record.requests = requests
+        return record
+
+    issue = property(lambda self: self[0])
+    choice = property(lambda self: self[1])
+    initial_dict = property(lambda self: self[2])
+    new_dict = property(lambda self: self[3])
+    option_scores = property(lambda self: self[4])
+
+
+class _TimedPredictor(Predictor):
+    """ Adds the time spent in a predictor to the "predict" phase of a timings dict """
+    def __init__(self, predictor: Predictor, timings: dict):
+        self.predictor = predictor
+        self.timings = timings
+
+    def __getattr__(self, name): # e.g. options and leads_to, see nstools.lookahead
+        return getattr(self.predictor, name)
+
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self.timings['predict'] = self.timings.get('predict', 0) + time.perf_counter() - start
+
+    def __call__(self, nation_dict, issue, option_id):
+        return self._timed(self.predictor, nation_dict, issue, option_id)
+
+    def predict_options(self, nation_dict, issue, option_ids):
+        return self._timed(self.predictor.predict_options, nation_dict, issue, option_ids)
+
+    def prefetch(self, issue):
+        return self.predictor.prefetch(issue)
+
+    @property
+    def version(self):
+        return self.predictor.version
+
+
+class _TimedScorer(Scorer):
+    """ Adds the time spent in a scorer to the "score" phase of a timings dict """
+    def __init__(self, scorer: Scorer, timings: dict):
+        self.scorer = scorer
+        self.timings = timings
+
+    def __getattr__(self, name):
+        return getattr(self.scorer, name)
+
+    def _timed(self, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self.timings['score'] = self.timings.get('score', 0) + time.perf_counter() - start
+
+    def score_nation(self, nation_dict):
+        return self._timed(self.scorer.score_nation, nation_dict)
+
+    def score_prediction(self, nation_dict, prediction):
+        return self._timed(self.scorer.score_prediction, nation_dict, prediction)
+
+    def score_predictions_batch(self, nation_dict, predictions):
+        return self._timed(self.scorer.score_predictions_batch, nation_dict, predictions)
+
+    @property
+    def linear(self):
+        return self.scorer.linear
+
 
 class CensusMaximizer:
-    def __init__(self, nation: Nation, predictor: Predictor, scorer: Scorer):
+    """
+    Answers the issues of a nation, choosing the option with the highest predicted score.
+
+    After answering an issue, all shards of the nation are requested again every `update_every` answered issues
+    (by default after every answer, never if None). In between, the nation is patched with the census and policy
+    changes reported in the answer (see `Nation.apply_issue_result`), or updated if they are incomplete. Answers
+    don't report notables, sectors, government, deaths or WA status, so with `update_every > 1` these may lag
+    behind by up to `update_every` answers, also in the states yielded by `run()` and recorded in an `outcome_log`
+    (e.g. a WA resignation is only seen after the next update).
+
+    Predictors and scorers receive the state of the nation as a read-only `NationSnapshot`, shared between all options.
+    `run()` yields an `IssueRecord` per issue, which unpacks as `(issue, choice, initial_dict, new_dict, option_scores)`,
+    with the states before and after answering. The time spent in each phase (`predict`, `score`, `decide` for
+    choosing an option in total, `answer`, `update` and `log`) is in its `timings`, and `summary()` aggregates them
+    over the run. A `profiler` with `enable()` and `disable()` methods, like a `cProfile.Profile`, is enabled
+    while the run is handling issues (not while the caller processes the yielded records).
+    If an `outcome_log` is given (see `nstools.outcome_log.OutcomeLog`), the actual census change of every answer is
+    recorded in it.
+    With `lookahead_depth > 0`, options are also scored on the issues they lead to (see `nstools.lookahead`),
+    which requires a predictor that knows the issue chains, like `TrotterdamPredictor`.
+
+    Without lookahead, all options of an issue are predicted with one `Predictor.predict_options` call and scored
+    with one `Scorer.score_predictions_batch` call. Given an `executor` (a `ThreadPoolExecutor`, or a `PredictorPool`
+    of the same predictor), the options are predicted concurrently, one task per option, also those of the issues
+    the lookahead expects to follow. With a thread pool, the predictor also prefetches the remaining issues (see
+    `Predictor.prefetch`) while the answer to an issue is pending.
+    """
+    def __init__(
+        self, nation: Nation, predictor: Predictor, scorer: Scorer, update_every: int = 1, outcome_log = None,
+        lookahead_depth: int = 0, profiler = None, executor: Executor = None,
+    ):
         self.nation = nation
         self.scorer = scorer
         self.predictor = predictor
+        self.update_every = update_every
+        self.outcome_log = outcome_log
+        self.profiler = profiler
+        self.executor = executor
+        if isinstance(executor, ProcessPoolExecutor) and getattr(executor, "predictor", None) is not predictor:
+            # otherwise the predictor would be pickled with every task, and lose whatever it memoized
+            raise ValueError("A process pool executor must be a PredictorPool of the same predictor")
+        self._prefetched = set()
+        self.records = [] # (timings, requests) of every handled issue, see summary()
+        self.elapsed = 0.0
+
+        # the predictor and scorer are wrapped to time them, also when called by the lookahead
+        self._timings = {}
+        self._predictor = _TimedPredictor(predictor, self._timings)
+        self._scorer = _TimedScorer(scorer, self._timings)
+
+        self.lookahead = None
+        if lookahead_depth > 0:
+            from nstools.lookahead import Lookahead
+            self.lookahead = Lookahead(
+                self._predictor, self._scorer, depth=lookahead_depth, predict_options=self._predict_options
+            )
 
         if self.nation.last_updated is None:
             self.nation.update()
-    
-    def run(self):
-        while len(issues := self.nation.issues) > 0:
-            issue = issues.pop()
-
-            initial_dict = self.nation.dict()
 
+    def _predict_options(self, nation_dict, issue, option_ids: list = None) -> dict:
+        if option_ids is None:
+            option_ids = list(issue.options)
+        if self.executor is None:
+            return self._predictor.predict_options(nation_dict, issue, option_ids)
+
+        # the time spent waiting for the tasks is counted as predicting
+        start = time.perf_counter()
+        # in a PredictorPool, the workers use their own copy of the predictor
+        predict = _predict_in_worker if isinstance(self.executor, PredictorPool) else self.predictor.predict_options
+        futures = [self.executor.submit(predict, nation_dict, issue, [option_id]) for option_id in option_ids]
+        predictions = {}
+        for future in futures:
+            predictions.update(future.result())
+        self._timings['predict'] = self._timings.get('predict', 0) + time.perf_counter() - start
+        return predictions
+
+    def _prefetch(self, issues: list):
+        """ Let the predictor prepare for the remaining issues in the background """
+        # in a process pool the predictor is a copy, so whatever it prefetched would be lost
+        if not isinstance(self.executor, ThreadPoolExecutor):
+            return
+        for issue in issues:
+            if issue.id not in self._prefetched:
+                self._prefetched.add(issue.id)
+                self.executor.submit(self.predictor.prefetch, issue)
+
+    def _step(self, issue, answered_since_update: int):
+        """ Choose an option for the issue and answer it, returning the record and the new count of answers """
+        timings = self._timings
+        timings.clear()
+        requests = getattr(self.nation.api, "requests", 0)
+        start = time.perf_counter()
+
+        # the snapshot is read-only, so it can be shared by the predictor and scorer without copying
+        initial_dict = self.nation.snapshot()
+
+        if self.lookahead is not None:
+            option_scores = self.lookahead.option_scores(initial_dict, issue)
+        else:
             option_scores = {-1: 0} # dismissing the issue should always have a change of 0
-            for option_id, option_text in issue.options.items():
-                prediction = self.predictor(deepcopy(initial_dict), issue, option_id)
-                score = self.scorer.score_prediction(deepcopy(initial_dict), prediction)
-                option_scores[option_id] = score
-            
-            choice = max(option_scores, key=option_scores.get)
-            issue.answer(choice)
-
-            if choice != -1:
+            predictions = self._predict_options(initial_dict, issue)
+            option_ids = list(issue.options)
+            scores = self._scorer.score_predictions_batch(initial_dict, [predictions[o] for o in option_ids])
+            option_scores.update(zip(option_ids, scores.tolist()))
+
+        choice = max(option_scores, key=option_scores.get)
+        decided = time.perf_counter()
+        self._prefetch(self.nation.issues)
+        result = issue.answer(choice)
+        answered = time.perf_counter()
+        timings['decide'] = decided - start
+        timings['answer'] = answered - decided
+
+        if choice != -1:
+            answered_since_update += 1
+            due = self.update_every is not None and answered_since_update >= self.update_every
+            if due or not self.nation.apply_issue_result(result):
                 self.nation.update()
-                new_dict = self.nation.dict()
-            else:
-                new_dict = initial_dict
+                answered_since_update = 0
+            new_dict = self.nation.snapshot()
+            timings['update'] = time.perf_counter() - answered
+
+            if self.outcome_log is not None:
+                logged = time.perf_counter()
+                self.outcome_log.record(issue.id, choice, initial_dict, new_dict)
+                timings['log'] = time.perf_counter() - logged
+        else:
+            new_dict = initial_dict
+
+        timings['total'] = time.perf_counter() - start
+        requests = getattr(self.nation.api, "requests", 0) - requests
+        self.records.append((dict(timings), requests))
+        return IssueRecord(issue, choice, initial_dict, new_dict, option_scores, dict(timings), requests), answered_since_update
+
+    def run(self):
+        answered_since_update = 0
+
+        while True:
+            start = time.perf_counter()
+            if self.profiler is not None:
+                self.profiler.enable()
+            try:
+                if len(issues := self.nation.issues) == 0:
+                    return
+                record, answered_since_update = self._step(issues.pop(), answered_since_update)
+            finally:
+                if self.profiler is not None:
+                    self.profiler.disable()
+                self.elapsed += time.perf_counter() - start
+
+            yield record
+
+    def summary(self) -> dict:
+        """
+        Aggregate the records of the issues handled so far: the number of `issues`, the time spent handling them
+        (`elapsed`, excluding the time spent by the caller between issues), `issues_per_minute`,
+        `requests_per_issue`, and the total, mean, p50 and p95 time of each phase (`phases`, in seconds).
+        """
+        phases = {}
+        for timings, _ in self.records:
+            for phase, seconds in timings.items():
+                phases.setdefault(phase, []).append(seconds)
+
+        issues = len(self.records)
+        return {
+            'issues': issues,
+            'elapsed': self.elapsed,
+            'issues_per_minute': issues / self.elapsed * 60 if self.elapsed else 0.0,
+            'requests_per_issue': sum(requests for _, requests in self.records) / issues if issues else 0.0,
+            'phases': {
+                phase: {
+                    'total': float(np.sum(times)),
+                    'mean': float(np.mean(times)),
+                    'p50': float(np.percentile(times, 50)),
+                    'p95': float(np.percentile(times, 95)),
+                }
+                for phase, times in phases.items()
+            },
+        }
 
-            yield issue, choice, initial_dict, new_dict, option_scores
+
+_no_census_change = dict.fromkeys(census_names, 0)
 
 
 class TrotterdamPredictor(Predictor):
+    """
+    Predicts issue outcomes from the results compiled on Trotterdam.
+    If a `TrotterdamIndex` is given, issues are looked up in it without using the network.
+    Issues missing from the index are loaded from the `TrotterdamCache` if given, or downloaded otherwise.
+    """
+    version = 0 # the outcomes of an issue are only loaded once
 
-    def __init__(self):
+    def __init__(self, cache: TrotterdamCache = None, index: TrotterdamIndex = None):
         super().__init__()
+        self.cache = cache
+        self.index = index
         self.issue_memo = {}
 
     def get_trotterdam_issue(self, issue_id):
         if issue_id not in self.issue_memo:
-            self.issue_memo[issue_id] = TrotterdamIssue(issue_id)
+            if self.index is not None and issue_id in self.index:
+                self.issue_memo[issue_id] = self.index[issue_id]
+            elif self.cache is not None:
+                self.issue_memo[issue_id] = self.cache.get(issue_id)
+            else:
+                self.issue_memo[issue_id] = TrotterdamIssue(issue_id)
         
         return self.issue_memo[issue_id]
     
-    def __call__(self, nation_dict, issue, option_id):
-        trotterdam_issue = self.get_trotterdam_issue(issue.id)
-
+    @staticmethod
+    def align_option(issue, trotterdam_issue, option_id):
+        """ The option id on Trotterdam corresponding to an option of the issue """
         if max(issue.options.keys()) > max(trotterdam_issue.outcomes.keys()):
             # There is a misalignment between the option ids of the issue and the Trotterdam issue
 
@@ -135,16 +462,52 @@ class TrotterdamPredictor(Predictor):
             else:
                 raise ValueError(f"The option ids of issue {issue.id} and the Trotterdam issue do not match up and cannot be trivially realigned.")
 
-        trotterdam_outcome = trotterdam_issue.outcomes[option_id]
+        return option_id
+
+    def options(self, issue_id) -> list:
+        """ The option ids of an issue, as listed on Trotterdam """
+        return list(self.get_trotterdam_issue(issue_id).outcomes.keys())
+
+    def leads_to(self, issue, option_id):
+        """ The id of the issue that the option leads to (the next issue in a chain), or None """
+        trotterdam_issue = self.get_trotterdam_issue(issue.id)
+        option_id = self.align_option(issue, trotterdam_issue, option_id)
+        return trotterdam_issue.outcomes[option_id].get('leads_to')
+
+    def prefetch(self, issue):
+        self.get_trotterdam_issue(issue.id)
 
-        census_change = {census_name: 0 for census_name in census_names}
+    def predict_options(self, nation_dict, issue, option_ids):
+        # the Trotterdam issue and the current policies and notables are looked up once for all options
+        trotterdam_issue = self.get_trotterdam_issue(issue.id)
+        policies = {policy: 1 for policy in nation_dict['policies']}
+        notables = {notable: 1 for notable in nation_dict['notables']}
+
+        return {
+            option_id: self._predict(
+                trotterdam_issue.outcomes[self.align_option(issue, trotterdam_issue, option_id)], policies, notables,
+            )
+            for option_id in option_ids
+        }
+
+    def __call__(self, nation_dict, issue, option_id):
+        trotterdam_issue = self.get_trotterdam_issue(issue.id)
+        option_id = self.align_option(issue, trotterdam_issue, option_id)
+        return self._predict(
+            trotterdam_issue.outcomes[option_id],
+            {policy: 1 for policy in nation_dict['policies']},
+            {notable: 1 for notable in nation_dict['notables']},
+        )
+
+    @staticmethod
+    def _predict(trotterdam_outcome, policies: dict, notables: dict) -> OutcomePrediction:
+        """ The prediction for an outcome on Trotterdam, given the current policies and notables (which are copied) """
+        census_change = dict(_no_census_change)
 
         for census_name, value in trotterdam_outcome['census_changes'].items():
             census_change[census_name] += value[1] # assume mean outcomes
 
-        policies = {
-            policy: 1 for policy in nation_dict['policies']
-        }
+        policies = dict(policies)
         for policy, change in trotterdam_outcome['policy_changes'].items():
             if policy in policies:
                 if change == PolicyChange.REMOVES:
@@ -157,9 +520,7 @@ class TrotterdamPredictor(Predictor):
                 if change in (PolicyChange.SOMETIMES_ADDS, PolicyChange.MAY_ADD_ORR_REMOVE):
                     policies[policy] = 0.5
 
-        notables = {
-            notable: 1 for notable in nation_dict['notables']
-        }
+        notables = dict(notables)
         for notable, change in trotterdam_outcome['notability_changes'].items():
             if notable in notables:
                 if change == PolicyChange.REMOVES:
@@ -177,6 +538,12 @@ class TrotterdamPredictor(Predictor):
 
 
 class NormalizedScorer(Scorer):
+    """
+    Scores census changes relative to the standard deviation of each census scale, weighted by `census_weights`.
+
+    The weights are combined with the census statistics into arrays once, at construction,
+    so changing `census_weights` afterwards has no effect.
+    """
     def __init__(self, census_weights: dict = None, policy_weights: dict = None, allow_WA_resignation=False):
         if census_weights is None:
             census_weights = { census_name: 1 for census_name in census_names }
@@ -187,35 +554,72 @@ class NormalizedScorer(Scorer):
         self.policy_weights = policy_weights
         self.allow_WA_resignation = allow_WA_resignation
 
+        # weights pre-divided by the standard deviation, ordered like census_names
+        self.census_factors = np.array([
+            self.census_weights.get(census_name, 1) / census_std[census_name]
+            for census_name in census_names
+        ])
+        self.census_means = np.array([census_mean[census_name] for census_name in census_names])
+
     def score_nation(self, nation_dict):
-        census_score = sum(
-            (value - census_mean[census_name]) / census_std[census_name]
-            * (self.census_weights[census_name] if census_name in self.census_weights else 1)
-            for census_name, value in nation_dict['census'].items()
-        )
+        # missing scores (see Nation.update) are counted as average
+        values = census_vector(nation_dict['census_data'], default=np.nan)
+        census_score = np.nansum((values - self.census_means) * self.census_factors)
 
         policy_score = sum(
-            self.policy_weights[policy] for policy in nation_dict['policies']
+            self.policy_weights.get(policy, 0) for policy in nation_dict['policies']
         )
 
-        return census_score + policy_score
+        return float(census_score) + policy_score
 
-    def score_prediction(self, nation_dict, prediction: OutcomePrediction):
-        census_score = sum(
-            value / census_std[census_name]
-            * (self.census_weights[census_name] if census_name in self.census_weights else 1)
-            for census_name, value in prediction.census_changes.items()
-        )
+    @property
+    def linear(self) -> bool:
+        # policies are scored relative to the current policies of the nation
+        return not self.policy_weights
 
+    def _policy_score(self, nation_dict, prediction: OutcomePrediction):
         policy_score = 0
         for policy, weight in self.policy_weights.items():
             policy_initial = 1 if policy in nation_dict['policies'] else 0
             policy_prediction = prediction.policies.get(policy, 0)
 
             policy_score += (policy_prediction - policy_initial) * weight
-        
+
+        return policy_score
+
+    def score_prediction(self, nation_dict, prediction: OutcomePrediction):
+        census_score = float(self.census_factors @ prediction.census_vector())
+        policy_score = self._policy_score(nation_dict, prediction)
+
         score = census_score + policy_score
         if not self.allow_WA_resignation and prediction.resign_WA:
             score = - float('inf')
 
-        return score
\ No newline at end of file
+        return score
+
+    def score_predictions_batch(self, nation_dict, predictions):
+        """
+        Score many predictions with a single matrix-vector product.
+
+        Parameters
+        ----------
+        nation_dict : dict
+            The state of the nation the predictions apply to
+        predictions : list[OutcomePrediction] | np.ndarray
+            Either a list of predictions, or an array of shape (n, len(census_names)) with only census changes
+        """
+        if isinstance(predictions, np.ndarray):
+            return predictions @ self.census_factors
+
+        if len(predictions) == 0:
+            return np.zeros(0)
+
+        changes = np.stack([prediction.census_vector() for prediction in predictions])
+        scores = changes @ self.census_factors
+
+        for i, prediction in enumerate(predictions):
+            scores[i] += self._policy_score(nation_dict, prediction)
+            if not self.allow_WA_resignation and prediction.resign_WA:
+                scores[i] = - float('inf')
+
+        return scores
@@ -0,0 +1,137 @@
+"""
+Coalescing of API requests made by independent callers (e.g. threads of a dashboard or a FleetMaximizer).
+
+Requests for shards of the same target with the same other parameters, headers and parser are merged into a
+single request when they arrive within a short delay of each other, and requests for shards that are already
+being fetched wait for that request instead of sending their own.
+"""
+from concurrent.futures import Future
+import threading
+import logging
+import pickle
+import copy
+import time
+
+
+logger = logging.getLogger("nsapi")
+
+
+def _freeze(response):
+    """ Serialize a response once, so that every caller can decode its own copy of it """
+    try:
+        return pickle.dumps(response, pickle.HIGHEST_PROTOCOL), None
+    except Exception: # e.g. a parser returning lxml elements
+        return None, response
+
+
+def _thaw(frozen):
+    data, response = frozen
+    return pickle.loads(data) if data is not None else copy.deepcopy(response)
+
+
+class _Batch:
+    """ Shards that will be (or are being) fetched by a single request """
+    def __init__(self):
+        self.shards = []
+        self.shard_set = set()
+        self.callers = 0
+        self.future = Future()
+
+    def add(self, shards: list):
+        for shard in shards:
+            if shard.lower() not in self.shard_set:
+                self.shard_set.add(shard.lower())
+                self.shards.append(shard)
+        self.callers += 1
+
+
+class CoalescingClient:
+    """
+    Wraps a `RateLimitedClient` (or anything with the same `request` method) to share requests between callers.
+
+    The first caller asking for shards of a target waits `delay` seconds, during which other callers can add
+    shards to its request. The merged response is then handed to every caller, each getting its own (deep) copy of
+    it, so callers can't interfere with each other. Commands (`c=`) are never coalesced.
+
+    Attributes
+    ----------
+    client : RateLimitedClient
+        The client that sends the merged requests
+    delay : float
+        How long (in seconds) a request waits for others to merge with
+    stats : dict
+        The number of `requests` made to this client, and the number of requests `sent` to the API
+    """
+    def __init__(self, client, delay: float = 0.005):
+        self.client = client
+        self.delay = delay
+        self.stats = {'requests': 0, 'sent': 0}
+
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._in_flight = {}
+
+    def __getattr__(self, name):
+        # expose the attributes of the wrapped client (e.g. `limiter` and `policy`)
+        return getattr(self.client, name)
+
+    @staticmethod
+    def _key(headers: dict, parser, has_shards: bool, kwargs: dict):
+        """ Requests can only be merged if everything but their shards is the same """
+        params = tuple(sorted((k, str(v)) for k, v in kwargs.items()))
+        headers = tuple(sorted((headers or {}).items()))
+        return params, headers, parser, has_shards
+
+    def request(self, headers: dict = None, parser = None, **kwargs):
+        """ Same as `RateLimitedClient.request`, but shares the request with other callers where possible """
+        if 'c' in kwargs:
+            return self.client.request(headers=headers, parser=parser, **kwargs)
+
+        q = kwargs.pop('q', None)
+        shards = [s for s in str(q).split("+") if s] if q is not None else []
+        key = self._key(headers, parser, bool(shards), kwargs)
+
+        leader = False
+        with self._lock:
+            self.stats['requests'] += 1
+
+            # the shards may already be on their way
+            for batch in self._in_flight.get(key, ()):
+                if all(s.lower() in batch.shard_set for s in shards):
+                    break
+            else:
+                batch = self._pending.get(key)
+                if batch is None:
+                    batch = self._pending[key] = _Batch()
+                    leader = True
+                batch.add(shards)
+
+        if leader:
+            self._send(key, batch, headers, parser, kwargs)
+
+        return _thaw(batch.future.result())
+
+    def _send(self, key, batch: _Batch, headers: dict, parser, kwargs: dict):
+        """ Wait for other callers to join the batch, then send it """
+        if self.delay > 0:
+            time.sleep(self.delay)
+
+        with self._lock:
+            del self._pending[key]
+            self._in_flight.setdefault(key, []).append(batch)
+            self.stats['sent'] += 1
+
+        if batch.callers > 1:
+            logger.debug(f"Coalesced {batch.callers} requests for {len(batch.shards)} shards")
+
+        try:
+            if batch.shards:
+                kwargs = {**kwargs, 'q': "+".join(batch.shards)}
+            batch.future.set_result(_freeze(self.client.request(headers=headers, parser=parser, **kwargs)))
+        except BaseException as e:
+            batch.future.set_exception(e)
+        finally:
+            with self._lock:
+                self._in_flight[key].remove(batch)
+                if not self._in_flight[key]:
+                    del self._in_flight[key]
@@ -0,0 +1,292 @@
+"""
+Streaming parser for the daily nations data dump (https://www.nationstates.net/pages/nations.xml.gz).
+
+The dump is decompressed and parsed one <NATION> at a time, so memory use does not depend on the size of the dump.
+Writing Feather files requires pyarrow (`pip install nstools[dump]`).
+
+A dump can be converted with
+
+    python -m nstools.dump nations.xml.gz nations.feather --workers 4
+"""
+from nstools.utils import census_id_to_name
+from concurrent.futures import ProcessPoolExecutor
+from collections import deque
+from lxml import etree
+import argparse
+import tempfile
+import logging
+import gzip
+import os
+
+
+logger = logging.getLogger("dump")
+
+# leaf fields that are numeric; everything else is kept as a string
+numeric_fields = {
+    "population", "tax", "issues_answered", "publicsector", "firstlogin", "lastlogin",
+    "factbooks", "dispatches", "dbid",
+}
+# groups of which every child is numeric, e.g. GOVT/DEFENCE or DEATHS/CAUSE
+numeric_groups = {"govt", "deaths", "freedomscores", "sectors"}
+# groups of repeated children without a type attribute, kept as one list, e.g. POLICIES/POLICY
+list_groups = {"policies", "notables", "admirables", "happenings"}
+
+
+def _number(text):
+    try:
+        return float(text)
+    except (TypeError, ValueError):
+        return None
+
+
+def nation_record(element) -> dict:
+    """
+    Convert a <NATION> element of the dump to a flat dictionary.
+
+    Leaf fields are keyed by their lowercase tag, census scores by their census name,
+    and children of other groups by "{group}.{child}" (e.g. "govt.defence" or "deaths.Old Age").
+    The children of `list_groups` are listed under the group (e.g. "policies"), and other children that
+    are repeated without a type attribute are listed under "{group}.{child}", so none of them is lost.
+    Listed children with children of their own become dictionaries (e.g. {"name": ..., "cat": ...} for a policy).
+    """
+    record = {}
+    repeated = set() # keys of which the values were collected into a list
+    for child in element:
+        tag = child.tag.lower()
+
+        if tag == "census":
+            for scale in child:
+                census_id = int(scale.get("id"))
+                name = census_id_to_name.get(census_id, f"census_{census_id}")
+                record[name] = _number(scale.findtext("SCORE"))
+
+        elif tag in list_groups:
+            record[tag] = [_item(item) for item in child]
+
+        elif len(child) > 0:
+            numeric = tag in numeric_groups
+            for item in child:
+                value = _number(item.text) if numeric else _item(item)
+                # e.g. <CAUSE type="Old Age">, otherwise the tag is used
+                if (key := item.get("type")) is not None:
+                    record[f"{tag}.{key}"] = value
+                    continue
+
+                key = f"{tag}.{item.tag.lower()}"
+                if key not in record:
+                    record[key] = value
+                elif key in repeated:
+                    record[key].append(value)
+                else:
+                    record[key] = [record[key], value]
+                    repeated.add(key)
+
+        else:
+            record[tag] = _number(child.text) if tag in numeric_fields else child.text
+
+    return record
+
+
+def _item(item):
+    """ The text of a child of a group, or a dictionary of its children's texts """
+    if len(item) == 0:
+        return item.text
+    return {sub.tag.lower(): sub.text for sub in item}
+
+
+def _open(path):
+    return gzip.open(path, "rb") if str(path).endswith(".gz") else open(path, "rb")
+
+
+def iter_nations(path: str):
+    """ Iterate over the nations in a dump (gzipped or not) as flat dictionaries, see `nation_record` """
+    with _open(path) as f:
+        for _, element in etree.iterparse(f, events=("end",), tag="NATION", huge_tree=True, recover=True):
+            yield nation_record(element)
+
+            # free the parsed element, as well as the (already processed) siblings preceding it
+            element.clear()
+            while element.getprevious() is not None:
+                del element.getparent()[0]
+
+
+def _nation_blocks(stream, nations_per_block: int, read_size: int = 2**20):
+    """ Split the raw dump into blocks of complete <NATION> elements without parsing it """
+    tail = b""
+    block = []
+    count = 0
+    while data := stream.read(read_size):
+        tail += data
+        end = tail.rfind(b"</NATION>")
+        if end < 0:
+            continue
+        end += len(b"</NATION>")
+
+        complete, tail = tail[:end], tail[end:]
+        block.append(complete)
+        count += complete.count(b"</NATION>")
+
+        if count >= nations_per_block:
+            yield b"".join(block)
+            block = []
+            count = 0
+
+    if block:
+        yield b"".join(block)
+
+
+def _parse_block(block: bytes) -> list:
+    # the first block still contains the xml declaration and <NATIONS> opening tag
+    start = block.find(b"<NATION>")
+    parser = etree.XMLParser(huge_tree=True, recover=True)
+    root = etree.fromstring(b"<NATIONS>" + block[start:] + b"</NATIONS>", parser)
+    return [nation_record(element) for element in root.iter("NATION")]
+
+
+def _parsed_blocks(path: str, nations_per_block: int, workers: int):
+    """ Parse the blocks of a dump in separate processes, yielding the records of each block in order """
+    with _open(path) as f, ProcessPoolExecutor(max_workers=workers) as executor:
+        in_flight = deque()
+        for block in _nation_blocks(f, nations_per_block):
+            in_flight.append(executor.submit(_parse_block, block))
+            if len(in_flight) >= 2 * workers:
+                yield in_flight.popleft().result()
+        while in_flight:
+            yield in_flight.popleft().result()
+
+
+def iter_batches(path: str, batch_size: int = 10_000, workers: int = 1):
+    """
+    Iterate over the nations in a dump in lists of `batch_size` records (the last batch may be smaller).
+
+    With `workers > 1`, the dump is split into blocks of raw XML which are parsed in separate processes.
+    At most `2 * workers` blocks are in flight at once, so memory use stays bounded. The blocks are cut where
+    the reads end, so their records are regrouped into batches of exactly `batch_size`.
+    """
+    if workers <= 1:
+        records = iter_nations(path)
+    else:
+        records = (record for block in _parsed_blocks(path, batch_size, workers) for record in block)
+
+    batch = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+_census_columns = set(census_id_to_name.values())
+
+
+def _column_type(column: str, records: list, pa):
+    """ The type of a column in a batch, with null types where the batch tells nothing (see `_concrete_type`) """
+    values = [value for record in records if (value := record.get(column)) is not None]
+    if any(isinstance(value, list) for value in values):
+        # listed children, e.g. list<string> or list<struct<name, pic, cat, desc>> for policies
+        values = [value if isinstance(value, list) else [value] for value in values]
+        return pa.array(values).type
+    if column in numeric_fields or column.split(".")[0] in numeric_groups:
+        return pa.float64()
+    if column in _census_columns or column.startswith("census_"):
+        return pa.float64()
+    return pa.string() if values else pa.null()
+
+
+def _record_batch(records: list, schema, pa):
+    """ Convert records to a record batch, listing the values of list columns that are not lists """
+    list_columns = [field.name for field in schema if pa.types.is_list(field.type)]
+    for record in records:
+        for column in list_columns:
+            if (value := record.get(column)) is not None and not isinstance(value, list):
+                record[column] = [value]
+    return pa.RecordBatch.from_pylist(records, schema=schema)
+
+
+def _concrete_type(type, pa):
+    """ Replace the null types of columns (or children) that were never seen with a value by strings """
+    if pa.types.is_null(type):
+        return pa.string()
+    if pa.types.is_list(type):
+        return pa.list_(_concrete_type(type.value_type, pa))
+    if pa.types.is_struct(type):
+        return pa.struct([(field.name, _concrete_type(field.type, pa)) for field in type])
+    return type
+
+
+def _unify_schemas(schemas: list, pa):
+    """ The schema of all batches: a column that is a list in any batch is a list in every batch """
+    list_columns = {field.name for schema in schemas for field in schema if pa.types.is_list(field.type)}
+    schemas = [
+        pa.schema([
+            (field.name, pa.list_(field.type) if field.name in list_columns and not pa.types.is_list(field.type) else field.type)
+            for field in schema
+        ])
+        for schema in schemas
+    ]
+    schema = pa.unify_schemas(schemas, promote_options="permissive")
+    return pa.schema([(field.name, _concrete_type(field.type, pa)) for field in schema])
+
+
+def write_feather(source: str, destination: str, batch_size: int = 10_000, workers: int = 1):
+    """
+    Convert a dump to a Feather (Arrow IPC) file, written in record batches of `batch_size` nations.
+
+    Columns may only appear, or children only repeat (becoming lists), in later batches, so the dump is first
+    converted to temporary batches with a schema of their own (next to `destination`). These are then coerced
+    to the schema of all batches and written to `destination`.
+    Returns the number of nations written.
+    """
+    import pyarrow as pa # optional dependency
+
+    directory = os.path.dirname(os.path.abspath(destination))
+    with tempfile.TemporaryDirectory(prefix=".nations.", dir=directory) as tmp:
+        paths = []
+        schemas = []
+        total = 0
+        for records in iter_batches(source, batch_size=batch_size, workers=workers):
+            columns = {}
+            for record in records:
+                columns.update(dict.fromkeys(record))
+            schema = pa.schema([(column, _column_type(column, records, pa)) for column in columns])
+
+            paths.append(os.path.join(tmp, f"{len(paths)}.arrow"))
+            schemas.append(schema)
+            with pa.ipc.new_file(paths[-1], schema) as writer:
+                writer.write_batch(_record_batch(records, schema, pa))
+            total += len(records)
+            logger.info(f"Parsed {total} nations")
+
+        if not paths:
+            return 0
+
+        schema = _unify_schemas(schemas, pa)
+        written = 0
+        with pa.ipc.new_file(destination, schema) as writer:
+            for path in paths:
+                with pa.memory_map(path) as f:
+                    records = pa.ipc.open_file(f).get_batch(0).to_pylist()
+                writer.write_batch(_record_batch(records, schema, pa))
+                written += len(records)
+                logger.info(f"Wrote {written} nations to {destination}")
+
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert the NationStates nations dump to a Feather file")
+    parser.add_argument("source", help="the nations dump (.xml or .xml.gz)")
+    parser.add_argument("destination", help="where to write the Feather file")
+    parser.add_argument("--batch-size", type=int, default=10_000, help="number of nations per record batch")
+    parser.add_argument("--workers", type=int, default=1, help="number of processes used for parsing")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    total = write_feather(args.source, args.destination, batch_size=args.batch_size, workers=args.workers)
+    print(f"Wrote {total} nations to {args.destination}")
+
+
+if __name__ == "__main__":
+    main()
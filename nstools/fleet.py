@@ -0,0 +1,96 @@
+from nstools.nation import Nation
+from nstools.census_maximizer import CensusMaximizer, Predictor, Scorer
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from collections import deque
+import logging
+
+
+logger = logging.getLogger("fleet")
+
+
+class FleetMaximizer:
+    """
+    Runs a CensusMaximizer for many nations at once.
+
+    The nations should share one `RateLimitedClient` (e.g. all obtained through `api.nation(...)` of the same
+    `NationStatesAPI`), so they draw from a single rate limit budget. Each nation's run advances one issue at a time,
+    and nations take turns in round-robin order, so no nation can starve the others. Since several nations are in
+    flight at once, the total run time is bounded by the rate limit rather than by the sum of request latencies.
+
+    Attributes:
+    -----------
+    nations: list[Nation]
+        The nations to run the maximizer for, each nation (by name) only once
+    predictor: Predictor
+        The predictor shared by all nations
+    scorer: Scorer
+        The scorer shared by all nations
+    max_workers: int
+        The maximum number of nations that are being processed simultaneously
+    maximizer_kwargs: dict
+        Additional arguments for the CensusMaximizer of each nation (e.g. `update_every`)
+
+    Methods:
+    --------
+    run()
+        Answer the issues of all nations, yielding `(nation, issue, choice, initial_dict, new_dict, option_scores)`
+    """
+    def __init__(self, nations: list, predictor: Predictor, scorer: Scorer, max_workers: int = 8, **maximizer_kwargs):
+        # a nation listed twice would be advanced by two workers at once, answering the same issues twice
+        self.nations = []
+        names = set()
+        for nation in nations:
+            if (name := nation.name.lower().replace(" ", "_")) in names:
+                logger.warning(f"⚠️ {nation.name} is listed more than once, its issues are only answered once")
+                continue
+            names.add(name)
+            self.nations.append(nation)
+        self.predictor = predictor
+        self.scorer = scorer
+        self.max_workers = max_workers
+        self.maximizer_kwargs = maximizer_kwargs
+
+        self._runs = {}
+
+    def _step(self, nation: Nation):
+        """ Advance the run of a nation by one issue, returning None when it has no issues left """
+        if (run := self._runs.get(id(nation))) is None:
+            # creating the maximizer may load the nation, so it is done in the worker thread as well
+            run = self._runs[id(nation)] = CensusMaximizer(nation, self.predictor, self.scorer, **self.maximizer_kwargs).run()
+
+        return next(run, None)
+
+    def run(self):
+        queue = deque(self.nations)
+        in_flight = {}
+
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+
+        def fill():
+            while queue and len(in_flight) < self.max_workers:
+                nation = queue.popleft()
+                in_flight[executor.submit(self._step, nation)] = nation
+
+        try:
+            fill()
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    nation = in_flight.pop(future)
+                    try:
+                        record = future.result()
+                    except Exception as e:
+                        logger.error(f"❌ Stopping maximizer for {nation.name}: {e!r}")
+                        continue
+
+                    if record is None: # no issues left
+                        continue
+
+                    # the nation goes to the back of the queue, so every nation gets its turn
+                    queue.append(nation)
+                    yield (nation, *record)
+
+                fill()
+        finally:
+            self._runs.clear()
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,186 @@
+"""
+Lookahead over issue chains for the `CensusMaximizer`.
+
+Some options lead to a follow-up issue (the "leads to #N" results on Trotterdam). Greedily picking the best
+immediate outcome can miss a chain whose later issues are worth more, so `Lookahead` scores an option as its
+immediate score plus the discounted value of the best path through the issues it leads to, up to `depth` steps.
+
+Later issues are evaluated on the predicted state of the nation. Since predictors and scorers mostly depend on
+the policies, notables and WA status rather than on exact census scores, evaluations are memoized under a coarse
+signature of the state, so that the same chains are evaluated once across decisions, for as long as the `version`
+of the predictor doesn't change.
+"""
+from nstools.census_maximizer import Predictor, Scorer, OutcomePrediction, census_vector
+from nstools.nation import NationSnapshot, CensusView
+from collections import OrderedDict
+from array import array
+import numpy as np
+import logging
+
+
+logger = logging.getLogger("lookahead")
+
+
+def state_signature(nation_dict) -> tuple:
+    """ Coarse signature of a nation state: everything but the census scores """
+    return frozenset(nation_dict['policies']), frozenset(nation_dict['notables'] or ()), bool(nation_dict['wa'])
+
+
+def predicted_state(nation_dict, prediction: OutcomePrediction) -> NationSnapshot:
+    """ The (most likely) state of a nation after an outcome """
+    census = census_vector(nation_dict['census_data'], default=np.nan) + prediction.census_vector()
+    return NationSnapshot({
+        **nation_dict,
+        'census_data': CensusView(array('d', census.tolist())),
+        'policies': [policy for policy, p in prediction.policies.items() if p >= 0.5],
+        'notables': [notable for notable, p in prediction.notables.items() if p >= 0.5],
+        'wa': bool(nation_dict['wa']) and not prediction.resign_WA,
+    })
+
+
+class _FutureIssue:
+    """ Stand-in for an issue that has not been received yet, for the predictor """
+    __slots__ = ("id", "options")
+
+    def __init__(self, issue_id: int, options: list):
+        self.id = issue_id
+        self.options = {option: "" for option in options}
+
+
+class Lookahead:
+    """
+    Scores the options of an issue, taking the issues they lead to into account.
+
+    Options are expanded in order of their immediate score. If the scorer is `linear` (like a `NormalizedScorer`
+    without policy weights), an option is only expanded if its immediate score plus an upper bound on the value of
+    its chain can beat the best total found so far. The bound assumes the best option of every later issue is chosen,
+    scored on the current state, so it is only valid if the scores don't depend on the state; it also assumes the
+    predicted census changes don't depend on the state, as for Trotterdam and observed outcomes. Other scorers
+    expand every option, so the result is always exact.
+
+    Attributes
+    ----------
+    predictor : Predictor
+        Must have `options(issue_id)` and `leads_to(issue, option_id)` methods, like `TrotterdamPredictor`
+    scorer : Scorer
+        Scores the predicted outcomes
+    depth : int
+        The number of follow-up issues to look ahead (0 is greedy)
+    discount : float
+        The weight of the value of a follow-up issue, as it may not be received (soon)
+    memo_size : int
+        The maximal number of memoized evaluations
+    predict_options : callable
+        Predicts several options of an issue, like `Predictor.predict_options` (the default), e.g. to predict them
+        concurrently as `CensusMaximizer` does with an executor
+    stats : dict
+        The number of `evaluations` and memo `hits`, and the number of `pruned` options
+    """
+    def __init__(
+        self, predictor: Predictor, scorer: Scorer, depth: int = 2, discount: float = 0.9, memo_size: int = 100_000,
+        predict_options = None,
+    ):
+        if not (hasattr(predictor, "leads_to") and hasattr(predictor, "options")):
+            raise TypeError(f"{type(predictor).__name__} does not know which issues lead to which (no leads_to method)")
+
+        self.predictor = predictor
+        self.scorer = scorer
+        self.depth = depth
+        self.discount = discount
+        self.memo_size = memo_size
+        self.predict_options = predict_options if predict_options is not None else predictor.predict_options
+        self.stats = {'evaluations': 0, 'hits': 0, 'pruned': 0}
+
+        self._memo = OrderedDict() # (issue, option, signature) -> (score, prediction)
+        self._bounds = {} # (issue, depth, signature) -> upper bound of the value of the issue
+        self._version = None # of the predictor, when the memoized evaluations were made
+
+    def _remember(self, key, value):
+        self._memo[key] = value
+        if len(self._memo) > self.memo_size:
+            self._memo.popitem(last=False)
+        return value
+
+    def _evaluate(self, state, signature, issue, option_ids) -> dict:
+        """ Immediate (score, prediction) of some options, memoized by the coarse state signature """
+        values = {}
+        for option_id in option_ids:
+            if (value := self._memo.get((issue.id, option_id, signature))) is not None:
+                self.stats['hits'] += 1
+                values[option_id] = value
+
+        # the options that are not memoized are predicted at once, so they can be predicted concurrently
+        if missing := [option_id for option_id in option_ids if option_id not in values]:
+            self.stats['evaluations'] += len(missing)
+            for option_id, prediction in self.predict_options(state, issue, missing).items():
+                score = self.scorer.score_prediction(state, prediction)
+                values[option_id] = self._remember((issue.id, option_id, signature), (score, prediction))
+
+        return {option_id: values[option_id] for option_id in option_ids}
+
+    def _leads_to(self, issue, option_id):
+        try:
+            return self.predictor.leads_to(issue, option_id)
+        except Exception as e:
+            logger.debug(f"No chain information for issue {issue.id}: {e!r}")
+            return None
+
+    def _future_issue(self, issue_id):
+        try:
+            return _FutureIssue(issue_id, self.predictor.options(issue_id))
+        except Exception as e:
+            logger.debug(f"Can't look ahead to issue {issue_id}: {e!r}")
+            return None
+
+    def _bound(self, state, signature, issue_id, depth) -> float:
+        """ Upper bound of the value of a future issue (at least 0, as it can be dismissed) """
+        key = (issue_id, depth, signature)
+        if (bound := self._bounds.get(key)) is not None:
+            return bound
+
+        bound = 0.0
+        if (issue := self._future_issue(issue_id)) is not None:
+            for option_id, (score, _) in self._evaluate(state, signature, issue, list(issue.options)).items():
+                if depth > 0 and (next_id := self._leads_to(issue, option_id)) is not None:
+                    score += self.discount * self._bound(state, signature, next_id, depth - 1)
+                bound = max(bound, score)
+
+        if len(self._bounds) > self.memo_size:
+            self._bounds.clear()
+        self._bounds[key] = bound
+        return bound
+
+    def _option_values(self, state, issue, depth) -> dict:
+        """ The value of every option of an issue, with branch and bound over the chains """
+        signature = state_signature(state)
+        immediate = self._evaluate(state, signature, issue, list(issue.options))
+        values = {option_id: score for option_id, (score, _) in immediate.items()}
+        if depth == 0:
+            return values
+
+        best = 0.0 # dismissing is always possible
+        for option_id in sorted(immediate, key=lambda o: immediate[o][0], reverse=True):
+            score, prediction = immediate[option_id]
+            if score == -float('inf') or (next_id := self._leads_to(issue, option_id)) is None:
+                best = max(best, score)
+                continue
+
+            if getattr(self.scorer, "linear", False) and score + self.discount * self._bound(state, signature, next_id, depth - 1) <= best:
+                self.stats['pruned'] += 1 # can't beat the best option, keep its immediate score
+                continue
+
+            if (next_issue := self._future_issue(next_id)) is not None:
+                next_values = self._option_values(predicted_state(state, prediction), next_issue, depth - 1)
+                values[option_id] = score + self.discount * max([0.0, *next_values.values()])
+            best = max(best, values[option_id])
+
+        return values
+
+    def option_scores(self, nation_dict, issue) -> dict:
+        """ Score every option of the issue (including dismissing it, as -1) """
+        # evaluations of an earlier version of the predictor may be outdated (e.g. after more outcomes were observed)
+        if (version := getattr(self.predictor, "version", None)) is None or version != self._version:
+            self._memo.clear()
+            self._bounds.clear()
+        self._version = version
+        return {-1: 0, **self._option_values(nation_dict, issue, self.depth)}
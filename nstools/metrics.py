@@ -0,0 +1,250 @@
+"""
+Per-request instrumentation of the API clients.
+
+Every callable in `client.hooks` (of a `RateLimitedClient` or `AsyncRateLimitedClient`) is called with a
+`RequestEvent` after each response, including 429s that are retried. When no hooks are registered, a request only
+does a few extra clock reads. `Metrics` is a hook aggregating the events into counters and latency histograms:
+
+    metrics = Metrics()
+    api.client.add_hook(metrics)
+    ...
+    print(metrics.summary()["time"]) # where the time went: waiting on the limiter, the network or parsing
+"""
+from bisect import bisect_left
+import threading
+import logging
+import time
+
+
+logger = logging.getLogger("metrics")
+
+# upper bounds (in seconds) of the histogram buckets, from 0.1 ms to about 100 s
+BUCKETS = tuple(0.0001 * 2 ** i for i in range(21))
+
+
+class RequestEvent:
+    """
+    The measurements of one request (one HTTP round trip, so a retried request has several events).
+
+    Attributes
+    ----------
+    params : dict
+        The query parameters of the request
+    status : int
+        The HTTP status code of the response
+    retries : int
+        The number of earlier attempts of this request (after 429 responses)
+    bytes : int
+        The size of the response body
+    wait : float
+        Seconds spent waiting on the rate limiter
+    latency : float
+        Seconds from sending the request until the response was received
+    unescape : float
+        Seconds spent unescaping HTML entities in the response
+    parse : float
+        Seconds spent parsing the response (0 if it was not parsed, e.g. on errors)
+    time : float
+        When the response was received (unix time)
+    """
+    __slots__ = ("params", "status", "retries", "bytes", "wait", "latency", "unescape", "parse", "time")
+
+    def __init__(self, params, status, retries, bytes, wait, latency, unescape, parse):
+        self.params = params
+        self.status = status
+        self.retries = retries
+        self.bytes = bytes
+        self.wait = wait
+        self.latency = latency
+        self.unescape = unescape
+        self.parse = parse
+        self.time = time.time()
+
+    @property
+    def kind(self) -> str:
+        """ "nation", "region", "world" or "command" """
+        if 'c' in self.params:
+            return "command"
+        for kind in ("nation", "region"):
+            if kind in self.params:
+                return kind
+        return "world"
+
+    @property
+    def shards(self) -> tuple:
+        """ The requested shards (or the command), sorted """
+        if 'c' in self.params:
+            return (str(self.params['c']).lower(),)
+        query = self.params.get('q', "")
+        if not isinstance(query, str): # a list of shards, see utils.format_for_query
+            query = "+".join(str(shard) for shard in query)
+        return tuple(sorted(shard.lower() for shard in query.split("+") if shard))
+
+    def __repr__(self):
+        return (
+            f"RequestEvent({self.kind} {'+'.join(self.shards)}: {self.status}, {self.bytes} bytes, "
+            f"wait {self.wait * 1000:.1f} ms, latency {self.latency * 1000:.1f} ms, "
+            f"unescape {self.unescape * 1000:.2f} ms, parse {self.parse * 1000:.2f} ms, {self.retries} retries)"
+        )
+
+
+class Hooks:
+    """ Mixin for the clients, calling the registered hooks with a `RequestEvent` for every response """
+    def add_hook(self, hook):
+        """ Call `hook(event)` after every request; hooks are called in the requesting thread, so keep them fast """
+        self.hooks = [*self.hooks, hook] # copied, so requests in flight can iterate over the old list
+
+    def remove_hook(self, hook):
+        self.hooks = [h for h in self.hooks if h is not hook]
+
+    def _report(self, params, status, retries, nbytes, start, sent, received, unescaped, parsed):
+        event = RequestEvent(
+            params, status, retries, nbytes,
+            wait=sent - start, latency=received - sent, unescape=unescaped - received, parse=parsed - unescaped,
+        )
+        for hook in self.hooks:
+            try:
+                hook(event)
+            except Exception as e: # instrumentation should never break requests
+                logger.warning(f"⚠️ Request hook {hook!r} failed: {e!r}")
+
+
+class Histogram:
+    """
+    Counts of values (seconds) in exponential buckets, see `BUCKETS`.
+
+    Attributes
+    ----------
+    counts : list[int]
+        The number of values per bucket, with a last bucket for values above the largest bound
+    count : int
+        The number of values
+    sum : float
+        The sum of the values
+    """
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def add(self, value: float):
+        self.counts[bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        """ An upper bound of the q-th percentile (0 <= q <= 100), the bound of its bucket """
+        if self.count == 0:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for bound, count in zip(BUCKETS, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float('inf')
+
+
+class Metrics:
+    """
+    A hook aggregating `RequestEvent`s into counters and histograms. Safe to share between clients and threads.
+
+    Attributes
+    ----------
+    requests : int
+        The number of responses (including retried ones)
+    statuses : dict
+        The number of responses by status code
+    retries : int
+        The number of retried requests
+    bytes : int
+        The total size of the response bodies
+    shards : dict
+        The number of requests by shard (or command)
+    histograms : dict[str, Histogram]
+        Histograms of the `wait`, `latency`, `unescape` and `parse` times
+    """
+    fields = ("wait", "latency", "unescape", "parse")
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.statuses = {}
+            self.retries = 0
+            self.bytes = 0
+            self.shards = {}
+            self.histograms = {field: Histogram() for field in self.fields}
+
+    def __call__(self, event: RequestEvent):
+        with self._lock:
+            self.requests += 1
+            self.statuses[event.status] = self.statuses.get(event.status, 0) + 1
+            self.retries += event.retries > 0
+            self.bytes += event.bytes
+            for shard in event.shards:
+                self.shards[shard] = self.shards.get(shard, 0) + 1
+            for field in self.fields:
+                self.histograms[field].add(getattr(event, field))
+
+    def summary(self) -> dict:
+        """
+        The counters, the mean, p50, p95 and p99 of each time, and the share of the total time spent
+        waiting on the limiter, on the network and on unescaping and parsing (CPU).
+        """
+        with self._lock:
+            totals = {field: histogram.sum for field, histogram in self.histograms.items()}
+            total = sum(totals.values()) or 1.0
+            return {
+                'requests': self.requests,
+                'statuses': dict(self.statuses),
+                'retries': self.retries,
+                'bytes': self.bytes,
+                'shards': dict(self.shards),
+                'times': {
+                    field: {
+                        'mean': histogram.mean,
+                        'p50': histogram.percentile(50),
+                        'p95': histogram.percentile(95),
+                        'p99': histogram.percentile(99),
+                    }
+                    for field, histogram in self.histograms.items()
+                },
+                'time': {
+                    'limiter': totals['wait'] / total,
+                    'network': totals['latency'] / total,
+                    'cpu': (totals['unescape'] + totals['parse']) / total,
+                },
+            }
+
+    def prometheus(self, prefix: str = "nstools") -> str:
+        """ The metrics in the Prometheus text exposition format """
+        with self._lock:
+            lines = [
+                f"# TYPE {prefix}_requests_total counter",
+                *(f'{prefix}_requests_total{{status="{status}"}} {count}' for status, count in sorted(self.statuses.items())),
+                f"# TYPE {prefix}_retries_total counter",
+                f"{prefix}_retries_total {self.retries}",
+                f"# TYPE {prefix}_response_bytes_total counter",
+                f"{prefix}_response_bytes_total {self.bytes}",
+                f"# TYPE {prefix}_shard_requests_total counter",
+                *(f'{prefix}_shard_requests_total{{shard="{shard}"}} {count}' for shard, count in sorted(self.shards.items())),
+            ]
+            for field, histogram in self.histograms.items():
+                name = f"{prefix}_{field}_seconds"
+                lines.append(f"# TYPE {name} histogram")
+                cumulative = 0
+                for bound, count in zip(BUCKETS, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{le="{bound:g}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{le="+Inf"}} {histogram.count}')
+                lines.append(f"{name}_sum {histogram.sum}")
+                lines.append(f"{name}_count {histogram.count}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,408 @@
+"""
+A local stand-in for the NationStates API, replaying recorded responses, for tests and load tests of the clients.
+
+The server enforces a rate limit like the real API and sends the same rate limit headers (`RateLimit-Policy`,
+`RateLimit-Remaining`, `RateLimit-Reset` and `Retry-After`), so the limiters of `RateLimitedClient` and
+`AsyncRateLimitedClient` are exercised as against the real server. Latency and 429/524 errors can be injected.
+
+Responses are looked up by the kind of request (nation, region, world or command) and its shards, from the most
+to the least specific key, so one recorded nation response serves requests for any nation:
+
+    with MockNationStates("benchmarks/fixtures/recorded", policy="50;w=30", latency=0.05) as server:
+        api = NationStatesAPI("load test", base_url=server.url)
+        ...
+
+The server also serves the happenings Server-Sent Events streams (at `sse_url`), for `nstools.sse.HappeningsStream`.
+Happenings are added with `publish`, and a stream resumes after the `Last-Event-ID` the client sends; with
+`stream_limit`, the server closes each stream after that many events, to test reconnecting:
+
+    with MockNationStates(stream_limit=2) as server:
+        server.publish({"str": "@@testlandia@@ relocated from %%a%% to %%b%%.", "time": 1700000000})
+        stream = HappeningsStream("load test", buckets=["move"], base_url=server.sse_url)
+
+In record mode, requests are forwarded to the real API (or any `upstream`) and the responses are saved to the
+directory, to be replayed later. From the command line:
+
+    python -m nstools.mockserver DIRECTORY [--port 8080] [--policy "50;w=30"] [--latency 0.05] [--record]
+"""
+from nstools.ratelimit import parse_policy
+from nstools.nsapi import base_url as api_url
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qsl, urlsplit
+import threading
+import argparse
+import logging
+import random
+import json
+import math
+import time
+import os
+
+
+logger = logging.getLogger("mockserver")
+
+_kinds = ("nation", "region")
+
+_error_pages = {
+    404: "<h1>Not Found</h1><p>Error: no recorded response for this request.</p>",
+    429: "<h1>Too Many Requests</h1><p>Error: you have exceeded the API rate limit.</p>",
+    524: "<h1>A timeout occurred</h1><p>Error: the server took too long to respond.</p>",
+}
+
+
+def request_keys(params: dict) -> list:
+    """
+    The keys under which a response to a request may be recorded, from the most to the least specific,
+    e.g. ["nation=testlandia?q=census+policies", "nation?q=census+policies", "nation=testlandia", "nation"].
+    Commands are keyed by the command only (e.g. "c=issue").
+    """
+    if 'c' in params:
+        return [f"c={params['c'].lower()}"]
+
+    kind, name = "world", None
+    for k in _kinds:
+        if k in params:
+            kind, name = k, params[k].lower().replace(" ", "_")
+            break
+
+    keys = []
+    if shards := params.get('q'):
+        shards = "+".join(sorted(shards.lower().replace(" ", "+").split("+"))) # "+" may be decoded as a space
+        if name is not None:
+            keys.append(f"{kind}={name}?q={shards}")
+        keys.append(f"{kind}?q={shards}")
+    if name is not None:
+        keys.append(f"{kind}={name}")
+    keys.append(kind)
+    return keys
+
+
+class MockNationStates:
+    """
+    A threaded HTTP server replaying recorded responses of the NationStates API.
+
+    Attributes
+    ----------
+    responses : dict
+        The recorded response bodies (bytes) by request key (see `request_keys`)
+    directory : str
+        The directory responses are loaded from, and recorded to in record mode (an `index.json` with files)
+    policy : str
+        The enforced rate limit, formatted as "{requests};w={seconds}"; a short window makes 429s cheap to test
+    latency : float
+        Seconds added to every response, plus a uniformly random `jitter`
+    error_rates : dict
+        The probability of answering a request with an error, by status code (429 or 524)
+    upstream : str
+        In record mode, the API requests are forwarded to (None to replay)
+    happenings : list
+        The (id, data) of the published happenings, served by the happenings streams
+    stream_limit : int
+        The number of happenings sent per stream connection, after which the server closes it (None for no limit)
+    keep_alive : float
+        Seconds between keep-alive comments on an idle stream
+    line_ending : str
+        The line ending of the streams, "\n" or e.g. "\r\n" as some servers send
+    streams : list
+        The (buckets, Last-Event-ID) of every stream connection
+    stats : dict
+        The number of requests answered, by status code
+    """
+    def __init__(
+        self, directory: str = None, responses: dict = None, policy: str = "50;w=30", latency: float = 0,
+        jitter: float = 0, error_rates: dict = None, host: str = "127.0.0.1", port: int = 0, upstream: str = None,
+        stream_limit: int = None, keep_alive: float = 15, line_ending: str = "\n",
+    ):
+        self.directory = directory
+        self.responses = {}
+        self.policy = policy
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rates = dict(error_rates) if error_rates is not None else {}
+        self.upstream = upstream
+        self.happenings = []
+        self.stream_limit = stream_limit
+        self.keep_alive = keep_alive
+        self.line_ending = line_ending
+        self.streams = []
+        self.stats = {}
+
+        if directory is not None and os.path.exists(os.path.join(directory, "index.json")):
+            self.load(directory)
+        if responses is not None:
+            self.responses.update(responses)
+
+        self._lock = threading.Lock()
+        self._injected = [] # status codes of the next responses
+        self._window_start = None
+        self._window_count = 0
+        self._session = None
+        self._thread = None
+        self._published = threading.Condition(self._lock)
+        self._stopping = threading.Event()
+
+        server = self
+        class Handler(_Handler):
+            mock = server
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+
+    @property
+    def url(self) -> str:
+        """ The URL to pass as `base_url` to the clients """
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/cgi-bin/api.cgi"
+
+    @property
+    def sse_url(self) -> str:
+        """ The URL to pass as `base_url` to `HappeningsStream` """
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/api"
+
+    def start(self):
+        """ Serve requests from a background thread """
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self.server.serve_forever, name="mockserver", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stopping.set() # ends the open streams
+        self.server.shutdown()
+        self.server.server_close()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def load(self, directory: str):
+        """ Load the responses recorded in a directory """
+        with open(os.path.join(directory, "index.json")) as f:
+            index = json.load(f)
+        for key, file in index.items():
+            with open(os.path.join(directory, file), "rb") as f:
+                self.responses[key] = f.read()
+
+    def save(self, directory: str):
+        """ Save the responses to a directory, one file per response plus an `index.json` """
+        os.makedirs(directory, exist_ok=True)
+        index = {}
+        for i, (key, body) in enumerate(sorted(self.responses.items())):
+            index[key] = f"{i:04d}.xml"
+            with open(os.path.join(directory, index[key]), "wb") as f:
+                f.write(body)
+        tmp_path = os.path.join(directory, f"index.{os.getpid()}.tmp.json")
+        with open(tmp_path, "w") as f:
+            json.dump(index, f, indent=1)
+        os.replace(tmp_path, os.path.join(directory, "index.json"))
+
+    def publish(self, payload, indent: int = None) -> str:
+        """
+        Send a happening to the streams, returning its id. The payload is serialized as JSON, e.g.
+        {"str": "@@testlandia@@ relocated from %%a%% to %%b%%.", "time": 1700000000}.
+        With an `indent`, the JSON spans several lines, which are sent as several data lines of one event.
+        """
+        with self._published:
+            event_id = str(len(self.happenings) + 1)
+            self.happenings.append((event_id, json.dumps(payload, indent=indent)))
+            self._published.notify_all()
+        return event_id
+
+    def _next_happenings(self, position: int, timeout: float) -> list:
+        """ The happenings after `position`, waiting up to `timeout` seconds for one to be published """
+        with self._published:
+            if position >= len(self.happenings):
+                self._published.wait(timeout)
+            return self.happenings[position:]
+
+    def inject(self, status: int, count: int = 1):
+        """ Answer the next `count` requests with an error (429 or 524) """
+        with self._lock:
+            self._injected.extend([status] * count)
+
+    def reset(self):
+        """ Start a new rate limit window and clear the statistics """
+        with self._lock:
+            self._window_start = None
+            self._window_count = 0
+            self.stats = {}
+
+    def _take(self, limit: int, window: int) -> tuple:
+        """ Count a request in the rate limit window, returning (injected status, remaining, seconds until reset) """
+        with self._lock:
+            now = time.monotonic()
+            if self._window_start is None or now >= self._window_start + window:
+                self._window_start, self._window_count = now, 0
+            self._window_count += 1
+
+            injected = self._injected.pop(0) if self._injected else None
+            return injected, limit - self._window_count, max(1, math.ceil(self._window_start + window - now))
+
+    def _count(self, status: int):
+        with self._lock:
+            self.stats[status] = self.stats.get(status, 0) + 1
+
+    def respond(self, params: dict, request_headers) -> tuple:
+        """ The (status, headers, body) of the response to a request """
+        if self.upstream is not None:
+            return self._record(params, request_headers)
+
+        if self.latency or self.jitter:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+
+        limit, window = parse_policy(self.policy)
+        injected, remaining, reset = self._take(limit, window)
+        headers = {
+            'RateLimit-Policy': self.policy,
+            'RateLimit-Limit': str(limit),
+            'RateLimit-Remaining': str(max(0, remaining)),
+            'RateLimit-Reset': str(reset),
+        }
+
+        if injected is None:
+            for status, rate in self.error_rates.items():
+                if random.random() < rate:
+                    injected = status
+                    break
+        if injected is None and remaining < 0:
+            injected = 429
+
+        if injected is not None:
+            if injected == 429:
+                headers['Retry-After'] = str(reset)
+            return injected, headers, _error_pages.get(injected, "").encode("utf-8")
+
+        for key in request_keys(params):
+            if (body := self.responses.get(key)) is not None:
+                break
+        else:
+            return 404, headers, _error_pages[404].encode("utf-8")
+
+        if 'X-Password' in request_headers:
+            headers['X-Pin'] = "1234567890"
+        return 200, headers, body
+
+    def _record(self, params: dict, request_headers) -> tuple:
+        """ Forward a request upstream and record a successful response """
+        import requests
+
+        if self._session is None:
+            self._session = requests.Session()
+
+        forwarded = {k: v for k, v in request_headers.items() if k in ("User-Agent", "X-Password", "X-Autologin", "X-Pin")}
+        response = self._session.get(self.upstream, params=params, headers=forwarded)
+        headers = {
+            k: v for k, v in response.headers.items()
+            if k.lower().startswith("ratelimit") or k.lower() in ("retry-after", "x-pin", "x-autologin")
+        }
+
+        if response.status_code == 200:
+            with self._lock:
+                # the response also serves less specific requests, unless one was recorded for them already
+                keys = request_keys(params)
+                self.responses[keys[0]] = response.content
+                for key in keys[1:]:
+                    self.responses.setdefault(key, response.content)
+                if self.directory is not None:
+                    self.save(self.directory)
+        return response.status_code, headers, response.content
+
+
+class _Handler(BaseHTTPRequestHandler):
+    mock: MockNationStates
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True # the headers and body are written separately, don't delay the body
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path.startswith("/api/"):
+            return self._stream(url.path[len("/api/"):])
+
+        params = dict(parse_qsl(url.query, keep_blank_values=True))
+        status, headers, body = self.mock.respond(params, self.headers)
+        self.mock._count(status)
+
+        self.send_response(status)
+        self.send_header("Content-Type", "text/xml; charset=utf-8" if status == 200 else "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, buckets: str):
+        """ Serve the happenings after the Last-Event-ID of the request, as Server-Sent Events """
+        mock = self.mock
+        last_event_id = self.headers.get("Last-Event-ID")
+        with mock._lock:
+            mock.streams.append((buckets, last_event_id))
+            # the ids are positions in `happenings`, see `publish`
+            position = int(last_event_id) if last_event_id and last_event_id.isdigit() else 0
+        mock._count(200)
+
+        self.close_connection = True # the stream has no length, it ends when the connection is closed
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream; charset=utf-8")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        sent = 0
+        last_write = time.monotonic()
+        try:
+            while not mock._stopping.is_set():
+                for event_id, data in mock._next_happenings(position, timeout=min(mock.keep_alive, 0.5)):
+                    if mock.stream_limit is not None and sent >= mock.stream_limit:
+                        return
+                    eol = mock.line_ending
+                    lines = "".join(f"data: {line}{eol}" for line in data.split("\n"))
+                    self.wfile.write(f"id: {event_id}{eol}{lines}{eol}".encode("utf-8"))
+                    position += 1
+                    sent += 1
+                    last_write = time.monotonic()
+                if mock.stream_limit is not None and sent >= mock.stream_limit:
+                    return
+                if time.monotonic() - last_write >= mock.keep_alive:
+                    self.wfile.write(f": keep-alive{mock.line_ending * 2}".encode("utf-8"))
+                    last_write = time.monotonic()
+        except (BrokenPipeError, ConnectionResetError): # the client disconnected
+            pass
+
+    def log_message(self, format, *args):
+        logger.debug(format % args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve recorded NationStates API responses locally")
+    parser.add_argument("directory", help="directory with the recorded responses")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--policy", default="50;w=30", help="enforced rate limit")
+    parser.add_argument("--latency", type=float, default=0, help="seconds added to every response")
+    parser.add_argument("--jitter", type=float, default=0, help="maximal random seconds added to the latency")
+    parser.add_argument("--error-rate", type=float, nargs=2, action="append", metavar=("STATUS", "RATE"), default=[])
+    parser.add_argument("--record", action="store_true", help="forward requests to the real API and record the responses")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = MockNationStates(
+        args.directory, policy=args.policy, latency=args.latency, jitter=args.jitter,
+        error_rates={int(status): rate for status, rate in args.error_rate},
+        host=args.host, port=args.port, upstream=api_url if args.record else None,
+    )
+    logger.info(f"Serving {len(server.responses)} responses at {server.url}")
+    try:
+        server.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,125 @@
 # import nationstates as ns
 from nstools import nsapi
-from nstools.utils import census_id_to_name, census_ids
+from nstools.parser import parse_response
+from nstools.utils import census_ids, census_names
+from collections.abc import Mapping
+from types import MappingProxyType
+from array import array
 import time
+import sys
+
+
+# position of each census scale in the census arrays, which are ordered like `utils.census_ids`
+_census_position = {census_name: i for i, census_name in enumerate(census_names)}
+_census_id_position = {census_id: i for i, census_id in enumerate(census_ids)}
+
+
+def _intern(strings) -> list:
+    """ Intern policy/notable names, so that the nations holding them share one copy """
+    return [sys.intern(s) for s in strings]
+
+
+class CensusView(Mapping):
+    """
+    Read-only mapping from census names to scores, backed by an `array('d')` ordered like `utils.census_ids`.
+
+    Missing scores are stored as NaN and returned as None, like the API does for young nations.
+    """
+    __slots__ = ("_scores",)
+
+    def __init__(self, scores: array):
+        self._scores = scores
+
+    @classmethod
+    def from_mapping(cls, census: Mapping):
+        """ Create a view from a mapping of census names to scores """
+        scores = array('d', [float('nan')]) * len(census_names)
+        for census_name, score in census.items():
+            scores[_census_position[census_name]] = score if score is not None else float('nan')
+        return cls(scores)
+
+    def __getitem__(self, census_name):
+        score = self._scores[_census_position[census_name]]
+        return score if score == score else None # NaN is the only value not equal to itself
+
+    def __iter__(self):
+        return iter(census_names)
+
+    def __len__(self):
+        return len(self._scores)
+
+    def __repr__(self):
+        return f"CensusView({dict(self)!r})"
+
+    def vector(self):
+        """ The scores as a read-only numpy array (without copying), with NaN for missing scores """
+        import numpy as np
+        vector = np.frombuffer(self._scores, dtype=float)
+        vector.flags.writeable = False
+        return vector
+
+
+def _freeze(value):
+    """ Read-only shallow copy of a value of a nation dictionary """
+    if isinstance(value, CensusView): # never modified in place, see Nation.census_data
+        return value
+    if isinstance(value, (dict, MappingProxyType)):
+        return MappingProxyType(dict(value))
+    if isinstance(value, list):
+        return tuple(value)
+    return value
+
+
+def _thaw(value):
+    """ Inverse of `_freeze` """
+    if isinstance(value, (MappingProxyType, CensusView)):
+        return dict(value)
+    if isinstance(value, tuple):
+        return list(value)
+    return value
+
+
+class NationSnapshot(Mapping):
+    """
+    A read-only view of the state of a nation at one point in time, as returned by `Nation.snapshot()`.
+
+    It has the same keys as `Nation.dict()`, but dictionaries are mapping proxies and lists are tuples,
+    so a single snapshot can be shared by predictors and scorers without copying it.
+    Use `dict(snapshot)` (or `snapshot.dict()` for mutable values as well) to get a regular dictionary.
+    """
+    __slots__ = ("_data",)
+
+    def __init__(self, data: dict):
+        object.__setattr__(self, "_data", {key: _freeze(value) for key, value in data.items()})
+
+    def __setattr__(self, name, value):
+        raise AttributeError("NationSnapshot is read-only")
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __iter__(self):
+        return iter(self._data)
+
+    def __len__(self):
+        return len(self._data)
+
+    def __repr__(self):
+        return f"NationSnapshot({self._data.get('name')!r}, last_updated={self._data.get('last_updated')!r})"
+
+    # snapshots are immutable, so copies can share the original
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return NationSnapshot, (self.dict(),)
+
+    def dict(self) -> dict:
+        """ A mutable copy of the snapshot, like `Nation.dict()` """
+        return {key: _thaw(value) for key, value in self._data.items()}
 
 
 class Nation:
@@ -18,8 +136,8 @@ class Nation:
         The time at which the data was last updated
     founded: int
         The time at which the nation was founded
-    census_data: dict
-        A dictionary containing the census data for the nation
+    census_data: CensusView
+        A read-only mapping containing the census data for the nation (stored compactly as an array of scores)
     policies: list
         A list of the nation's policies
     sensibilities: list
@@ -36,13 +154,28 @@ class Nation:
         Whether the nation is a WA member
     issues: list[Issue]
         A list of the nation's issues
+    next_issue_time: int
+        The time at which the nation will receive its next issue (only known if the password is given)
     
     Methods:
     --------
     update()
         Load the nation's information from the API
+    update_issues()
+        Load only the nation's issues and next issue time
+    apply_issue_result(result)
+        Patch the nation's information with the result of answering an issue
+    dict()
+        The nation's information as a dictionary
+    snapshot()
+        The nation's information as a read-only `NationSnapshot`
     """
 
+    __slots__ = (
+        "api", "name", "last_updated", "founded", "_census", "policies", "sensibilities",
+        "notables", "sectors", "government", "deaths", "wa", "issues", "next_issue_time",
+    )
+
     def __init__(self, nation_api: nsapi.NationAPI, load: bool = True):
         self.api = nation_api
         self.name = nation_api.name
@@ -51,6 +184,7 @@ class Nation:
             self.update()
             if self.api.password is None:
                 self.issues = []
+                self.next_issue_time = None
         else:
             self.last_updated = None
             self.founded = None
@@ -63,6 +197,21 @@ class Nation:
             self.deaths = None
             self.wa = None
             self.issues = []
+            self.next_issue_time = None
+
+    @property
+    def census_data(self):
+        return CensusView(self._census) if self._census is not None else None
+
+    @census_data.setter
+    def census_data(self, census: Mapping):
+        # a new array is created on every change, so views obtained earlier keep the previous state
+        if census is None:
+            self._census = None
+        elif isinstance(census, CensusView):
+            self._census = census._scores
+        else:
+            self._census = CensusView.from_mapping(census)._scores
 
     def update(self):
         """ Load nation information """
@@ -70,57 +219,70 @@ class Nation:
 
         shards = ["foundedtime", "census", "policies", "sensibilities", "notables", "sectors", "govt", "deaths", "wa"]
         if self.api.password is not None:
-            shards.append("issues")
+            shards += ["issues", "nextissuetime"]
     
-        data = self.api.shards(
+        data = self.api.parsed_shards(
             shards,
             scale=census_ids, mode="score"
         )
-        
-        self.founded = int(data[0])
-
-        self.census_data = {
-            census_id_to_name[int(scale['@id'])]: float(scale['SCORE']) if scale['SCORE'] != None else None
-            # if a nation is young, the api will sometimes respond with "None" instead of a score
-            # especially for world assembly endorsements
-            for scale in data[1]['SCALE']
-        }
 
-        if isinstance(data[2]['POLICY'], list):#
-            self.policies = [pol['NAME'] for pol in data[2]['POLICY']]
-        else:
-            self.policies = [data[2]['POLICY']['NAME']]
-        
-        self.sensibilities = [s.strip() for s in data[3].split(",")]
+        self.founded = data[0]
 
-        if isinstance(data[4]['NOTABLE'], list):
-            self.notables = data[4]['NOTABLE']
-        else:
-            self.notables = [data[4]['NOTABLE']]
-        
-        self.sectors = {k: float(v) for k, v in data[5].items()}
-        self.government = {k: float(v) for k, v in data[6].items()}
-
-        if isinstance(data[7]['CAUSE'], list):
-            self.deaths = {
-                cause['@type'] : float(cause['#text'])
-                for cause in data[7]['CAUSE']
-            }
-        else:
-            self.deaths = {
-                data[7]['CAUSE']['@type']: float(data[7]['CAUSE']['#text'])
-            }
+        # if a nation is young, the api will sometimes respond with "None" instead of a score
+        # especially for world assembly endorsements, which is stored as NaN
+        scores = array('d', [float('nan')]) * len(census_ids)
+        for census_id, score in data[1].items():
+            if score is not None and (position := _census_id_position.get(census_id)) is not None:
+                scores[position] = score
+        self._census = scores
 
+        self.policies = _intern(data[2])
+        self.sensibilities = _intern(s.strip() for s in data[3].split(","))
+        self.notables = _intern(data[4])
+        self.sectors = data[5]
+        self.government = data[6]
+        self.deaths = data[7]
         self.wa = data[8] in ("WA Member", "WA Delegate")
 
         if self.api.password is not None:
-            if (issues_response := data[9]) is None:
-                self.issues = []
-            elif isinstance(issues_response['ISSUE'], dict):
-                self.issues = [Issue(self, issues_response['ISSUE'])]
-            else:
-                self.issues = [Issue(self, issue) for issue in issues_response['ISSUE']]
+            self.issues = [Issue(self, issue) for issue in data[9]]
+            self.next_issue_time = data[10]
+
+    def update_issues(self) -> list:
+        """
+        Load only the nation's issues and the time of its next issue (one small request, see `nstools.scheduler`),
+        returning the issues. Requires the nation's password.
+        """
+        issues, self.next_issue_time = self.api.parsed_shards(["issues", "nextissuetime"])
+        self.issues = [Issue(self, issue) for issue in issues]
+        return self.issues
+
+    def apply_issue_result(self, result: dict) -> bool:
+        """
+        Patch the nation with the result of answering an issue (see `Issue.answer`), instead of requesting
+        all shards again.
 
+        The result only reports census scores and policies, so the other attributes (notables, sectors, government,
+        deaths and WA status) may be outdated until the next `update()`.
+        Returns False, without changing anything, if the result is incomplete; an `update()` is needed then.
+        """
+        if not result['ok'] or not result['has_rankings'] or self.census_data is None:
+            return False
+
+        # new objects are created rather than modified in place, like in update(),
+        # so that dictionaries obtained earlier through dict() keep the previous state
+        scores = array('d', self._census)
+        for census_id, score in result['rankings'].items():
+            if (position := _census_id_position.get(census_id)) is not None:
+                scores[position] = score
+        self._census = scores
+
+        removed = set(result['removed_policies'])
+        self.policies = [p for p in self.policies if p not in removed]
+        self.policies.extend(p for p in _intern(result['new_policies']) if p not in self.policies)
+
+        self.last_updated = int(time.time())
+        return True
 
     def dict(self):
         return {
@@ -137,44 +299,39 @@ class Nation:
             'wa': self.wa,
         }
 
+    def snapshot(self) -> NationSnapshot:
+        return NationSnapshot(self.dict())
+
 
 class Issue:
     """
     A class to represent an issue in NationStates
     """
-    
+    __slots__ = ("nation", "id", "title", "text", "author", "editor", "open", "options", "pictures")
+
     def __init__(self, nation: Nation, api_response: dict):
+        """ `api_response` is an issue as decoded by `nstools.parser.parse_issue` """
         self.nation = nation
-        self.id = int(api_response['@id'])
-        self.title = api_response['TITLE']
-        self.text = api_response['TEXT']
-        self.author = api_response['AUTHOR']
-        self.editor = api_response['EDITOR'] if 'EDITOR' in api_response else None
+        self.id = api_response['id']
+        self.title = api_response['title']
+        self.text = api_response['text']
+        self.author = api_response['author']
+        self.editor = api_response['editor']
         self.open = True
+        self.options = dict(api_response['options']) # may be empty if there are no available options
+        self.pictures = api_response['pictures']
+
+    def __getstate__(self):
+        # issues are pickled without their nation (e.g. to predict their options in another process),
+        # so the copy can't be answered
+        return None, {slot: getattr(self, slot) if slot != "nation" else None for slot in self.__slots__}
 
-        if 'OPTION' not in api_response: # no available options
-            self.options = {}
-        elif isinstance(api_response['OPTION'], dict): # only one option
-            self.options = {int(api_response['OPTION']['@id']): api_response['OPTION']['#text']}
-        else:
-            self.options = {
-                int(option['@id']): option['#text']
-                for option in api_response['OPTION']
-            }
-
-        pictures = [] # usually there are 2, but apparently not always
-        i = 1
-        while f"PIC{i}" in api_response:
-            pictures.append(api_response[f"PIC{i}"])
-            i += 1
-        self.pictures = tuple(pictures)
-        
     def answer(self, option_id: int):
-        """ Answer the issue """
+        """ Answer the issue, returning the result as decoded by `nstools.parser.parse_issue_result` """
         assert self.open, "Issue is already answered"
-        request = self.nation.api.command("issue", issue=self.id, option=option_id)
+        result = self.nation.api.command("issue", issue=self.id, option=option_id, parser=parse_response)
         self.open = False
-        return request
+        return result
 
     def dismiss(self):
         """ Dismiss the issue """
@@ -0,0 +1,199 @@
+"""
+Column-wise storage of many nations, e.g. a whole region or a subset of the daily data dump.
+
+Census scores are kept in one float matrix, so operations over all nations are vectorized,
+and policies in a boolean matrix over the policies that occur in the table.
+"""
+from nstools.utils import census_names
+from array import array
+import numpy as np
+import sys
+
+
+_census_position = {census_name: i for i, census_name in enumerate(census_names)}
+
+
+def _normalize(name: str) -> str:
+    return name.lower().replace(" ", "_")
+
+
+class NationTable:
+    """
+    A table of nations, stored column-wise.
+
+    Attributes
+    ----------
+    names : np.ndarray
+        The names of the nations (object array of interned strings)
+    census : np.ndarray
+        Census scores of shape (nations, len(census_names)), ordered like `utils.census_names`, NaN if missing
+    wa : np.ndarray
+        Whether each nation is a WA member (bool)
+    regions : np.ndarray
+        The region of each nation, or None if unknown (object array of interned strings)
+    policy_names : list[str]
+        The policies with a column in `policies`
+    policies : np.ndarray
+        Which nations have which policies, of shape (nations, len(policy_names)) (bool)
+    """
+    def __init__(self, names, census, wa=None, regions=None, policy_names=(), policies=None):
+        self.names = np.array([sys.intern(name) for name in names], dtype=object)
+        self.census = np.asarray(census, dtype=float).reshape(len(self.names), len(census_names))
+        self.wa = np.asarray(wa, dtype=bool) if wa is not None else np.zeros(len(self.names), dtype=bool)
+        if regions is None:
+            regions = [None] * len(self.names)
+        self.regions = np.array([sys.intern(r) if r is not None else None for r in regions], dtype=object)
+        self.policy_names = [sys.intern(p) for p in policy_names]
+        if policies is None:
+            policies = np.zeros((len(self.names), len(self.policy_names)), dtype=bool)
+        self.policies = np.asarray(policies, dtype=bool)
+
+        self._index = None
+
+    @classmethod
+    def from_records(cls, records):
+        """
+        Create a table from mappings like `Nation.dict()` (or `NationSnapshot`s),
+        with the keys 'name', 'census_data', and optionally 'wa', 'region' and 'policies'.
+        """
+        from nstools.nation import CensusView
+
+        names, wa, regions, policy_sets = [], [], [], []
+        census = []
+        for record in records:
+            names.append(record['name'])
+            wa.append(bool(record.get('wa')))
+            regions.append(record.get('region'))
+            policy_sets.append(record.get('policies') or ())
+
+            row = np.full(len(census_names), np.nan)
+            census_data = record.get('census_data') or {}
+            if isinstance(census_data, CensusView): # already in the right order
+                row[:] = census_data.vector()
+            else:
+                for census_name, score in census_data.items():
+                    if score is not None and (position := _census_position.get(census_name)) is not None:
+                        row[position] = score
+            census.append(row)
+
+        policy_names = sorted({policy for policy_set in policy_sets for policy in policy_set})
+        policy_column = {policy: i for i, policy in enumerate(policy_names)}
+        policies = np.zeros((len(names), len(policy_names)), dtype=bool)
+        for i, policy_set in enumerate(policy_sets):
+            policies[i, [policy_column[policy] for policy in policy_set]] = True
+
+        census = np.stack(census) if census else np.zeros((0, len(census_names)))
+        return cls(names, census, wa, regions, policy_names, policies)
+
+    @classmethod
+    def from_nations(cls, nations):
+        """ Create a table from (loaded) `Nation` objects """
+        return cls.from_records(nation.snapshot() for nation in nations)
+
+    @classmethod
+    def from_dump(cls, path: str, batch_size: int = 10_000, workers: int = 1, filter = None):
+        """
+        Load the nations of a data dump (see `nstools.dump`), keeping only those for which `filter(record)` is true.
+
+        Records are converted to columns one batch at a time, so the dump is never held in memory as dictionaries.
+        The dump does not list policies, so the table has no policy columns.
+        """
+        from nstools.dump import iter_batches
+
+        names, wa, regions, census = [], [], [], []
+        for batch in iter_batches(path, batch_size=batch_size, workers=workers):
+            if filter is not None:
+                batch = [record for record in batch if filter(record)]
+            if not batch:
+                continue
+
+            names.extend(record.get('name') for record in batch)
+            wa.append(np.array([record.get('unstatus') in ("WA Member", "WA Delegate") for record in batch]))
+            regions.extend(record.get('region') for record in batch)
+            census.append(np.array([
+                [score if (score := record.get(census_name)) is not None else np.nan for census_name in census_names]
+                for record in batch
+            ], dtype=float))
+
+        census = np.concatenate(census) if census else np.zeros((0, len(census_names)))
+        wa = np.concatenate(wa) if wa else np.zeros(0, dtype=bool)
+        return cls(names, census, wa, regions)
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name: str):
+        return _normalize(name) in self._name_index()
+
+    def __getitem__(self, name: str) -> dict:
+        """ The row of a nation, as a dictionary like `Nation.dict()` (without the attributes the table lacks) """
+        return self.row(self.index(name))
+
+    def __repr__(self):
+        return f"NationTable({len(self)} nations, {self.nbytes / 2**20:.1f} MB)"
+
+    def _name_index(self) -> dict:
+        if self._index is None:
+            self._index = {_normalize(name): i for i, name in enumerate(self.names)}
+        return self._index
+
+    def index(self, name: str) -> int:
+        """ The row number of a nation """
+        return self._name_index()[_normalize(name)]
+
+    def row(self, i: int) -> dict:
+        from nstools.nation import CensusView
+        return {
+            'name': self.names[i],
+            'region': self.regions[i],
+            'census_data': CensusView(array('d', self.census[i])),
+            'policies': [policy for policy, has in zip(self.policy_names, self.policies[i]) if has],
+            'wa': bool(self.wa[i]),
+        }
+
+    def column(self, census_name: str) -> np.ndarray:
+        """ The scores of all nations on one census scale """
+        return self.census[:, _census_position[census_name]]
+
+    def has_policy(self, policy: str) -> np.ndarray:
+        """ Whether each nation has the given policy """
+        if policy not in self.policy_names:
+            return np.zeros(len(self), dtype=bool)
+        return self.policies[:, self.policy_names.index(policy)]
+
+    def select(self, rows) -> "NationTable":
+        """ A table with only the given rows (a boolean mask or row numbers) """
+        return NationTable(
+            self.names[rows], self.census[rows], self.wa[rows], self.regions[rows],
+            self.policy_names, self.policies[rows],
+        )
+
+    def in_region(self, region: str) -> np.ndarray:
+        """ Whether each nation is in the given region """
+        region = _normalize(region)
+        return np.array([r is not None and _normalize(r) == region for r in self.regions], dtype=bool)
+
+    def scores(self, scorer) -> np.ndarray:
+        """
+        Score all nations at once with a `NormalizedScorer` (equivalent to calling `score_nation` for each row).
+        """
+        census_score = np.nansum((self.census - scorer.census_means) * scorer.census_factors, axis=1)
+
+        policy_weights = np.array([scorer.policy_weights.get(policy, 0) for policy in self.policy_names], dtype=float)
+        policy_score = self.policies @ policy_weights if len(self.policy_names) else 0
+        return census_score + policy_score
+
+    def top(self, census_name: str, n: int = 10) -> list:
+        """ The names and scores of the `n` nations with the highest score on a census scale """
+        column = np.nan_to_num(self.column(census_name), nan=-np.inf)
+        rows = np.argsort(-column, kind="stable")[:n]
+        return [(self.names[i], float(column[i])) for i in rows]
+
+    @property
+    def nbytes(self) -> int:
+        """ Approximate memory use of the table in bytes """
+        return (
+            self.census.nbytes + self.policies.nbytes + self.wa.nbytes
+            + self.names.nbytes + self.regions.nbytes
+            + sum(sys.getsizeof(name) for name in self.names)
+        )
@@ -1,15 +1,20 @@
 from nstools.utils import *
+from nstools.parser import parse_response
+from nstools.ratelimit import RateLimiter, LocalRateLimiter, parse_policy
+from nstools.metrics import Hooks
 import requests
 import xmltodict
 import logging
-import time
 import datetime
+import time
 
 
 logger = logging.getLogger("nsapi")
 
 MAX_RETRIES = 3
 
+base_url = "https://www.nationstates.net/cgi-bin/api.cgi"
+
 
 class NSAPIException(Exception):
     def __init__(self, code, message):
@@ -18,42 +23,64 @@ class NSAPIException(Exception):
         super().__init__(f"[{code}] {message}")
 
 
-class RateLimitedClient:
+class RateLimitedClient(Hooks):
     """
     A class to manage the rate limit of the NationStates API client.
 
     Attributes
     ----------
-    client : aiohttp.ClientSession
-        The aiohttp session used to make requests
+    session : requests.Session
+        The requests session used to make requests
     policy : str
-        The rate limit policy of the API, formated as "{requests}w:{seconds}"
+        The rate limit policy of the API, formated as "{requests};w={seconds}"
+    limiter : RateLimiter
+        The rate limiter backend, by default local to this client (see `nstools.ratelimit`).
+        Pass the same limiter to several clients, or use a `SharedRateLimiter`, so they draw from one budget.
     limit : int
-        The number of requests allowed over a certain window
+        The number of requests allowed over a certain window (a view of the limiter state)
     window : int
-        The ratelimit time window in seconds
+        The ratelimit time window in seconds (a view of the limiter state)
     remaining_requests : int
-        The number of requests remaining in the current window
+        The number of requests remaining in the current window (a view of the limiter state)
     reset_time : datetime.datetime
-        The time at which the ratelimit window will reset
+        The time at which the ratelimit window will reset (a view of the limiter state)
+    base_url : str
+        The URL of the API, e.g. of a local `nstools.mockserver.MockNationStates` for load tests
+    hooks : list
+        Callables receiving a `nstools.metrics.RequestEvent` after every request, see `add_hook`
 
     Methods
     -------
     
     """
-    def __init__(self, policy: str = "50;w=30", headers: dict = None):
+    def __init__(self, policy: str = "50;w=30", headers: dict = None, limiter: RateLimiter = None, base_url: str = base_url):
         self.session = requests.Session()
         self.session.headers.update(headers)
 
         self.policy = policy
-        self.limit, self.window = map(int, policy.split(";w="))
-
-        self.remaining_requests = self.limit
-        self.active_requests = 0
-
-        self.reset_time = datetime.datetime.now() # will automatically reset on first request
-
-    def request(self, headers: dict = None, _retry: int = 0, **kwargs):
+        self.limiter = limiter if limiter is not None else LocalRateLimiter(*parse_policy(policy))
+        self.base_url = base_url
+        self.hooks = []
+
+    # the rate limit counters are kept by the limiter, these are views of its state (assigning them changes it)
+    limit = property(
+        lambda self: self.limiter.state()['limit'],
+        lambda self, limit: self.limiter.set_state(limit=limit),
+    )
+    window = property(
+        lambda self: self.limiter.state()['window'],
+        lambda self, window: self.limiter.set_state(window=window),
+    )
+    remaining_requests = property(
+        lambda self: self.limiter.state()['remaining'],
+        lambda self, remaining: self.limiter.set_state(remaining=remaining),
+    )
+    reset_time = property(
+        lambda self: datetime.datetime.fromtimestamp(self.limiter.state()['reset_time']),
+        lambda self, reset_time: self.limiter.set_state(reset_time=reset_time.timestamp()),
+    )
+
+    def request(self, headers: dict = None, parser = None, _retry: int = 0, **kwargs):
         """
         Sends a request to the NationStates API with the given parameters
         ["WORLD"]
@@ -61,68 +88,58 @@ class RateLimitedClient:
         ----------
         headers : dict
             The headers to send with the request
+        parser : callable
+            Function parsing the (utf-8 encoded) response body, defaults to xmltodict (see also `nstools.parser.parse_response`)
         **kwargs : dict
             The query parameters that will be sent as query string to the API
         """
-
-        # if the current time is past the reset time, reset the counter
-        if datetime.datetime.now() > self.reset_time:
-            self.remaining_requests = self.limit
-            self.reset_time = datetime.datetime.now() + datetime.timedelta(seconds=self.window)
-        
-        # If the rate limit has been exceeded, wait until the reset time
-        if self.remaining_requests <= 0:
-            waittime = (self.reset_time - datetime.datetime.now()).total_seconds()
-            logger.warning(f"⚠️ Rate limit reached. Waiting {round(waittime)} seconds before continuing...")
-            time.sleep(waittime)
-            self.remaining_requests = self.limit
-            self.reset_time = datetime.datetime.now() + datetime.timedelta(seconds=self.window)
+        start = time.perf_counter()
+        self.limiter.acquire()
+        sent = time.perf_counter()
 
         query = "&".join([f"{k}={format_for_query(v)}" for k, v in kwargs.items()])
-        url = f"https://www.nationstates.net/cgi-bin/api.cgi?{query}"
+        url = f"{self.base_url}?{query}"
         response = self.session.get(url, headers=headers)
-        self.remaining_requests -= 1
+        received = time.perf_counter()
 
         # sometimes the API returns HTML entities in the XML response(e.g. &eacute;) which cause errors in XML parsing
         # but we can't use html.unescape, because we need to keep the XML special characters escaped
-        text = unescape(response.content.decode('utf-8'))
+        content = unescape(response.content)
+        unescaped = time.perf_counter()
+
+        if self.hooks and response.status_code != 200: # successful requests are reported after parsing
+            self._report(kwargs, response.status_code, _retry, len(response.content), start, sent, received, unescaped, unescaped)
 
         if response.status_code == 200: # OK
             # Check headers for rate limit information
-            date = response.headers.get("Date")
-            policy = response.headers.get("Ratelimit-Policy")
+            policy = response.headers.get("Ratelimit-Policy", self.policy)
             seconds_until_reset = int(response.headers.get('Ratelimit-Reset'))
             remaining = int(response.headers.get('RateLimit-Remaining'))
 
-            # If the rate limit policy has changed, update the policy
-            if policy != self.policy:
-                self.policy = policy
-                self.limit, self.window = map(int, self.policy.split(";w="))
-
-            # Update the rate limit counters
-            response_time = datetime.datetime.strptime(date, '%a, %d %b %Y %H:%M:%S %Z')
-            resettime = response_time + datetime.timedelta(seconds=seconds_until_reset + 0.5)
-            if resettime > self.reset_time:
-                self.reset_time = resettime
-        
-            if remaining < self.remaining_requests:
-                self.remaining_requests = remaining
+            self.policy = policy
+            self.limiter.reconcile(*parse_policy(policy), remaining, seconds_until_reset)
 
             response_headers = response.headers
             try:
-                response_content = xmltodict.parse(text, dict_constructor=dict)
+                if parser is None:
+                    response_content = xmltodict.parse(content, dict_constructor=dict)
+                else:
+                    response_content = parser(content)
                 return response_headers, response_content
             except Exception as e:
-                raise NSAPIException(0, f"Failed to parse XML response:\n{text}")
+                raise NSAPIException(0, f"Failed to parse XML response:\n{content.decode('utf-8')}")
+            finally:
+                if self.hooks:
+                    self._report(kwargs, 200, _retry, len(response.content), start, sent, received, unescaped, time.perf_counter())
         
         elif response.status_code == 429: # We were blocked due to the rate limit
             if _retry < MAX_RETRIES:
                 waittime = int(response.headers.get("Retry-after"))
                 logger.warning(f"⚠️ Rate limit exceeded. Waiting {waittime} seconds before retrying...")
 
-                time.sleep(waittime)
-                self.remaining_requests = self.limit
-                return self.request(headers = headers, _retry = _retry+1, **kwargs)
+                # block the limiter rather than sleeping, so other users of the budget back off as well
+                self.limiter.block(waittime)
+                return self.request(headers = headers, parser = parser, _retry = _retry+1, **kwargs)
             else:
                 raise NSAPIException(0, f"Retrying request failed {MAX_RETRIES} times.")
         
@@ -130,7 +147,7 @@ class RateLimitedClient:
             raise NSAPIException(524, "The server took too long to respond.")
 
         else:
-            message = html_to_plaintext(text).split("Error:")[0].strip()
+            message = html_to_plaintext(content.decode('utf-8')).split("Error:")[0].strip()
             raise NSAPIException(response.status_code, message)
         
 
@@ -146,9 +163,22 @@ class NationStatesAPI:
     -------
     
     """
-    def __init__(self, contact_info: str):
+    def __init__(
+        self, contact_info: str, limiter: RateLimiter = None, coalesce_delay: float = None, cache = None,
+        base_url: str = base_url,
+    ):
         headers = {'User-Agent': contact_info}
-        self.client = RateLimitedClient(headers=headers)
+        self.client = RateLimitedClient(headers=headers, limiter=limiter, base_url=base_url)
+
+        # merge shard requests of independent callers (see `nstools.coalesce`)
+        if coalesce_delay is not None:
+            from nstools.coalesce import CoalescingClient
+            self.client = CoalescingClient(self.client, delay=coalesce_delay)
+
+        # serve public responses from a cache (see `nstools.cache`)
+        if cache is not None:
+            from nstools.cache import CachingClient
+            self.client = CachingClient(self.client, cache)
     
     def request(self, **kwargs):
         headers, content = self.client.request(**kwargs)
@@ -162,6 +192,16 @@ class NationStatesAPI:
         headers, content = self.request(q=format_for_query(shards), **kwargs)
         return [content[shard_key(s)] for s in shards]
 
+    def parsed_shards(self, shards: list, **kwargs):
+        """ Like `shards`, but decodes known shards into plain python types (see `nstools.parser`) """
+        headers, content = self.request(q=format_for_query(shards), parser=parse_response, **kwargs)
+        return [content[shard_key(s)] for s in shards]
+
+    def census_table(self, census_ids: list, **kwargs):
+        """ Collect census scores of every nation in bulk, as a `NationTable` (see `nstools.bulk.CensusCollector`) """
+        from nstools.bulk import CensusCollector
+        return CensusCollector(self, **kwargs).collect(census_ids)
+
     def nation(self, name: str, password: str = None):
         return NationAPI(self.client, name, password)
     
@@ -176,6 +216,7 @@ class NationAPI(NationStatesAPI):
         self.password = password
         
         self.auth_headers = {'X-Password': password} if password is not None else {}
+        self.requests = 0 # the number of requests made for this nation (e.g. per issue, see CensusMaximizer)
 
     def __str__(self):
         if self.password:
@@ -184,6 +225,7 @@ class NationAPI(NationStatesAPI):
             return f"NationAPI(\"{self.name}\")"
 
     def request(self, **kwargs):
+        self.requests += 1
         headers, content = self.client.request(nation=self.name, headers=self.auth_headers, **kwargs)
 
         if self.password is not None:
@@ -227,3 +269,8 @@ class RegionAPI(NationStatesAPI):
         headers, content = self.client.request(region=self.name, **kwargs)
 
         return headers, content['REGION']
+
+    def census_table(self, census_ids: list, **kwargs):
+        """ Collect census scores of every nation in the region in bulk (see `nstools.bulk.CensusCollector`) """
+        from nstools.bulk import CensusCollector
+        return CensusCollector(self, **kwargs).collect(census_ids)
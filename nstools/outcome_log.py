@@ -0,0 +1,350 @@
+"""
+An append-only log of the observed outcomes of answered issues, and a predictor built on it.
+
+The log is a directory with one file per column, to which rows are only ever appended:
+
+- `issue.i4`, `option.i4`: the issue and option of each row (int32)
+- `time.f8`: when the issue was answered (unix time, float64)
+- `pre.f8`, `change.f8`: the census scores before answering and their actual change (float64, one row per
+  answer, ordered like `utils.census_ids`, NaN where unknown)
+
+Columns can be read memory-mapped (see `OutcomeLog.columns`). Aggregates per (issue, option) are kept in an
+in-memory index, which is saved to `index.npz` so that opening a large log only replays the rows added since.
+"""
+from nstools.census_maximizer import Predictor, OutcomePrediction, census_vector
+from nstools.utils import census_ids, census_names
+import numpy as np
+import threading
+import logging
+import json
+import time
+import os
+
+
+logger = logging.getLogger("outcome_log")
+
+VERSION = 1
+
+_columns = {
+    'issue': ("issue.i4", "<i4", ()),
+    'option': ("option.i4", "<i4", ()),
+    'time': ("time.f8", "<f8", ()),
+    'pre': ("pre.f8", "<f8", (len(census_ids),)),
+    'change': ("change.f8", "<f8", (len(census_ids),)),
+}
+
+
+class OutcomeLog:
+    """
+    An append-only, columnar log of issue outcomes, indexed by (issue, option).
+
+    Appending is safe from several threads of one process; only one process should write to a log at a time.
+
+    Attributes
+    ----------
+    path : str
+        The directory containing the log
+    """
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+        meta_path = os.path.join(path, "meta.json")
+        if os.path.exists(meta_path):
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta['version'] != VERSION or meta['census_ids'] != list(census_ids):
+                raise ValueError(f"{path} was written with a different version or census scales")
+        else:
+            with open(meta_path, "w") as f:
+                json.dump({'version': VERSION, 'census_ids': list(census_ids)}, f)
+
+        self._lock = threading.Lock()
+        self._files = {name: open(os.path.join(path, file), "ab") for name, (file, _, _) in _columns.items()}
+        self._truncate()
+
+        # index: (issue, option) -> slot in the aggregate arrays
+        self._slots = {}
+        self._options = {} # issue -> the recorded options
+        self._rows = 0 # rows included in the aggregates
+        self._count = np.zeros((0, len(census_ids)), dtype=np.int64)
+        self._sum = np.zeros((0, len(census_ids)))
+        self._sum_squares = np.zeros((0, len(census_ids)))
+        self._load_index()
+
+    def __len__(self):
+        return self._rows
+
+    def __contains__(self, key: tuple):
+        return key in self._slots
+
+    def close(self):
+        """ Save the index and close the files """
+        with self._lock:
+            self._save_index()
+            for f in self._files.values():
+                f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def _length(self) -> int:
+        """ The number of complete rows on disk (a row may have been cut off by a crash) """
+        return min(
+            os.path.getsize(os.path.join(self.path, file)) // (np.dtype(dtype).itemsize * int(np.prod(shape)))
+            for file, dtype, shape in _columns.values()
+        )
+
+    def _truncate(self):
+        """ Cut off the partial rows a crash may have left, so that the next rows are appended aligned in every column """
+        length = self._length()
+        for name, (file, dtype, shape) in _columns.items():
+            size = length * np.dtype(dtype).itemsize * int(np.prod(shape))
+            if self._files[name].tell() > size:
+                logger.warning(f"⚠️ Discarding a partial row in {os.path.join(self.path, file)}")
+                self._files[name].truncate(size)
+
+    def columns(self, start: int = 0, stop: int = None) -> dict:
+        """ Memory-mapped (read-only) views of the columns, for the rows in [start, stop) """
+        for f in self._files.values():
+            f.flush()
+        length = self._length()
+        stop = length if stop is None else min(stop, length)
+
+        columns = {}
+        for name, (file, dtype, shape) in _columns.items():
+            if stop <= start:
+                columns[name] = np.zeros((0, *shape), dtype=dtype)
+                continue
+            itemsize = np.dtype(dtype).itemsize * int(np.prod(shape))
+            columns[name] = np.memmap(
+                os.path.join(self.path, file), dtype=dtype, mode="r",
+                offset=start * itemsize, shape=(stop - start, *shape),
+            )
+        return columns
+
+    def append(self, issue_id: int, option_id: int, pre, change):
+        """ Record one observed outcome; `pre` and `change` are census mappings or arrays ordered like `census_ids` """
+        self.append_many([issue_id], [option_id], [_vector(pre)], [_vector(change)])
+
+    def append_many(self, issue_ids, option_ids, pre, change, times=None):
+        """ Record many observed outcomes at once """
+        values = {
+            'issue': np.asarray(issue_ids, dtype="<i4"),
+            'option': np.asarray(option_ids, dtype="<i4"),
+            'pre': np.asarray(pre, dtype="<f8").reshape(-1, len(census_ids)),
+            'change': np.asarray(change, dtype="<f8").reshape(-1, len(census_ids)),
+        }
+        values['time'] = np.asarray(times if times is not None else [time.time()] * len(values['issue']), dtype="<f8")
+
+        with self._lock:
+            for name, f in self._files.items():
+                f.write(values[name].tobytes())
+                f.flush()
+            self._aggregate(values['issue'], values['option'], values['change'])
+            self._rows += len(values['issue'])
+
+    def record(self, issue_id: int, option_id: int, initial_dict, new_dict):
+        """ Record the outcome of an answer from the nation states before and after (as yielded by `CensusMaximizer.run`) """
+        pre = census_vector(initial_dict['census_data'], default=np.nan)
+        post = census_vector(new_dict['census_data'], default=np.nan)
+        self.append(issue_id, option_id, pre, post - pre)
+
+    def options(self, issue_id: int) -> list:
+        """ The options of an issue of which an outcome was recorded """
+        with self._lock:
+            return sorted(self._options.get(issue_id, ()))
+
+    def observations(self, issue_id: int, option_id: int) -> int:
+        """ The number of times an outcome was recorded for an option """
+        # the aggregates are read under the lock, as appending may replace (grow) their arrays
+        with self._lock:
+            if (slot := self._slots.get((issue_id, option_id))) is None:
+                return 0
+            return int(self._count[slot].max())
+
+    def aggregate(self, issue_id: int, option_id: int):
+        """
+        The observed (count, mean, std) of the census changes of an option, as arrays ordered like `census_ids`
+        (NaN where there are no observations), or None if the option was never recorded.
+        """
+        with self._lock:
+            if (slot := self._slots.get((issue_id, option_id))) is None:
+                return None
+            count = self._count[slot].copy()
+            total = self._sum[slot].copy()
+            squares = self._sum_squares[slot].copy()
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = total / count
+            variance = np.maximum(squares / count - mean ** 2, 0)
+        return count, mean, np.sqrt(variance)
+
+    def _aggregate(self, issues, options, changes):
+        """ Add rows to the aggregates of the index """
+        # only the distinct keys are looked up in the index
+        keys = (issues.astype(np.int64) << 32) | (options.astype(np.int64) & 0xFFFFFFFF)
+        unique_keys, inverse = np.unique(keys, return_inverse=True)
+        unique_keys = [
+            (key >> 32, ((key & 0xFFFFFFFF) ^ 0x80000000) - 0x80000000) # option ids may be negative
+            for key in unique_keys.tolist()
+        ]
+
+        # grow the arrays before new slots are added, so a slot never points past their end
+        # (geometrically, so appending stays amortized O(1))
+        slots = len(self._slots) + sum(key not in self._slots for key in unique_keys)
+        if slots > len(self._count):
+            size = max(slots, 2 * len(self._count), 64)
+            self._count = _resize(self._count, size)
+            self._sum = _resize(self._sum, size)
+            self._sum_squares = _resize(self._sum_squares, size)
+
+        unique_slots = np.empty(len(unique_keys), dtype=np.int64)
+        for i, key in enumerate(unique_keys):
+            if (slot := self._slots.get(key)) is None:
+                slot = self._slots[key] = len(self._slots)
+                self._options.setdefault(key[0], []).append(key[1])
+            unique_slots[i] = slot
+
+        # sum the rows of each key with one reduceat over the rows sorted by key (much faster than np.add.at)
+        order = np.argsort(inverse, kind="stable")
+        starts = np.flatnonzero(np.r_[True, np.diff(inverse[order]) != 0])
+        changes = changes[order]
+        known = ~np.isnan(changes)
+        values = np.where(known, changes, 0)
+        self._count[unique_slots] += np.add.reduceat(known.astype(np.int64), starts, axis=0)
+        self._sum[unique_slots] += np.add.reduceat(values, starts, axis=0)
+        self._sum_squares[unique_slots] += np.add.reduceat(values ** 2, starts, axis=0)
+
+    def _load_index(self):
+        index_path = os.path.join(self.path, "index.npz")
+        if os.path.exists(index_path):
+            with np.load(index_path) as index:
+                keys = index['keys']
+                self._slots = {(int(issue), int(option)): i for i, (issue, option) in enumerate(keys)}
+                for issue, option in self._slots:
+                    self._options.setdefault(issue, []).append(option)
+                self._count = index['count']
+                self._sum = index['sum']
+                self._sum_squares = index['sum_squares']
+                self._rows = int(index['rows'])
+
+            if self._rows > self._length(): # the index is newer than the columns, so rebuild it
+                logger.warning(f"⚠️ The index of {self.path} does not match its columns, rebuilding it")
+                self._slots = {}
+                self._options = {}
+                self._rows = 0
+                self._count = np.zeros((0, len(census_ids)), dtype=np.int64)
+                self._sum = np.zeros((0, len(census_ids)))
+                self._sum_squares = np.zeros((0, len(census_ids)))
+
+        # replay the rows that were appended after the index was saved, in chunks to bound memory use
+        length = self._length()
+        if length > self._rows:
+            logger.info(f"Indexing {length - self._rows} outcomes")
+        for start in range(self._rows, length, 100_000):
+            columns = self.columns(start, min(start + 100_000, length))
+            self._aggregate(np.asarray(columns['issue']), np.asarray(columns['option']), np.asarray(columns['change']))
+        self._rows = length
+
+    def _save_index(self):
+        n = len(self._slots)
+        keys = np.array(list(self._slots), dtype=np.int64).reshape(n, 2)
+        tmp_path = os.path.join(self.path, f"index.{os.getpid()}.tmp.npz")
+        np.savez(
+            tmp_path, keys=keys, rows=self._rows,
+            count=self._count[:n], sum=self._sum[:n], sum_squares=self._sum_squares[:n],
+        )
+        os.replace(tmp_path, os.path.join(self.path, "index.npz"))
+
+
+def _vector(census) -> np.ndarray:
+    if isinstance(census, np.ndarray):
+        return census
+    return census_vector(census, default=np.nan)
+
+
+def _resize(array: np.ndarray, size: int) -> np.ndarray:
+    resized = np.zeros((size, *array.shape[1:]), dtype=array.dtype)
+    resized[:len(array)] = array
+    return resized
+
+
+class EmpiricalPredictor(Predictor):
+    """
+    Predicts census changes from the outcomes observed in an `OutcomeLog`.
+
+    The observed mean of each census scale is blended with the prediction of `fallback` (e.g. a
+    `TrotterdamPredictor`), weighing the fallback as `prior_weight` observations. Policies, notables and WA
+    resignation are not recorded in the log, so they are taken from the fallback. Without a fallback, only
+    observed census changes are predicted, the options of an issue are the ones that were recorded, and issue
+    chains are unknown.
+    """
+    def __init__(self, log: OutcomeLog, fallback: Predictor = None, prior_weight: float = 5):
+        super().__init__()
+        self.log = log
+        self.fallback = fallback
+        self.prior_weight = prior_weight
+
+    @property
+    def version(self):
+        # the predictions change with every recorded outcome
+        fallback = self.fallback.version if self.fallback is not None else 0
+        return None if fallback is None else (len(self.log), fallback)
+
+    def __getstate__(self):
+        raise TypeError("an EmpiricalPredictor reads an open OutcomeLog, so it can't be copied to another process")
+
+    # issue chains are only known by the fallback (see `nstools.lookahead`)
+    def options(self, issue_id) -> list:
+        if self.fallback is None or not hasattr(self.fallback, "options"):
+            return self.log.options(issue_id)
+        return self.fallback.options(issue_id)
+
+    def leads_to(self, issue, option_id):
+        if self.fallback is None or not hasattr(self.fallback, "leads_to"):
+            return None
+        return self.fallback.leads_to(issue, option_id)
+
+    def prefetch(self, issue):
+        if self.fallback is not None:
+            self.fallback.prefetch(issue)
+
+    def __call__(self, nation_dict, issue, option_id):
+        aggregate = self.log.aggregate(issue.id, option_id)
+
+        prior = None
+        if self.fallback is not None:
+            try:
+                prior = self.fallback(nation_dict, issue, option_id)
+            except Exception as e:
+                if aggregate is None:
+                    raise
+                logger.debug(f"Using only observed outcomes for issue {issue.id}: {e!r}")
+
+        if aggregate is None:
+            if prior is not None:
+                return prior
+            changes = np.zeros(len(census_names))
+        else:
+            count, mean, std = aggregate
+            mean = np.nan_to_num(mean)
+            if prior is not None:
+                weight = self.prior_weight
+                changes = (count * mean + weight * prior.census_vector()) / (count + weight)
+            else:
+                changes = mean
+
+        census_changes = dict(zip(census_names, changes.tolist()))
+        if prior is not None:
+            prediction = OutcomePrediction(census_changes, prior.policies, prior.notables, prior.resign_WA)
+        else:
+            policies = {policy: 1 for policy in nation_dict['policies']}
+            notables = {notable: 1 for notable in nation_dict['notables']}
+            prediction = OutcomePrediction(census_changes, policies, notables, False)
+
+        prediction._census_vector = changes # already ordered like census_names
+        return prediction
@@ -0,0 +1,141 @@
+"""
+Fast, shard-aware parsing of API responses.
+
+Known shards are decoded straight from the lxml tree into plain python types, e.g. CENSUS into a dictionary
+mapping census ids to scores, and POLICIES into a list of names. Unlike xmltodict, a shard with a single entry
+has the same structure as one with several. Unknown shards fall back to xmltodict, so their structure is the
+same as in the responses of `RateLimitedClient.request` without a parser.
+"""
+from lxml import etree
+import xmltodict
+
+
+def _float(text):
+    # young nations sometimes have no score for a scale
+    return float(text) if text else None
+
+
+def parse_census(element) -> dict:
+    """ Maps census ids to scores """
+    return {int(scale.get("id")): _float(scale.findtext("SCORE")) for scale in element.iterfind("SCALE")}
+
+
+def parse_policies(element) -> list:
+    """ List of policy names """
+    return [policy.findtext("NAME") for policy in element.iterfind("POLICY")]
+
+
+def parse_notables(element) -> list:
+    """ List of notables """
+    return [notable.text for notable in element.iterfind("NOTABLE")]
+
+
+def parse_values(element) -> dict:
+    """ Maps child tags to numbers (for SECTORS and GOVT) """
+    return {child.tag: float(child.text) for child in element}
+
+
+def parse_deaths(element) -> dict:
+    """ Maps causes of death to percentages """
+    return {cause.get("type"): float(cause.text) for cause in element.iterfind("CAUSE")}
+
+
+def parse_issue(element) -> dict:
+    """ Decode an <ISSUE> element, see `nation.Issue` """
+    pictures = [] # usually there are 2, but apparently not always
+    i = 1
+    while (picture := element.findtext(f"PIC{i}")) is not None:
+        pictures.append(picture)
+        i += 1
+
+    return {
+        'id': int(element.get("id")),
+        'title': element.findtext("TITLE"),
+        'text': element.findtext("TEXT"),
+        'author': element.findtext("AUTHOR"),
+        'editor': element.findtext("EDITOR"),
+        'options': {int(option.get("id")): option.text for option in element.iterfind("OPTION")},
+        'pictures': tuple(pictures),
+    }
+
+
+def parse_issues(element) -> list:
+    """ List of issues, see `parse_issue` """
+    return [parse_issue(issue) for issue in element.iterfind("ISSUE")]
+
+
+def parse_issue_result(element) -> dict:
+    """
+    Decode the <ISSUE> element in the response to answering an issue (c=issue).
+
+    'rankings' maps the census ids of the scales that changed to their new score,
+    'new_policies' and 'removed_policies' are lists of policy names.
+    If the issue could not be answered, 'ok' is False and 'error' holds the reason.
+    """
+    return {
+        'id': int(element.get("id")),
+        'choice': int(element.get("choice")) if element.get("choice") is not None else None,
+        'ok': element.findtext("OK") == "1",
+        'error': element.findtext("ERROR"),
+        'desc': element.findtext("DESC"),
+        'rankings': {
+            int(rank.get("id")): _float(rank.findtext("SCORE"))
+            for rank in element.iterfind("RANKINGS/RANK")
+        },
+        'new_policies': [policy.findtext("NAME") for policy in element.iterfind("NEW_POLICIES/POLICY")],
+        'removed_policies': [policy.findtext("NAME") for policy in element.iterfind("REMOVED_POLICIES/POLICY")],
+        'unlocks': [unlock.text for unlock in element.iterfind("UNLOCKS/UNLOCK")],
+        'reclassifications': [
+            {'type': reclassify.get("type"), 'from': reclassify.findtext("FROM"), 'to': reclassify.findtext("TO")}
+            for reclassify in element.iterfind("RECLASSIFICATIONS/RECLASSIFY")
+        ],
+        'headlines': [headline.text for headline in element.iterfind("HEADLINES/HEADLINE")],
+        'has_rankings': element.find("RANKINGS") is not None,
+    }
+
+
+def parse_int(element) -> int:
+    return int(element.text)
+
+
+def parse_census_ranks(element) -> list:
+    """ List of (nation, rank, score) tuples, for world or region CENSUSRANKS """
+    return [
+        (nation.findtext("NAME"), int(nation.findtext("RANK")), _float(nation.findtext("SCORE")))
+        for nation in element.iterfind("NATIONS/NATION")
+    ]
+
+
+shard_parsers = {
+    "CENSUS": parse_census,
+    "POLICIES": parse_policies,
+    "NOTABLES": parse_notables,
+    "SECTORS": parse_values,
+    "GOVT": parse_values,
+    "DEATHS": parse_deaths,
+    "ISSUES": parse_issues,
+    "ISSUE": parse_issue_result, # only at the top level in response to c=issue
+    "FOUNDEDTIME": parse_int,
+    "NEXTISSUETIME": parse_int,
+    "CENSUSRANKS": parse_census_ranks,
+}
+
+
+def parse_element(element):
+    """ Decode a shard element, with xmltodict as fallback for shards without a dedicated parser """
+    if (parser := shard_parsers.get(element.tag)) is not None:
+        return parser(element)
+    if len(element) == 0 and not element.attrib:
+        return element.text
+    return xmltodict.parse(etree.tostring(element), dict_constructor=dict)[element.tag]
+
+
+def parse_response(text) -> dict:
+    """
+    Parse an API response (str or utf-8 bytes) into `{ROOT: {SHARD: value}}`, analogous to the output of xmltodict.
+    Can be passed as `parser` to `RateLimitedClient.request`.
+    """
+    if isinstance(text, str):
+        text = text.encode("utf-8")
+    root = etree.fromstring(text)
+    return {root.tag: {child.tag: parse_element(child) for child in root}}
@@ -0,0 +1,217 @@
+"""
+Rate limiter backends for the API clients.
+
+The NationStates API allows a fixed number of requests per window (the policy, e.g. "50;w=30").
+A limiter hands out one token per request, refilling to the limit whenever the current window has expired,
+and is reconciled with the rate limit headers of every response.
+
+- `LocalRateLimiter` is shared by the threads (or coroutines) of one process.
+- `SharedRateLimiter` stores its state in a locked file, so that all processes on a machine share one budget.
+"""
+import threading
+import logging
+import struct
+import time
+import os
+
+
+logger = logging.getLogger("nsapi")
+
+
+def parse_policy(policy: str):
+    """ Parse a rate limit policy of the form "{requests};w={seconds}" into (limit, window) """
+    limit, window = map(int, policy.split(";w="))
+    return limit, window
+
+
+_state_fields = ("limit", "window", "remaining", "reset_time") # the order of the state lists
+
+
+class RateLimiter:
+    """
+    Base class of the rate limiter backends.
+
+    Subclasses implement `try_acquire`, `reconcile` and `block` atomically.
+    """
+    def try_acquire(self) -> float:
+        """ Take a token if one is available and return 0, otherwise return the number of seconds to wait """
+        raise NotImplementedError()
+
+    def reconcile(self, limit: int, window: int, remaining: int, seconds_until_reset: float):
+        """ Update the limiter with the rate limit information reported by the server """
+        raise NotImplementedError()
+
+    def block(self, seconds: float):
+        """ Stop handing out tokens for the given amount of seconds (e.g. after a 429 response) """
+        raise NotImplementedError()
+
+    def state(self) -> dict:
+        """ The current limit, window, remaining requests and reset_time (as a Unix timestamp) of the budget """
+        raise NotImplementedError()
+
+    def set_state(self, **state):
+        """ Overwrite some of the limit, window, remaining requests and reset_time (as a Unix timestamp) """
+        raise NotImplementedError()
+
+    def acquire(self):
+        """ Wait until a request may be sent, and take a token for it """
+        while (waittime := self.try_acquire()) > 0:
+            logger.warning(f"⚠️ Rate limit reached. Waiting {round(waittime)} seconds before continuing...")
+            time.sleep(waittime)
+
+    @staticmethod
+    def _take(state: list, now: float) -> float:
+        """ Token bucket logic on a [limit, window, remaining, reset_time] state, shared by the backends """
+        limit, window, remaining, reset_time = state
+        if now >= reset_time:
+            remaining = limit
+            reset_time = now + window
+
+        if remaining > 0:
+            state[2:] = remaining - 1, reset_time
+            return 0
+
+        state[2:] = remaining, reset_time
+        return reset_time - now
+
+    @staticmethod
+    def _reconcile(state: list, now: float, limit: int, window: int, remaining: int, seconds_until_reset: float):
+        # the reset only moves later (responses may arrive out of order), unless the policy changed
+        policy_changed = (limit, window) != (state[0], state[1])
+        state[0], state[1] = limit, window
+
+        # the server rounds to whole seconds, so allow some margin
+        reset_time = now + seconds_until_reset + 0.5
+        if reset_time > state[3] or policy_changed:
+            state[3] = reset_time
+
+        if remaining < state[2]:
+            state[2] = remaining
+
+    @staticmethod
+    def _set(state: list, changes: dict):
+        for name, value in changes.items():
+            if name not in _state_fields:
+                raise TypeError(f"Unknown rate limit state {name!r}, expected one of {_state_fields}")
+            state[_state_fields.index(name)] = value
+
+    @staticmethod
+    def _block(state: list, now: float, seconds: float):
+        # the server tells us when we may send requests again, and a new window starts at that point
+        state[2] = 0
+        state[3] = now + seconds
+
+
+class LocalRateLimiter(RateLimiter):
+    """
+    A lock-protected token bucket on a monotonic clock, shared by all threads using it.
+
+    Attributes
+    ----------
+    limit : int
+        The number of requests allowed per window
+    window : int
+        The length of a window in seconds
+    remaining : int
+        The number of requests remaining in the current window
+    reset_time : float
+        The (monotonic) time at which the current window ends
+    """
+    def __init__(self, limit: int = 50, window: int = 30):
+        self._state = [limit, window, limit, time.monotonic()] # will automatically reset on first request
+        self._lock = threading.Lock()
+
+    limit = property(lambda self: self._state[0])
+    window = property(lambda self: self._state[1])
+    remaining = property(lambda self: self._state[2])
+    reset_time = property(lambda self: self._state[3])
+
+    def state(self):
+        with self._lock:
+            limit, window, remaining, reset_time = self._state
+            # the reset time is kept on the monotonic clock, but reported in wall-clock time
+            reset_time += time.time() - time.monotonic()
+        return {'limit': limit, 'window': window, 'remaining': remaining, 'reset_time': reset_time}
+
+    def set_state(self, **state):
+        if 'reset_time' in state:
+            state['reset_time'] += time.monotonic() - time.time()
+        with self._lock:
+            self._set(self._state, state)
+
+    def try_acquire(self):
+        with self._lock:
+            return self._take(self._state, time.monotonic())
+
+    def reconcile(self, limit, window, remaining, seconds_until_reset):
+        with self._lock:
+            self._reconcile(self._state, time.monotonic(), limit, window, remaining, seconds_until_reset)
+
+    def block(self, seconds):
+        with self._lock:
+            self._block(self._state, time.monotonic(), seconds)
+
+
+class SharedRateLimiter(RateLimiter):
+    """
+    A token bucket stored in a file, shared by every process on the machine that uses the same path.
+
+    Every operation locks the file (with fcntl, so this backend is only available on POSIX systems),
+    so the budget can never be overdrawn by concurrent processes. Since the state has to be comparable
+    between processes and survive restarts, it is kept in wall-clock time.
+
+    Attributes
+    ----------
+    path : str
+        The location of the state file
+    """
+    _format = struct.Struct("<qqqd") # limit, window, remaining, reset_time
+
+    def __init__(self, path: str = None, limit: int = 50, window: int = 30):
+        import fcntl # POSIX only
+        self._fcntl = fcntl
+
+        if path is None:
+            cache_home = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+            path = os.path.join(cache_home, "nstools", "ratelimit")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self.path = path
+        self._defaults = [limit, window, limit, 0.0]
+        # guards the file descriptor against concurrent use by threads of this process
+        self._lock = threading.Lock()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+
+    def __del__(self):
+        if getattr(self, "_fd", None) is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _transaction(self, operation):
+        """ Apply `operation(state, now)` to the stored state while holding the file lock """
+        with self._lock:
+            self._fcntl.flock(self._fd, self._fcntl.LOCK_EX)
+            try:
+                data = os.pread(self._fd, self._format.size, 0)
+                state = list(self._format.unpack(data)) if len(data) == self._format.size else list(self._defaults)
+                result = operation(state, time.time())
+                os.pwrite(self._fd, self._format.pack(*state), 0)
+                return result
+            finally:
+                self._fcntl.flock(self._fd, self._fcntl.LOCK_UN)
+
+    def state(self):
+        limit, window, remaining, reset_time = self._transaction(lambda state, now: list(state))
+        return {'limit': limit, 'window': window, 'remaining': remaining, 'reset_time': reset_time}
+
+    def set_state(self, **state):
+        self._transaction(lambda stored, now: self._set(stored, state))
+
+    def try_acquire(self):
+        return self._transaction(self._take)
+
+    def reconcile(self, limit, window, remaining, seconds_until_reset):
+        self._transaction(lambda state, now: self._reconcile(state, now, limit, window, remaining, seconds_until_reset))
+
+    def block(self, seconds):
+        self._transaction(lambda state, now: self._block(state, now, seconds))
@@ -0,0 +1,161 @@
+"""
+Scheduling of issue answering for many nations, by the time their next issue is due.
+
+Instead of updating every nation periodically to find out whether it has issues, `IssueScheduler` keeps the nations
+in a priority queue by the time of their next issue (the `nextissuetime` shard), and only wakes a nation when that
+time has passed. Waking a nation costs one small request for its `issues` and `nextissuetime` shards (or, the first
+time, one full update of a nation that was not loaded yet); if it has issues, they are answered by a
+`CensusMaximizer`. So the number of polling requests grows with the number of issues the nations receive, not
+with the size of the fleet times the polling frequency.
+"""
+from nstools.nation import Nation
+from nstools.census_maximizer import CensusMaximizer, Predictor, Scorer
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import threading
+import logging
+import heapq
+import time
+
+
+logger = logging.getLogger("scheduler")
+
+
+class IssueScheduler:
+    """
+    Answers the issues of many nations as they become due.
+
+    The nations must be logged in (have a password), as issues are private shards. Like for a `FleetMaximizer`, they
+    should share one `RateLimitedClient`, so they draw from a single rate limit budget.
+
+    Attributes:
+    -----------
+    nations: list[Nation]
+        The nations to answer issues for
+    predictor: Predictor
+        The predictor shared by all nations
+    scorer: Scorer
+        The scorer shared by all nations
+    max_workers: int
+        The maximum number of nations that are being woken up simultaneously
+    margin: float
+        Seconds to wait after the next issue time before waking a nation, as the clocks may differ slightly
+    retry_interval: float
+        Seconds to wait before waking a nation again if its next issue time is unknown or has passed, or if waking
+        it failed
+    maximizer_kwargs: dict
+        Additional arguments for the CensusMaximizer of each nation (e.g. `update_every`)
+    stats: dict
+        The number of `polls` (requests for the issues of a nation), of `empty_polls` (that found no issues),
+        of answered `issues` and of `failures`
+
+    Methods:
+    --------
+    run(until)
+        Answer the issues of all nations as they become due, yielding `(nation, record)` with an `IssueRecord` per issue
+    stop()
+        Make `run()` return once the nations that are being woken up are done
+    """
+    def __init__(
+        self, nations: list, predictor: Predictor, scorer: Scorer, max_workers: int = 8, margin: float = 5,
+        retry_interval: float = 600, **maximizer_kwargs,
+    ):
+        self.nations = list(nations)
+        if missing := [nation.name for nation in self.nations if nation.api.password is None]:
+            raise ValueError(f"The issues of {', '.join(missing)} can't be requested without their password")
+        self.predictor = predictor
+        self.scorer = scorer
+        self.max_workers = max_workers
+        self.margin = margin
+        self.retry_interval = retry_interval
+        self.maximizer_kwargs = maximizer_kwargs
+        self.stats = {'polls': 0, 'empty_polls': 0, 'issues': 0, 'failures': 0}
+
+        # (deadline, sequence number, nation); all nations are due at first, as their next issue time is unknown
+        self._queue = [(0, i, nation) for i, nation in enumerate(self.nations)]
+        self._sequence = len(self.nations)
+        self._stopped = threading.Event()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _schedule(self, nation: Nation, deadline: float):
+        heapq.heappush(self._queue, (deadline, self._sequence, nation))
+        self._sequence += 1
+
+    def _deadline(self, nation: Nation) -> float:
+        """ When to wake a nation next """
+        now = time.time()
+        if nation.next_issue_time is None or nation.next_issue_time + self.margin <= now:
+            return now + self.retry_interval
+        return nation.next_issue_time + self.margin
+
+    def _wake(self, nation: Nation) -> list:
+        """ Poll the issues of a nation and answer them, returning the records of the answered issues """
+        if nation.last_updated is None:
+            # a full update also loads the issues, and the maximizer needs the rest of the nation anyway
+            nation.update()
+        else:
+            nation.update_issues()
+        if not nation.issues:
+            return []
+
+        maximizer = CensusMaximizer(nation, self.predictor, self.scorer, **self.maximizer_kwargs)
+        return list(maximizer.run())
+
+    def run(self, until: float = None):
+        """
+        Answer issues as they become due, until `stop()` is called or, if given, the time `until` (a unix time)
+        has passed. Yields `(nation, record)` for every answered issue, with its `IssueRecord` (see `CensusMaximizer`).
+        """
+        self._stopped.clear()
+        in_flight = {}
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+
+        try:
+            while True:
+                if until is not None and time.time() >= until:
+                    self._stopped.set()
+
+                # wake the nations that are due, as far as there are workers free
+                now = time.time()
+                while (
+                    not self._stopped.is_set() and self._queue
+                    and self._queue[0][0] <= now and len(in_flight) < self.max_workers
+                ):
+                    _, _, nation = heapq.heappop(self._queue)
+                    in_flight[executor.submit(self._wake, nation)] = nation
+
+                if not in_flight and (self._stopped.is_set() or not self._queue):
+                    return
+
+                # sleep until the next nation is due, a nation is done, or the run is stopped
+                timeout = None
+                if self._queue and len(in_flight) < self.max_workers:
+                    timeout = max(0.0, self._queue[0][0] - time.time())
+                if until is not None:
+                    timeout = min(timeout if timeout is not None else float('inf'), max(0.0, until - time.time()))
+
+                if not in_flight:
+                    self._stopped.wait(timeout)
+                    continue
+
+                done, _ = wait(in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+                for future in done:
+                    nation = in_flight.pop(future)
+                    self.stats['polls'] += 1
+                    try:
+                        records = future.result()
+                    except Exception as e:
+                        logger.error(f"❌ Failed to answer the issues of {nation.name}: {e!r}")
+                        self.stats['failures'] += 1
+                        self._schedule(nation, time.time() + self.retry_interval)
+                        continue
+
+                    if not records:
+                        self.stats['empty_polls'] += 1
+                    self.stats['issues'] += len(records)
+                    self._schedule(nation, self._deadline(nation))
+                    for record in records:
+                        yield nation, record
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,313 @@
+"""
+Client for the NationStates Server-Sent Events happenings streams (https://www.nationstates.net/api/{buckets}).
+
+Events can be consumed with a blocking generator (`HappeningsStream.events()`)
+or, with the `async` extra installed, an async iterator (`HappeningsStream.aevents()`).
+When the connection drops, the stream reconnects and resumes from the last received event.
+"""
+from nstools.utils import format_for_query
+import requests
+import logging
+import asyncio
+import json
+import time
+import re
+
+
+logger = logging.getLogger("sse")
+
+base_url = "https://www.nationstates.net/api"
+
+# (event type, pattern) in order of precedence, matched against the plaintext of a happening
+event_patterns = [
+    ("refounding", r"was refounded in"),
+    ("founding", r"was founded in"),
+    ("cte", r"ceased to exist"),
+    ("move", r"relocated from"),
+    ("unendo", r"withdrew its endorsement"),
+    ("endo", r"endorsed"),
+    ("admission", r"was admitted to the World Assembly"),
+    ("resignation", r"resigned from the World Assembly"),
+    ("delegate", r"WA Delegate"),
+    ("vote", r"voted (for|against)"),
+    ("law", r"following new legislation"),
+    ("dispatch", r"published .* (dispatch|factbook)|published \""),
+    ("rmb", r"Regional Message Board"),
+    ("change", r"(changed|altered) its"),
+]
+event_patterns = [(event_type, re.compile(pattern, re.IGNORECASE)) for event_type, pattern in event_patterns]
+
+_line_end = re.compile(rb"\r\n|\r|\n")
+_nation_pattern = re.compile(r"@@([\w-]+)@@")
+_region_pattern = re.compile(r"%%([\w-]+)%%")
+
+
+def classify(text: str) -> str:
+    """ Determine the type of a happening from its text, or "other" if it is not recognized """
+    for event_type, pattern in event_patterns:
+        if pattern.search(text):
+            return event_type
+    return "other"
+
+
+class Happening:
+    """
+    An event received from a happenings stream.
+
+    Attributes
+    ----------
+    id : str
+        The id of the event, used to resume the stream
+    time : int
+        Unix timestamp of the event
+    text : str
+        The text of the event, with nations as @@name@@ and regions as %%name%%
+    html : str
+        The html representation of the event
+    event_type : str
+        The type of the event, see `classify`
+    nations : list[str]
+        The nations mentioned in the event
+    regions : list[str]
+        The regions mentioned in the event
+    """
+    def __init__(self, id: str, time: int, text: str, html: str = None):
+        self.id = id
+        self.time = time
+        self.text = text
+        self.html = html
+        self.event_type = classify(text)
+        self.nations = _nation_pattern.findall(text)
+        self.regions = _region_pattern.findall(text)
+
+    def __repr__(self):
+        return f"Happening({self.event_type!r}, {self.text!r})"
+
+    @classmethod
+    def from_data(cls, data: str, event_id: str = None):
+        """ Create a happening from the data field of a server-sent event """
+        payload = json.loads(data)
+        if not isinstance(payload, dict):
+            raise ValueError(f"Expected a JSON object, got {type(payload).__name__}")
+        if not isinstance(text := payload.get("str", ""), str):
+            raise ValueError(f"Expected a string as text, got {type(text).__name__}")
+        if event_id is None and payload.get("id") is not None:
+            event_id = str(payload["id"])
+        return cls(
+            id = event_id,
+            time = payload.get("time"),
+            text = text,
+            html = payload.get("htmlStr"),
+        )
+
+
+def _read_pieces(raw):
+    """ The (decoded) body of a streamed urllib3 response, in pieces as they arrive """
+    raw.decode_content = True
+    # read1 (urllib3 >= 2.3) returns whatever has arrived, readline at least stops at the end of a line
+    read = getattr(raw, "read1", None) or raw.readline
+    while piece := read(2**16):
+        yield piece
+
+
+def _split_lines(pieces):
+    """ Split a stream of bytes into lines ending in CRLF, LF or CR (as in the event stream format) """
+    pending = b""
+    after_cr = False
+    for piece in pieces:
+        # a CR ends the line right away (the event may be complete), but may be the first half of a CRLF
+        if after_cr and piece.startswith(b"\n"):
+            piece = piece[1:]
+        after_cr = piece.endswith(b"\r")
+
+        *lines, pending = _line_end.split(pending + piece)
+        for line in lines:
+            yield line.decode("utf-8")
+
+
+class _EventParser:
+    """ Incremental parser of the text/event-stream format, fed one line at a time """
+    def __init__(self):
+        self.data = []
+        self.event_id = None
+        self.retry = None
+
+    def feed(self, line: str):
+        """ Process a line, returning the data and id of an event if the line completes one """
+        if line == "":
+            if not self.data:
+                return None
+            data, self.data = "\n".join(self.data), []
+            return data, self.event_id
+
+        if line.startswith(":"): # comment, used as keep-alive
+            return None
+
+        field, _, value = line.partition(":")
+        if value.startswith(" "):
+            value = value[1:]
+
+        if field == "data":
+            self.data.append(value)
+        elif field == "id":
+            self.event_id = value
+        elif field == "retry" and value.isdigit():
+            self.retry = int(value) / 1000
+        return None
+
+
+class HappeningsStream:
+    """
+    A stream of happenings from the NationStates SSE API.
+
+    Events are selected on the server by `buckets` (e.g. "move" or "law"), `nations` and `regions`, and can
+    be filtered further on the client by `event_types` (see `classify`).
+    Reading from the stream does not count towards the API rate limit.
+
+    Attributes
+    ----------
+    url : str
+        The url of the stream
+    event_types : set[str]
+        If given, only happenings of these types are yielded
+    last_event_id : str
+        The id of the last received event, sent as Last-Event-ID when reconnecting
+    buffer_size : int
+        The maximum number of events buffered by `aevents` before it stops reading from the connection
+    """
+    def __init__(
+        self,
+        contact_info: str,
+        buckets: list = (),
+        nations: list = (),
+        regions: list = (),
+        event_types: list = None,
+        last_event_id: str = None,
+        buffer_size: int = 1000,
+        reconnect_delay: float = 3,
+        max_reconnect_delay: float = 60,
+        base_url: str = base_url,
+    ):
+        buckets = list(buckets)
+        buckets += [f"nation:{n.lower().replace(' ', '_')}" for n in nations]
+        buckets += [f"region:{r.lower().replace(' ', '_')}" for r in regions]
+        if not buckets:
+            raise ValueError("At least one bucket, nation or region must be given")
+
+        self.url = f"{base_url}/{format_for_query(buckets)}"
+        self.headers = {'User-Agent': contact_info, 'Accept': "text/event-stream"}
+        self.event_types = set(event_types) if event_types is not None else None
+        self.last_event_id = last_event_id
+        self.buffer_size = buffer_size
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+
+    def _request_headers(self):
+        if self.last_event_id is None:
+            return self.headers
+        return {**self.headers, 'Last-Event-ID': self.last_event_id}
+
+    def _accept(self, event):
+        """ Convert a parsed event to a Happening, or None if it is malformed or filtered out """
+        try:
+            happening = Happening.from_data(*event)
+        except ValueError:
+            logger.warning(f"⚠️ Skipping malformed happening: {event[0]!r}")
+            if event[1] is not None: # don't receive it again after reconnecting
+                self.last_event_id = event[1]
+            return None
+
+        if happening.id is not None:
+            self.last_event_id = happening.id
+        if self.event_types is not None and happening.event_type not in self.event_types:
+            return None
+        return happening
+
+    def _reconnect_delay(self, delay: float, parser: _EventParser, error: Exception):
+        if parser.retry is not None: # the server may ask for a specific delay
+            delay = parser.retry
+        logger.warning(f"⚠️ Happenings stream disconnected ({error!r}). Reconnecting in {round(delay)} seconds...")
+        return delay
+
+    def events(self):
+        """
+        Yield happenings as they arrive, reconnecting indefinitely.
+
+        Lines are only read from the connection when the consumer asks for the next event,
+        so a slow consumer does not cause unbounded buffering.
+        """
+        delay = self.reconnect_delay
+        while True:
+            parser = _EventParser()
+            try:
+                with requests.get(self.url, headers=self._request_headers(), stream=True, timeout=(10, 120)) as response:
+                    response.raise_for_status()
+                    delay = self.reconnect_delay
+
+                    # read whole lines as they arrive: iter_lines would hold back small events in chunks of 512
+                    # bytes, and can split a CRLF into two line ends
+                    for line in _split_lines(_read_pieces(response.raw)):
+                        if (event := parser.feed(line)) is not None:
+                            if (happening := self._accept(event)) is not None:
+                                yield happening
+                error = ConnectionError("stream closed by server")
+            except requests.RequestException as e:
+                error = e
+
+            delay = self._reconnect_delay(delay, parser, error)
+            time.sleep(delay)
+            delay = min(delay * 2, self.max_reconnect_delay)
+
+    async def aevents(self):
+        """
+        Asynchronously yield happenings as they arrive, reconnecting indefinitely (requires aiohttp).
+
+        A reader task parses events into a queue of at most `buffer_size` events.
+        When the queue is full, the reader waits, and stops reading from the connection until the consumer catches up.
+        """
+        queue = asyncio.Queue(maxsize=self.buffer_size)
+        reader = asyncio.ensure_future(self._read(queue))
+        try:
+            while True:
+                happening = await queue.get()
+                if isinstance(happening, BaseException):
+                    raise happening
+                yield happening
+        finally:
+            reader.cancel()
+
+    def __iter__(self):
+        return self.events()
+
+    def __aiter__(self):
+        return self.aevents()
+
+    async def _read(self, queue: asyncio.Queue):
+        import aiohttp # optional dependency
+
+        delay = self.reconnect_delay
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=10, sock_read=120)
+        try:
+            async with aiohttp.ClientSession(timeout=timeout) as session:
+                while True:
+                    parser = _EventParser()
+                    try:
+                        async with session.get(self.url, headers=self._request_headers()) as response:
+                            response.raise_for_status()
+                            delay = self.reconnect_delay
+
+                            async for line in response.content:
+                                if (event := parser.feed(line.decode("utf-8").rstrip("\r\n"))) is not None:
+                                    if (happening := self._accept(event)) is not None:
+                                        await queue.put(happening)
+                        error = ConnectionError("stream closed by server")
+                    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                        error = e
+
+                    delay = self._reconnect_delay(delay, parser, error)
+                    await asyncio.sleep(delay)
+                    delay = min(delay * 2, self.max_reconnect_delay)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            await queue.put(e)
@@ -1,15 +1,32 @@
 import requests
 import lxml.html as lh
 import re
+import os
+import json
+import time
+import zlib
+import sqlite3
+import logging
 from enum import Enum
+from contextlib import closing, contextmanager
 from nstools.utils import census_name_to_id
 
 
+logger = logging.getLogger("trotterdam")
+
+
 base_url = "http://www.mwq.dds.nl/ns/results/{issue_id}.html"
 
 easter_eggs = (77, 78, 80, 215, 223, 256, 266, 375, 408, 430, 471, 622, 1122, 1549)
 
 
+class IssueNotFound(ValueError):
+    """ The issue is not on Trotterdam (a 404), as opposed to a page that could not be loaded """
+    def __init__(self, issue_id):
+        self.issue_id = issue_id
+        super().__init__(f"Issue with ID {issue_id} not found (Trotterdam may be out of date)")
+
+
 class TrotterdamIssue:
     """ Contains all info (raw and parsed) obtained from an issue's page on Trotterdam """
     issue_id : int
@@ -18,17 +35,22 @@ class TrotterdamIssue:
     table    : list # raw data in trotterdam table
     outcomes : dict # maps option id (nationstates id is one less than what trotterdam shows) to Outcome object
 
-    def __init__(self, issue_id:int):
+    def __init__(self, issue_id:int, content:bytes = None):
         self.issue_id = issue_id
         self.table = list()
         self.outcomes = dict()
 
-        page = requests.get(base_url.format(issue_id = issue_id))
-        self.status = page.status_code
-        if self.status == 404:
-            raise ValueError(f"Issue with ID {issue_id} not found (Trotterdam may be out of date)")
+        if content is None:
+            page = requests.get(base_url.format(issue_id = issue_id), timeout=30)
+            self.status = page.status_code
+            if self.status == 404:
+                raise IssueNotFound(issue_id)
+            page.raise_for_status() # don't parse error pages as issues
+            content = page.content
+        else:
+            self.status = 200
 
-        doc = lh.fromstring(page.content)
+        doc = lh.fromstring(content)
         self.title  = doc.findtext('.//title')
         tr_elements = doc.xpath('//tr')
         self.table = [[t.text_content().strip() for t in row] for row in tr_elements]
@@ -41,6 +63,173 @@ class TrotterdamIssue:
                 self.outcomes[o] = outcome
                 self.outcomes[o]['output_text'] = effect
 
+    def dumps(self) -> str:
+        """ Serialize the parsed issue to a JSON string """
+        outcomes = {
+            o: {
+                **outcome,
+                'policy_changes': {k: v.name for k, v in outcome['policy_changes'].items()},
+                'notability_changes': {k: v.name for k, v in outcome['notability_changes'].items()},
+            }
+            for o, outcome in self.outcomes.items()
+        }
+        return json.dumps({'title': self.title, 'status': self.status, 'table': self.table, 'outcomes': outcomes})
+
+    @classmethod
+    def loads(cls, issue_id:int, data:str):
+        """ Reconstruct an issue from the output of `dumps`, without parsing the page again """
+        data = json.loads(data)
+        self = cls.__new__(cls)
+        self.issue_id = issue_id
+        self.title = data['title']
+        self.status = data['status']
+        self.table = data['table']
+        self.outcomes = {
+            int(o): {
+                **outcome,
+                'census_changes': {k: tuple(v) for k, v in outcome['census_changes'].items()},
+                'policy_changes': {k: PolicyChange[v] for k, v in outcome['policy_changes'].items()},
+                'notability_changes': {k: PolicyChange[v] for k, v in outcome['notability_changes'].items()},
+            }
+            for o, outcome in data['outcomes'].items()
+        }
+        return self
+
+
+class TrotterdamCache:
+    """
+    A persistent cache of Trotterdam pages, stored in an SQLite database.
+
+    Besides the (compressed) raw page, every entry stores its ETag/Last-Modified headers and the parsed issue,
+    so that a cache hit does not need to parse the page again. Entries older than `ttl` are revalidated with a
+    conditional request, and the least recently used entries are evicted once the cache grows beyond `max_size`.
+    Only successful responses are stored; if revalidating fails (a network error or an error status other than
+    404), the stale entry is used.
+    Every operation uses its own connection and transaction, so the cache can be shared between threads and
+    worker processes.
+
+    Attributes
+    ----------
+    path : str
+        The location of the database file
+    ttl : float
+        The number of seconds after which an entry is revalidated
+    max_size : int
+        The maximal total size of the cached entries in bytes
+    """
+    def __init__(self, path: str = None, ttl: float = 7 * 24 * 3600, max_size: int = 128 * 2**20):
+        if path is None:
+            cache_home = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+            path = os.path.join(cache_home, "nstools", "trotterdam.sqlite")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self.path = path
+        self.ttl = ttl
+        self.max_size = max_size
+
+        with self._connect() as db:
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS pages (
+                    issue_id      INTEGER PRIMARY KEY,
+                    page          BLOB,
+                    etag          TEXT,
+                    last_modified TEXT,
+                    parsed        TEXT,
+                    size          INTEGER,
+                    fetched_at    REAL,
+                    accessed_at   REAL
+                )
+            """)
+
+    @contextmanager
+    def _connect(self):
+        """ A connection that is committed and closed at the end of the with block """
+        # the context manager of a connection only commits, it doesn't close it
+        with closing(sqlite3.connect(self.path, timeout=30)) as db, db:
+            yield db
+
+    def get(self, issue_id: int) -> TrotterdamIssue:
+        """ Get an issue from the cache, downloading or revalidating it if necessary """
+        now = time.time()
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT etag, last_modified, parsed, fetched_at FROM pages WHERE issue_id = ?", (issue_id,)
+            ).fetchone()
+
+            if row is not None and now - row[3] < self.ttl:
+                db.execute("UPDATE pages SET accessed_at = ? WHERE issue_id = ?", (now, issue_id))
+                return TrotterdamIssue.loads(issue_id, row[2])
+
+        headers = {}
+        if row is not None:
+            if row[0]:
+                headers['If-None-Match'] = row[0]
+            if row[1]:
+                headers['If-Modified-Since'] = row[1]
+
+        try:
+            page = requests.get(base_url.format(issue_id = issue_id), headers=headers, timeout=30)
+        except requests.RequestException as e:
+            if row is None:
+                raise
+            logger.warning(f"⚠️ Could not revalidate Trotterdam issue {issue_id}, using the cached page: {e!r}")
+            return TrotterdamIssue.loads(issue_id, row[2])
+
+        if page.status_code == 304 and row is not None: # not modified
+            with self._connect() as db:
+                db.execute("UPDATE pages SET fetched_at = ?, accessed_at = ? WHERE issue_id = ?", (now, now, issue_id))
+            return TrotterdamIssue.loads(issue_id, row[2])
+
+        if page.status_code == 404:
+            self.remove(issue_id)
+            raise IssueNotFound(issue_id)
+
+        if page.status_code != 200: # e.g. a 5xx, 429 or an error page of a proxy, which is not an issue
+            if row is None:
+                raise requests.HTTPError(f"Trotterdam responded {page.status_code} for issue {issue_id}", response=page)
+            logger.warning(f"⚠️ Trotterdam responded {page.status_code} for issue {issue_id}, using the cached page")
+            return TrotterdamIssue.loads(issue_id, row[2])
+
+        issue = TrotterdamIssue(issue_id, page.content)
+        issue.status = page.status_code
+        self.store(issue, page.content, page.headers.get('ETag'), page.headers.get('Last-Modified'))
+        return issue
+
+    def store(self, issue: TrotterdamIssue, page: bytes, etag: str = None, last_modified: str = None):
+        """ Add an issue to the cache, and evict the least recently used entries if it grows too large """
+        now = time.time()
+        compressed = zlib.compress(page)
+        parsed = issue.dumps()
+        size = len(compressed) + len(parsed)
+
+        with self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (issue.issue_id, compressed, etag, last_modified, parsed, size, now, now)
+            )
+            db.execute("""
+                DELETE FROM pages WHERE issue_id IN (
+                    SELECT issue_id FROM (
+                        SELECT issue_id, SUM(size) OVER (ORDER BY accessed_at DESC, issue_id) AS total FROM pages
+                    ) WHERE total > ?
+                )
+            """, (self.max_size,))
+
+    def page(self, issue_id: int) -> bytes:
+        """ Get the raw cached page of an issue, or None if it is not cached """
+        with self._connect() as db:
+            row = db.execute("SELECT page FROM pages WHERE issue_id = ?", (issue_id,)).fetchone()
+        return zlib.decompress(row[0]) if row is not None else None
+
+    def remove(self, issue_id: int):
+        with self._connect() as db:
+            db.execute("DELETE FROM pages WHERE issue_id = ?", (issue_id,))
+
+    def clear(self):
+        with self._connect() as db:
+            db.execute("DELETE FROM pages")
+
 
 class PolicyChange(Enum):
     """ Represents the addition or removal of a policy or notability in issue outcome """
@@ -99,7 +288,7 @@ def parse_result(result):
 
             changes = out['policy_changes'] if is_policy else out['notability_changes']
             if value in changes:
-                changes[value] = PolicyChange.ADD_ORR_REMOVE
+                changes[value] = PolicyChange.MAY_ADD_ORR_REMOVE
             else:
                 changes[value] = PolicyChange((0.5 if sometimes else 1) * (1 if adds else -1))
 
@@ -0,0 +1,298 @@
+"""
+Compile the results of every issue on Trotterdam into a single outcome index, which can be loaded
+(memory-mapped) by `TrotterdamPredictor` to predict issue outcomes without touching the network.
+
+The index can be built with
+
+    python -m nstools.trotterdam_index trotterdam.idx
+
+Index format (version 1):
+- 8 bytes magic (b"NSTROTIX")
+- uint32 version, uint32 length of the header
+- JSON header, padded with spaces to a multiple of 8 bytes
+- float64 array of shape (rows, 3, len(census_ids)) with the (min, mean, max) change of each census scale,
+  NaN where the outcome does not affect the scale
+"""
+from nstools.trotterdam import TrotterdamIssue, TrotterdamCache, IssueNotFound, PolicyChange, easter_eggs
+from nstools.utils import census_ids, census_id_to_name
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import requests
+import argparse
+import logging
+import struct
+import json
+import time
+import os
+
+
+logger = logging.getLogger("trotterdam")
+
+MAGIC = b"NSTROTIX"
+VERSION = 1
+
+_census_index = {census_id_to_name[c]: i for i, c in enumerate(census_ids)}
+
+
+def _encode_changes(changes):
+    # PolicyChange values are multiples of 0.5, so they are stored as small integer codes
+    return {name: int(change.value * 2) for name, change in changes.items()}
+
+
+def _decode_changes(codes):
+    return {name: PolicyChange(code / 2) for name, code in codes.items()}
+
+
+class IndexedIssue:
+    """ An issue loaded from a `TrotterdamIndex`, with the same `outcomes` as the corresponding `TrotterdamIssue` """
+    def __init__(self, index, issue_id:int, title:str, rows:dict):
+        self.index = index
+        self.issue_id = issue_id
+        self.title = title
+        self.status = 200
+        self.rows = rows # maps option id to row in the index
+        self._outcomes = None
+
+    @property
+    def outcomes(self):
+        if self._outcomes is None:
+            self._outcomes = {option: self.index.outcome(row) for option, row in self.rows.items()}
+        return self._outcomes
+
+
+class TrotterdamIndex:
+    """
+    A precompiled index of Trotterdam outcomes.
+
+    The census changes are memory-mapped, so loading the index is cheap regardless of its size,
+    and looking up an issue is a single dictionary access.
+
+    Attributes
+    ----------
+    path : str
+        The location of the index file
+    census_ids : list[int]
+        The census ids corresponding to the last axis of `census`
+    census : np.ndarray
+        Memory-mapped array of shape (rows, 3, len(census_ids)) with the (min, mean, max) census changes
+    """
+    def __init__(self, path: str):
+        self.path = path
+
+        with open(path, "rb") as f:
+            magic, version, header_length = struct.unpack("<8sII", f.read(16))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a Trotterdam index")
+            if version != VERSION:
+                raise ValueError(f"Unsupported Trotterdam index version {version} (expected {VERSION})")
+            header = json.loads(f.read(header_length))
+
+        self.census_ids = header['census_ids']
+        self.census_names = [census_id_to_name[c] for c in self.census_ids]
+        self.meta = header['rows']
+        self.issues = {
+            int(issue_id): (title, {int(o): row for o, row in rows.items()})
+            for issue_id, (title, rows) in header['issues'].items()
+        }
+
+        shape = (len(self.meta), 3, len(self.census_ids))
+        if len(self.meta) > 0:
+            self.census = np.memmap(path, dtype="<f8", mode="r", offset=16 + header_length, shape=shape)
+        else:
+            self.census = np.zeros(shape, dtype="<f8")
+
+    def __reduce__(self):
+        # a copy (e.g. in a worker process) maps the file again, instead of copying the census changes
+        return TrotterdamIndex, (self.path,)
+
+    def __len__(self):
+        return len(self.issues)
+
+    def __contains__(self, issue_id: int):
+        return issue_id in self.issues
+
+    def __getitem__(self, issue_id: int) -> IndexedIssue:
+        title, rows = self.issues[issue_id]
+        return IndexedIssue(self, issue_id, title, rows)
+
+    def outcome(self, row: int) -> dict:
+        """ Reconstruct the outcome dictionary (as produced by `parse_result`) stored in a row """
+        meta = self.meta[row]
+        values = self.census[row]
+        present = np.flatnonzero(~np.isnan(values[1]))
+
+        outcome = {
+            'census_changes': {
+                self.census_names[i]: (float(values[0, i]), float(values[1, i]), float(values[2, i]))
+                for i in present
+            },
+            'policy_changes': _decode_changes(meta['policy_changes']),
+            'notability_changes': _decode_changes(meta['notability_changes']),
+        }
+        outcome.update({k: v for k, v in meta.items() if k not in outcome})
+        return outcome
+
+    @staticmethod
+    def write(path: str, issues: list):
+        """ Write an index containing the given TrotterdamIssues """
+        meta = []
+        census = []
+        header_issues = {}
+
+        for issue in sorted(issues, key=lambda i: i.issue_id):
+            rows = {}
+            for option, outcome in issue.outcomes.items():
+                rows[option] = len(meta)
+
+                row = np.full((3, len(census_ids)), np.nan, dtype="<f8")
+                for census_name, value in outcome['census_changes'].items():
+                    row[:, _census_index[census_name]] = value
+                census.append(row)
+
+                meta.append({
+                    **{k: v for k, v in outcome.items() if k != 'census_changes'},
+                    'policy_changes': _encode_changes(outcome['policy_changes']),
+                    'notability_changes': _encode_changes(outcome['notability_changes']),
+                })
+            header_issues[issue.issue_id] = (issue.title, rows)
+
+        header = json.dumps({
+            'census_ids': list(census_ids),
+            'rows': meta,
+            'issues': header_issues,
+        }).encode("utf-8")
+        header += b" " * (-(16 + len(header)) % 8) # align the census array
+
+        data = np.stack(census) if census else np.zeros((0, 3, len(census_ids)), dtype="<f8")
+
+        # write to a temporary file first, so readers never see a partially written index
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(struct.pack("<8sII", MAGIC, VERSION, len(header)))
+            f.write(header)
+            f.write(data.astype("<f8").tobytes())
+        os.replace(tmp_path, path)
+
+
+def _fetch(issue_id: int, cache: TrotterdamCache = None, retries: int = 3, backoff: float = 1):
+    """
+    Load an issue, retrying network errors and error responses (e.g. a 503 or 429) `retries` times with
+    exponential backoff before raising them. Raises `IssueNotFound` if the issue is not on Trotterdam.
+    """
+    for attempt in range(retries + 1):
+        try:
+            if cache is not None:
+                return cache.get(issue_id)
+            return TrotterdamIssue(issue_id)
+        except requests.RequestException as e:
+            if attempt == retries:
+                raise
+            delay = backoff * 2**attempt
+            logger.warning(f"⚠️ Failed to load Trotterdam issue {issue_id} ({e!r}). Retrying in {delay} seconds...")
+            time.sleep(delay)
+
+
+def _load(issue_id: int, cache: TrotterdamCache = None, backoff: float = 1):
+    """ (issue, exists): the issue (or None if it could not be parsed), and whether Trotterdam has a page for it """
+    try:
+        return _fetch(issue_id, cache, backoff=backoff), True
+    except IssueNotFound:
+        return None, False
+    except requests.RequestException:
+        raise
+    except Exception as e: # the page exists, but is not a valid issue
+        logger.warning(f"⚠️ Failed to parse Trotterdam issue {issue_id}: {e!r}")
+        return None, True
+
+
+def crawl(
+    issue_ids: list = None, workers: int = 8, cache: TrotterdamCache = None, stop_after: int = 50, backoff: float = 1,
+    skipped: list = None,
+):
+    """
+    Download and parse Trotterdam issues with a bounded pool of workers.
+
+    Only issues that are not on Trotterdam (404) are skipped. Network errors and error responses are retried,
+    and raised if they persist, so that an unreachable Trotterdam does not silently leave issues out.
+
+    Parameters
+    ----------
+    issue_ids : list[int]
+        The issues to load. If None, all issues are crawled starting from 0,
+        until `stop_after` consecutive ids past the last found issue are missing.
+    workers : int
+        The number of pages that are downloaded simultaneously
+    cache : TrotterdamCache
+        An optional cache to load the pages through
+    stop_after : int
+        See `issue_ids`
+    backoff : float
+        The delay (in seconds) before the first retry of a failed download, doubled for every next retry
+    skipped : list[int]
+        If given, the ids of the pages that could not be parsed are appended to it
+    """
+    issues = []
+    unparsed = []
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        if issue_ids is not None:
+            ids = [i for i in issue_ids if i not in easter_eggs]
+            for issue_id, (issue, exists) in zip(ids, executor.map(lambda i: _load(i, cache, backoff), ids)):
+                if issue is not None:
+                    issues.append(issue)
+                elif exists:
+                    unparsed.append(issue_id)
+
+        else:
+            # crawl in batches, until a whole stretch of ids after the last known issue is missing
+            last_found = -1
+            start = 0
+            while start <= last_found + stop_after:
+                ids = [i for i in range(start, start + max(workers, stop_after)) if i not in easter_eggs]
+                for issue_id, (issue, exists) in zip(ids, executor.map(lambda i: _load(i, cache, backoff), ids)):
+                    if exists:
+                        last_found = max(last_found, issue_id)
+                    if issue is not None:
+                        issues.append(issue)
+                    elif exists:
+                        unparsed.append(issue_id)
+                start += max(workers, stop_after)
+                logger.info(f"Crawled Trotterdam up to issue {start - 1}, found {len(issues)} issues")
+
+    if unparsed:
+        logger.warning(f"⚠️ Skipped {len(unparsed)} Trotterdam pages that could not be parsed: {unparsed}")
+    if skipped is not None:
+        skipped.extend(unparsed)
+    return issues
+
+
+def compile_index(
+    path: str, issue_ids: list = None, workers: int = 8, cache: TrotterdamCache = None, stop_after: int = 50,
+    skipped: list = None,
+):
+    """
+    Crawl Trotterdam (see `crawl`) and write the outcome index to `path`.
+    The ids of the pages that could not be parsed, and are missing from the index, are appended to `skipped`.
+    """
+    issues = crawl(issue_ids, workers=workers, cache=cache, stop_after=stop_after, skipped=skipped)
+    TrotterdamIndex.write(path, issues)
+    return TrotterdamIndex(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile the Trotterdam issue results into an outcome index")
+    parser.add_argument("path", help="where to write the index")
+    parser.add_argument("--workers", type=int, default=8, help="number of simultaneous downloads")
+    parser.add_argument("--cache", help="path of a TrotterdamCache database to load pages through")
+    parser.add_argument("--issues", type=int, nargs="*", help="only compile these issue ids")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    cache = TrotterdamCache(args.cache) if args.cache else None
+    skipped = []
+    index = compile_index(args.path, args.issues, workers=args.workers, cache=cache, skipped=skipped)
+    print(f"Wrote {len(index)} issues to {args.path}, skipped {len(skipped)} pages that could not be parsed")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,62 @@
 import html.parser
-import yaml
-import re
-import html
-import pkgutil
-
-
-_data = pkgutil.get_data(__name__, "data/census_names.yaml")
-census_id_to_name = yaml.safe_load(_data)
-census_ids, census_names = zip(*census_id_to_name.items())
-census_name_to_id = {name: id for id, name in census_id_to_name.items()}
-del _data
-
-_data = pkgutil.get_data(__name__, "data/html_escape_characters.yaml")
-html_escape_characters = yaml.safe_load(_data)
-entities_to_escape = {
-    k: v for k, v in html_escape_characters.items()
-    if not any(c in v for c in ("&", "<", ">", '"', "'"))
-}
-del _data
-
-_data = pkgutil.get_data(__name__, "data/census_distribution.yaml")
-census_distribution = yaml.safe_load(_data)
-census_mean = {c: census_distribution[c][0] for c in census_names}
-census_std = {c: census_distribution[c][1] for c in census_names}
-del _data
+
+
+# The census and entity tables are compiled from the YAML files in nstools/data (see scripts/compile_data.py),
+# and only loaded on first access through the module-level __getattr__ below.
+_census_attributes = ("census_id_to_name", "census_ids", "census_names", "census_name_to_id",
+                      "census_distribution", "census_mean", "census_std")
+_entity_attributes = ("html_escape_characters", "entities_to_escape")
+
+
+def _load_census():
+    from nstools._census_data import census_id_to_name, census_distribution
+    census_ids, census_names = zip(*census_id_to_name.items())
+
+    globals().update(
+        census_id_to_name = census_id_to_name,
+        census_ids = census_ids,
+        census_names = census_names,
+        census_name_to_id = {name: id for id, name in census_id_to_name.items()},
+        census_distribution = census_distribution,
+        census_mean = {c: census_distribution[c][0] for c in census_names},
+        census_std = {c: census_distribution[c][1] for c in census_names},
+    )
+
+
+def _load_entities():
+    global _entity_names, _entity_names_bytes
+    from nstools._entities import html_escape_characters
+    entities_to_escape = {
+        k: v for k, v in html_escape_characters.items()
+        if not any(c in v for c in ("&", "<", ">", '"', "'"))
+    }
+
+    globals().update(
+        html_escape_characters = html_escape_characters,
+        entities_to_escape = entities_to_escape,
+    )
+    # lookup tables for unescape, keyed by the entity name without "&" and ";"
+    _entity_names = {k[1:-1]: v for k, v in entities_to_escape.items()}
+    _entity_names_bytes = {k[1:-1].encode(): v.encode("utf-8") for k, v in entities_to_escape.items()}
+
+
+_entity_names = None
+_entity_names_bytes = None
+
+
+def __getattr__(name):
+    if name in _census_attributes:
+        _load_census()
+        return globals()[name]
+    if name in _entity_attributes:
+        _load_entities()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__():
+    return sorted(list(globals()) + list(_census_attributes) + list(_entity_attributes))
+
 
 def shard_key(shard):
     """ Map a shard name to the response key """
@@ -46,9 +79,34 @@ def format_for_query(object):
 
 
 def unescape(text):
-    """ Unescape HTML entities in a string, while leaving valid xml """
-    text = re.sub(r"&\w+;", lambda m: entities_to_escape.get(m.group(0), m.group(0)), text)
-    return text
+    """
+    Unescape HTML entities in a string, while leaving valid xml.
+    Also accepts utf-8 encoded bytes, in which case the result is bytes as well.
+    """
+    amp = b"&" if isinstance(text, bytes) else "&"
+    if amp not in text:
+        return text
+
+    if _entity_names is None:
+        _load_entities()
+    if isinstance(text, bytes):
+        semicolon, table = b";", _entity_names_bytes
+    else:
+        semicolon, table = ";", _entity_names
+
+    # every "&" starts a candidate entity, which runs up to the next ";"
+    # all names in the table are alphanumeric, so this matches exactly what r"&\w+;" would
+    pieces = text.split(amp)
+    out = [pieces[0]]
+    for piece in pieces[1:]:
+        end = piece.find(semicolon)
+        if end > 0 and (value := table.get(piece[:end])) is not None:
+            out.append(value)
+            out.append(piece[end + 1:])
+        else:
+            out.append(amp)
+            out.append(piece)
+    return text[:0].join(out)
 
 
 class HTMLExtractor(html.parser.HTMLParser):
@@ -0,0 +1,67 @@
+"""
+Compile the YAML files in nstools/data into python modules, which load much faster than parsing YAML.
+
+Run this after editing any of the YAML files:
+
+    python scripts/compile_data.py
+
+With --check, only verifies that the generated modules are up to date.
+"""
+import pathlib
+import argparse
+import yaml
+import sys
+
+
+package = pathlib.Path(__file__).resolve().parent.parent / "nstools"
+
+# generated module -> {variable: yaml file}
+modules = {
+    "_census_data.py": {
+        "census_id_to_name": "census_names.yaml",
+        "census_distribution": "census_distribution.yaml",
+    },
+    "_entities.py": {
+        "html_escape_characters": "html_escape_characters.yaml",
+    },
+}
+
+
+def render(variables: dict) -> str:
+    lines = [
+        "# Generated by scripts/compile_data.py from the YAML files in nstools/data, do not edit.",
+        "",
+    ]
+    for variable, filename in variables.items():
+        with open(package / "data" / filename, "rb") as f:
+            data = yaml.safe_load(f)
+        lines.append(f"{variable} = {{")
+        lines.extend(f"    {key!r}: {value!r}," for key, value in data.items())
+        lines.append("}")
+        lines.append("")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--check", action="store_true", help="only check that the generated modules are up to date")
+    args = parser.parse_args()
+
+    outdated = []
+    for module, variables in modules.items():
+        path = package / module
+        source = render(variables)
+        current = path.read_text(encoding="utf-8") if path.exists() else None
+        if current != source:
+            outdated.append(module)
+            if not args.check:
+                path.write_text(source, encoding="utf-8")
+
+    if args.check and outdated:
+        sys.exit(f"Outdated generated modules: {', '.join(outdated)} (run scripts/compile_data.py)")
+    elif outdated:
+        print(f"Updated {', '.join(outdated)}")
+
+
+if __name__ == "__main__":
+    main()
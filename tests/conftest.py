@@ -0,0 +1,34 @@
+from nstools.mockserver import MockNationStates
+from nstools.nsapi import NationStatesAPI
+from nstools.ratelimit import LocalRateLimiter
+from nstools.trotterdam import TrotterdamIssue
+from nstools.census_maximizer import TrotterdamPredictor
+import pathlib
+import pytest
+
+# the synthetic responses and Trotterdam pages of the benchmarks
+fixtures = pathlib.Path(__file__).parents[1] / "benchmarks" / "fixtures"
+
+
+@pytest.fixture
+def server():
+    responses = {
+        "nation": (fixtures / "nation.xml").read_bytes(),
+        "c=issue": (fixtures / "issue_answer.xml").read_bytes(),
+    }
+    with MockNationStates(responses=responses, policy="1000000;w=1") as server:
+        yield server
+
+
+@pytest.fixture
+def api(server):
+    return NationStatesAPI("nstools tests", limiter=LocalRateLimiter(1_000_000, 1), base_url=server.url)
+
+
+@pytest.fixture
+def predictor():
+    predictor = TrotterdamPredictor()
+    for path in sorted(fixtures.glob("trotterdam_*.html")):
+        issue_id = int(path.stem.split("_")[1])
+        predictor.issue_memo[issue_id] = TrotterdamIssue(issue_id, path.read_bytes())
+    return predictor
@@ -0,0 +1,71 @@
+from nstools.mockserver import MockNationStates
+from nstools.ratelimit import LocalRateLimiter
+from conftest import fixtures
+import asyncio
+import time
+import pytest
+
+pytest.importorskip("aiohttp")
+from nstools.async_nsapi import AsyncNationStatesAPI
+
+
+class RecordingLimiter(LocalRateLimiter):
+    def __init__(self, *args):
+        super().__init__(*args)
+        self.blocked = []
+
+    def block(self, seconds):
+        self.blocked.append(seconds)
+        super().block(seconds)
+
+
+def test_gather_shares_one_budget():
+    responses = {"nation": (fixtures / "nation.xml").read_bytes()}
+    with MockNationStates(responses=responses, policy="3;w=1") as server:
+        async def main():
+            async with AsyncNationStatesAPI("nstools tests", limiter=LocalRateLimiter(3, 1), base_url=server.url) as api:
+                return await asyncio.gather(*(api.nation(f"nation_{i}").parsed_shards(["policies"]) for i in range(7)))
+
+        start = time.monotonic()
+        results = asyncio.run(main())
+
+        # 3 requests per window: the last one waits for the third window, and the server never has to refuse one
+        assert len(results) == 7
+        assert server.stats == {200: 7}
+        assert time.monotonic() - start > 2
+
+
+def test_rate_limited_request_blocks_the_limiter_and_retries(server):
+    limiter = RecordingLimiter(1_000_000, 1)
+    server.inject(429)
+
+    async def main():
+        async with AsyncNationStatesAPI("nstools tests", limiter=limiter, base_url=server.url) as api:
+            return await api.nation("testlandia").parsed_shards(["policies"])
+
+    policies, = asyncio.run(main())
+    assert policies
+    assert limiter.blocked == [1]
+    assert server.stats == {429: 1, 200: 1}
+
+
+def test_commands(server):
+    server.responses["c=dispatch"] = b'<NATION id="testlandia"><SUCCESS>token-123</SUCCESS></NATION>'
+    events = []
+
+    async def main():
+        async with AsyncNationStatesAPI("nstools tests", limiter=LocalRateLimiter(1_000_000, 1), base_url=server.url) as api:
+            api.client.add_hook(events.append)
+            nation = api.nation("testlandia", password="tests")
+            dispatch = await nation.command("dispatch", dispatch="add", title="Test")
+            issue = await nation.command("issue", issue=1000, option=1)
+            return nation, dispatch, issue
+
+    nation, (_, token), issue = asyncio.run(main())
+    assert token == "token-123"
+    assert issue['OK'] == "1"
+
+    # the dispatch is prepared, then executed with the token; issues are answered in one step
+    modes = [(event.params.get('c'), event.params.get('mode'), event.params.get('token')) for event in events]
+    assert modes == [("dispatch", "prepare", None), ("dispatch", "execute", "token-123"), ("issue", None, None)]
+    assert nation.auth_headers['X-Pin'] == "1234567890"
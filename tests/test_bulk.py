@@ -0,0 +1,45 @@
+from nstools.mockserver import MockNationStates
+from nstools.nsapi import NationStatesAPI
+from nstools.ratelimit import LocalRateLimiter
+from nstools.bulk import CensusCollector
+from nstools.utils import census_id_to_name, census_names
+import numpy as np
+
+names = [f"nation_{i}" for i in range(25)]
+
+responses = {
+    "region?q=nations": f"<REGION id=\"test\"><NATIONS>{':'.join(names)}</NATIONS></REGION>".encode(),
+    # every page returns the first 20 nations; the second page fails below
+    "region?q=censusranks": (
+        "<REGION id=\"test\"><CENSUSRANKS id=\"0\"><NATIONS>"
+        + "".join(f"<NATION><NAME>{name}</NAME><RANK>{i + 1}</RANK><SCORE>{i}.5</SCORE></NATION>" for i, name in enumerate(names[:20]))
+        + "</NATIONS></CENSUSRANKS></REGION>"
+    ).encode(),
+    "nation?q=census": b"<NATION id=\"x\"><CENSUS><SCALE id=\"0\"><SCORE>99</SCORE></SCALE></CENSUS></NATION>",
+}
+
+
+class FailingCollector(CensusCollector):
+    def _page(self, census_id, start):
+        if start > 1:
+            raise ConnectionError("connection reset")
+        return super()._page(census_id, start)
+
+
+def collect(fill_gaps: bool):
+    with MockNationStates(responses=responses, policy="1000;w=1") as server:
+        api = NationStatesAPI("nstools tests", limiter=LocalRateLimiter(1000, 1), base_url=server.url)
+        table = FailingCollector(api.region("test"), workers=4, fill_gaps=fill_gaps).collect([0])
+    return table.census[:, census_names.index(census_id_to_name[0])]
+
+
+def test_failed_page_is_left_missing():
+    scores = collect(fill_gaps=False)
+    assert scores[:20].tolist() == [i + 0.5 for i in range(20)]
+    assert np.isnan(scores[20:]).all()
+
+
+def test_failed_page_is_filled_in():
+    scores = collect(fill_gaps=True)
+    assert scores[:20].tolist() == [i + 0.5 for i in range(20)]
+    assert scores[20:].tolist() == [99] * 5
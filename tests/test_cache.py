@@ -0,0 +1,38 @@
+from nstools.cache import ResponseCache
+from nstools.nsapi import NationStatesAPI
+import pytest
+
+
+@pytest.fixture(params=[False, True], ids=["memory", "sqlite"])
+def cached_api(request, server, tmp_path):
+    cache = ResponseCache(path=str(tmp_path / "responses.sqlite") if request.param else None)
+    api = NationStatesAPI("nstools tests", base_url=server.url, cache=cache)
+    return api, cache
+
+
+def test_hits_are_independent_copies(server, cached_api):
+    api, cache = cached_api
+    nation = api.nation("testlandia")
+
+    first = nation.parsed_shards(["policies", "notables", "census"])
+    first[0].append("Corrupted")
+    first[1].clear()
+    first[2][0] = -1.0
+
+    second = nation.parsed_shards(["policies", "notables", "census"])
+    assert "Corrupted" not in second[0] and second[1] and second[2][0] != -1.0
+    second[0].append("Corrupted")
+
+    third = nation.parsed_shards(["policies", "notables", "census"])
+    assert "Corrupted" not in third[0]
+    assert cache.stats['hits'] == 2 and sum(server.stats.values()) == 1
+
+
+def test_persisted_responses_survive_a_new_cache(server, tmp_path):
+    path = str(tmp_path / "responses.sqlite")
+    NationStatesAPI("nstools tests", base_url=server.url, cache=ResponseCache(path=path)).nation("testlandia").parsed_shards(["policies"])
+
+    cache = ResponseCache(path=path)
+    policies, = NationStatesAPI("nstools tests", base_url=server.url, cache=cache).nation("testlandia").parsed_shards(["policies"])
+    assert cache.stats['disk_hits'] == 1 and sum(server.stats.values()) == 1
+    assert policies
@@ -0,0 +1,102 @@
+from nstools.census_maximizer import CensusMaximizer, Predictor, PredictorPool, NormalizedScorer, _predict_in_worker
+from nstools.outcome_log import OutcomeLog, EmpiricalPredictor
+from nstools.nation import Nation
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+import os
+import pytest
+
+
+class CountingPredictor(Predictor):
+    """ Delegates to a predictor, counting the issues it saw in this copy of it """
+    def __init__(self, predictor):
+        super().__init__()
+        self.predictor = predictor
+        self.seen = []
+
+    def __call__(self, nation_dict, issue, option_id):
+        self.seen.append(issue.id)
+        prediction = self.predictor(nation_dict, issue, option_id)
+        prediction.worker = (os.getpid(), len(self.seen))
+        return prediction
+
+    def options(self, issue_id):
+        return self.predictor.options(issue_id)
+
+    def leads_to(self, issue, option_id):
+        return self.predictor.leads_to(issue, option_id)
+
+
+def run(api, predictor, **kwargs) -> list:
+    nation = Nation(api.nation("testlandia", password="tests"))
+    return list(CensusMaximizer(nation, predictor, NormalizedScorer(), update_every=10, **kwargs).run())
+
+
+def test_predictor_pool_matches_serial(api, predictor):
+    serial = run(api, predictor)
+    with PredictorPool(predictor, max_workers=2) as pool:
+        pooled = run(api, predictor, executor=pool)
+
+    assert [record.choice for record in pooled] == [record.choice for record in serial]
+    assert [record.option_scores for record in pooled] == pytest.approx([record.option_scores for record in serial])
+
+
+def test_lookahead_predicts_through_the_pool(api, predictor):
+    counting = CountingPredictor(predictor)
+    serial = run(api, predictor, lookahead_depth=2)
+    with PredictorPool(counting, max_workers=2) as pool:
+        pooled = run(api, counting, lookahead_depth=2, executor=pool)
+
+    assert [record.option_scores for record in pooled] == pytest.approx([record.option_scores for record in serial])
+    # the issues the lookahead expects to follow were also predicted in the workers
+    assert counting.seen == []
+
+
+def test_predictor_pool_keeps_worker_state(api, predictor):
+    counting = CountingPredictor(predictor)
+    nation = Nation(api.nation("testlandia", password="tests"))
+    issue = nation.issues[0]
+
+    with PredictorPool(counting, max_workers=1) as pool:
+        first = pool.submit(_predict_in_worker, nation.snapshot(), issue, [0]).result()[0].worker
+        second = pool.submit(_predict_in_worker, nation.snapshot(), issue, [0]).result()[0].worker
+
+    # the same copy of the predictor handled both tasks
+    assert first[0] == second[0] and (first[1], second[1]) == (1, 2)
+    assert counting.seen == []
+
+
+def test_plain_process_pool_is_rejected(api, predictor):
+    nation = Nation(api.nation("testlandia", password="tests"))
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        with pytest.raises(ValueError, match="PredictorPool"):
+            CensusMaximizer(nation, predictor, NormalizedScorer(), executor=pool)
+
+
+def test_empirical_predictor_is_rejected(tmp_path, predictor):
+    with OutcomeLog(str(tmp_path)) as log:
+        with pytest.raises(ValueError, match="EmpiricalPredictor"):
+            PredictorPool(EmpiricalPredictor(log, predictor))
+
+
+def test_answers_update_the_nation_by_default(api, predictor):
+    events = []
+    api.client.add_hook(events.append)
+    nation = Nation(api.nation("testlandia", password="tests"))
+    records = list(islice(CensusMaximizer(nation, predictor, NormalizedScorer()).run(), 2))
+
+    # the mock server always returns the same state, including the answered issues
+    assert len(records) == 2
+    assert [event.kind for event in events] == ["nation", "command", "nation", "command", "nation"]
+
+
+def test_answers_patch_the_nation(api, predictor):
+    events = []
+    api.client.add_hook(events.append)
+    nation = Nation(api.nation("testlandia", password="tests"))
+    records = list(CensusMaximizer(nation, predictor, NormalizedScorer(), update_every=None).run())
+
+    # the nation is loaded once, and then only patched from the 5 answers
+    assert len(records) == 5
+    assert [event.kind for event in events] == ["nation"] + ["command"] * 5
+    assert records[-1].new_dict['census_data'] != records[0].initial_dict['census_data']
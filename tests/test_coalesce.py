@@ -0,0 +1,28 @@
+from nstools.nsapi import NationStatesAPI
+from nstools.ratelimit import LocalRateLimiter
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+
+def test_callers_get_independent_copies(server):
+    api = NationStatesAPI("nstools tests", limiter=LocalRateLimiter(1_000_000, 1), base_url=server.url, coalesce_delay=0.2)
+    nation = api.nation("testlandia")
+    barrier = threading.Barrier(4)
+
+    def request(i):
+        barrier.wait()
+        if i % 2:
+            policies, notables = nation.parsed_shards(["policies", "notables"])
+        else:
+            notables, policies = nation.parsed_shards(["notables", "policies"])
+        original = (list(policies), list(notables))
+        policies.append(f"Policy of caller {i}")
+        notables.clear()
+        return original
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(request, range(4)))
+
+    assert sum(server.stats.values()) == 1 # all callers shared one request
+    assert all(result == results[0] for result in results)
+    assert results[0][1] and not any(policy.startswith("Policy of caller") for policy in results[0][0])
@@ -0,0 +1,72 @@
+from nstools.dump import iter_batches, nation_record, write_feather
+from lxml import etree
+import pytest
+import gzip
+
+
+def write_dump(path, nations: int):
+    with gzip.open(path, "wb") as f:
+        f.write(b'<?xml version="1.0" encoding="UTF-8"?>\n<NATIONS>\n')
+        for i in range(nations):
+            # varying sizes, so the blocks read by the workers hold different numbers of nations
+            policies = "".join(f"<POLICY><NAME>Policy {j}</NAME><CAT>Law</CAT></POLICY>" for j in range(i % 3))
+            f.write((
+                f"<NATION><NAME>nation_{i}</NAME><MOTTO>{'x' * (i * 37 % 3000)}</MOTTO><POLICIES>{policies}</POLICIES>"
+                f"<CENSUS><SCALE id=\"0\"><SCORE>{i}</SCORE></SCALE></CENSUS></NATION>\n"
+            ).encode())
+        f.write(b"</NATIONS>\n")
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_batches_have_batch_size(tmp_path, workers):
+    path = tmp_path / "nations.xml.gz"
+    write_dump(path, 2500)
+
+    batches = list(iter_batches(str(path), batch_size=300, workers=workers))
+    assert [len(batch) for batch in batches] == [300] * 8 + [100]
+    assert [record['name'] for batch in batches for record in batch] == [f"nation_{i}" for i in range(2500)]
+
+
+def test_repeated_children_are_listed():
+    element = etree.fromstring(
+        "<NATION><POLICIES><POLICY><NAME>Welfare</NAME></POLICY><POLICY><NAME>Autocracy</NAME></POLICY></POLICIES>"
+        "<NOTABLES><NOTABLE>ski resorts</NOTABLE><NOTABLE>bureaucracy</NOTABLE></NOTABLES>"
+        "<GROUP><ITEM>a</ITEM><ITEM>b</ITEM><ITEM>c</ITEM><OTHER>d</OTHER></GROUP>"
+        "<DEATHS><CAUSE type=\"Old Age\">4.0</CAUSE><CAUSE type=\"Cancer\">6.9</CAUSE></DEATHS></NATION>"
+    )
+    record = nation_record(element)
+    assert record['policies'] == [{'name': "Welfare"}, {'name': "Autocracy"}]
+    assert record['notables'] == ["ski resorts", "bureaucracy"]
+    assert record['group.item'] == ["a", "b", "c"]
+    assert record['group.other'] == "d"
+    assert record['deaths.Old Age'] == 4.0 and record['deaths.Cancer'] == 6.9
+
+
+def test_write_feather_lists(tmp_path):
+    feather = pytest.importorskip("pyarrow.feather")
+    path = tmp_path / "nations.xml.gz"
+    write_dump(path, 10)
+
+    assert write_feather(str(path), str(tmp_path / "nations.feather"), batch_size=4) == 10
+    table = feather.read_table(tmp_path / "nations.feather")
+    assert table.column("policies").to_pylist()[2] == [{'name': "Policy 0", 'cat': "Law"}, {'name': "Policy 1", 'cat': "Law"}]
+
+
+def test_write_feather_unifies_batches(tmp_path):
+    feather = pytest.importorskip("pyarrow.feather")
+    path = tmp_path / "nations.xml"
+    nations = [
+        "<NATION><NAME>a</NAME><GROUP><ITEM>1</ITEM></GROUP><POLICIES></POLICIES></NATION>",
+        "<NATION><NAME>b</NAME><GROUP><ITEM>2</ITEM></GROUP><POLICIES></POLICIES></NATION>",
+        # only in the second batch: a repeated child, a new column and the children of policies
+        "<NATION><NAME>c</NAME><GROUP><ITEM>3</ITEM><ITEM>4</ITEM></GROUP><MOTTO>m</MOTTO>"
+        "<POLICIES><POLICY><NAME>Welfare</NAME></POLICY></POLICIES></NATION>",
+    ]
+    path.write_text(f"<NATIONS>{''.join(nations)}</NATIONS>")
+
+    assert write_feather(str(path), str(tmp_path / "nations.feather"), batch_size=2) == 3
+    table = feather.read_table(tmp_path / "nations.feather")
+    assert table.column("group.item").to_pylist() == [["1"], ["2"], ["3", "4"]]
+    assert table.column("motto").to_pylist() == [None, None, "m"]
+    assert table.column("policies").to_pylist() == [[], [], [{'name': "Welfare"}]]
+    assert not any(p.name.startswith(".nations.") for p in tmp_path.iterdir())
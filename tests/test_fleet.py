@@ -0,0 +1,18 @@
+from nstools.fleet import FleetMaximizer
+from nstools.census_maximizer import NormalizedScorer
+from nstools.nation import Nation
+
+
+def test_duplicate_nations_are_run_once(api, predictor):
+    events = []
+    api.client.add_hook(events.append)
+    nation = Nation(api.nation("testlandia", password="tests"), load=False)
+    same_name = Nation(api.nation("Testlandia", password="tests"), load=False)
+
+    fleet = FleetMaximizer([nation, nation, same_name], predictor, NormalizedScorer(), max_workers=3, update_every=None)
+    assert fleet.nations == [nation]
+
+    # every issue of the nation is answered exactly once
+    records = list(fleet.run())
+    assert len(records) == 5 and all(record[0] is nation for record in records)
+    assert [event.kind for event in events].count("command") == 5
@@ -0,0 +1,75 @@
+from nstools.lookahead import Lookahead
+from nstools.census_maximizer import Predictor, Scorer, OutcomePrediction
+from nstools.nation import NationSnapshot
+from nstools.utils import census_names
+import pytest
+
+state = NationSnapshot({'census_data': {}, 'policies': [], 'notables': [], 'wa': False})
+
+
+class Issue:
+    def __init__(self, issue_id: int, options: list):
+        self.id = issue_id
+        self.options = {option: "" for option in options}
+
+
+class ChainPredictor(Predictor):
+    """
+    Issue 1: option 0 is worth 1 now, option 1 is worth 0 now but adds a policy and leads to issue 2.
+    Issue 2: option 0 is worth 10 with the policy (and nothing without it).
+    """
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+
+    def options(self, issue_id):
+        return [0, 1] if issue_id == 1 else [0]
+
+    def leads_to(self, issue, option_id):
+        return 2 if (issue.id, option_id) == (1, 1) else None
+
+    def __call__(self, nation_dict, issue, option_id):
+        self.calls += 1
+        policies = {policy: 1 for policy in nation_dict['policies']}
+        if (issue.id, option_id) == (1, 1):
+            policies["Policy"] = 1
+        census = dict.fromkeys(census_names, 0)
+        census[census_names[0]] = 1 if (issue.id, option_id) == (1, 0) else 0
+        return OutcomePrediction(census, policies, {}, False)
+
+
+class PolicyScorer(Scorer):
+    """ Scores the first census scale, and issue 2 only if the nation has the policy (not linear) """
+    def score_prediction(self, nation_dict, prediction):
+        score = prediction.census_changes[census_names[0]]
+        if "Policy" in nation_dict['policies'] and "Policy" in prediction.policies:
+            score += 10
+        return score
+
+
+def test_state_dependent_scorer_is_not_pruned():
+    lookahead = Lookahead(ChainPredictor(), PolicyScorer(), depth=1, discount=1)
+    scores = lookahead.option_scores(state, Issue(1, [0, 1]))
+
+    # bounding issue 2 on the current state (without the policy) would have pruned option 1
+    assert scores[1] == 10 and max(scores, key=scores.get) == 1
+    assert lookahead.stats['pruned'] == 0
+
+
+def test_memo_is_cleared_when_the_predictor_changes():
+    predictor = ChainPredictor()
+    lookahead = Lookahead(predictor, PolicyScorer(), depth=1)
+
+    lookahead.option_scores(state, Issue(1, [0, 1]))
+    calls = predictor.calls
+    lookahead.option_scores(state, Issue(1, [0, 1]))
+    assert predictor.calls == 2 * calls # no version, so nothing is reused
+
+    predictor.version = 1
+    lookahead.option_scores(state, Issue(1, [0, 1]))
+    lookahead.option_scores(state, Issue(1, [0, 1]))
+    assert predictor.calls == 3 * calls # reused while the version is the same
+
+    predictor.version = 2
+    lookahead.option_scores(state, Issue(1, [0, 1]))
+    assert predictor.calls == 4 * calls
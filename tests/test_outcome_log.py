@@ -0,0 +1,75 @@
+from nstools.outcome_log import OutcomeLog, EmpiricalPredictor
+from nstools.lookahead import _FutureIssue
+from nstools.utils import census_ids
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import os
+
+
+def row(value: float) -> np.ndarray:
+    return np.full(len(census_ids), value)
+
+
+def test_partial_row_is_discarded(tmp_path):
+    with OutcomeLog(str(tmp_path)) as log:
+        log.append(1, 0, row(1), row(10))
+
+    # a crash in the middle of an append: only some of the columns received the second row
+    with open(tmp_path / "issue.i4", "ab") as f:
+        f.write(np.asarray([2], dtype="<i4").tobytes())
+    with open(tmp_path / "pre.f8", "ab") as f:
+        f.write(row(2).tobytes()[:100])
+
+    with OutcomeLog(str(tmp_path)) as log:
+        assert len(log) == 1
+        log.append(3, 1, row(3), row(30))
+
+        columns = log.columns()
+        assert columns['issue'].tolist() == [1, 3]
+        assert columns['option'].tolist() == [0, 1]
+        assert columns['pre'][:, 0].tolist() == [1, 3]
+        assert columns['change'][:, 0].tolist() == [10, 30]
+        assert len(columns['time']) == 2
+
+    for file in ("issue.i4", "option.i4", "time.f8"):
+        assert os.path.getsize(tmp_path / file) // (4 if file.endswith("i4") else 8) == 2
+
+
+def test_reopen_keeps_aggregates(tmp_path):
+    with OutcomeLog(str(tmp_path)) as log:
+        log.append_many([5, 5], [2, 2], [row(0), row(0)], [row(1), row(3)])
+
+    with OutcomeLog(str(tmp_path)) as log:
+        assert len(log) == 2
+        count, mean, _ = log.aggregate(5, 2)
+        assert count[0] == 2 and mean[0] == 2
+
+
+def test_aggregates_can_be_read_while_appending(tmp_path):
+    with OutcomeLog(str(tmp_path)) as log:
+        def append(issue_id):
+            for option_id in range(200):
+                log.append(issue_id, option_id, row(0), row(1))
+
+        def read(issue_id):
+            # every new option grows the aggregate arrays, which must never be read past their end
+            while len(log.options(issue_id)) < 200:
+                option_id = log.options(issue_id)[-1:] or [0]
+                log.aggregate(issue_id, option_id[0])
+                log.observations(issue_id, option_id[0])
+
+        with ThreadPoolExecutor(4) as executor:
+            futures = [executor.submit(read, i) for i in range(2)] + [executor.submit(append, i) for i in range(2)]
+            for future in futures:
+                future.result()
+        assert len(log) == 400
+
+
+def test_empirical_predictor_without_fallback(tmp_path):
+    with OutcomeLog(str(tmp_path)) as log:
+        log.append_many([7, 7, 8], [2, 0, 1], [row(0)] * 3, [row(1)] * 3)
+        predictor = EmpiricalPredictor(log)
+
+        assert predictor.options(7) == [0, 2]
+        assert predictor.options(9) == []
+        assert predictor.leads_to(_FutureIssue(7, [0, 2]), 0) is None
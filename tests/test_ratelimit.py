@@ -0,0 +1,35 @@
+from nstools.nsapi import NationStatesAPI
+from nstools.ratelimit import LocalRateLimiter, SharedRateLimiter
+import datetime
+import pytest
+
+
+@pytest.fixture(params=["local", "shared"])
+def limiter(request, tmp_path):
+    if request.param == "local":
+        return LocalRateLimiter(50, 30)
+    return SharedRateLimiter(path=str(tmp_path / "ratelimit"), limit=50, window=30)
+
+
+def test_client_exposes_the_limiter_state(server, limiter):
+    client = NationStatesAPI("nstools tests", limiter=limiter, base_url=server.url).client
+    assert (client.limit, client.window) == (50, 30)
+
+    client.request(nation="testlandia", q="policies")
+    # reconciled with the policy of the server
+    assert (client.limit, client.window) == (1_000_000, 1)
+    assert client.remaining_requests == limiter.state()['remaining'] < client.limit
+
+    until_reset = (client.reset_time - datetime.datetime.now()).total_seconds()
+    assert 0 < until_reset < 5
+
+
+def test_client_attributes_can_be_assigned(limiter):
+    client = NationStatesAPI("nstools tests", limiter=limiter).client
+    client.limit = 10
+    client.remaining_requests = 0
+    client.reset_time = datetime.datetime.now() + datetime.timedelta(seconds=20)
+
+    # the limiter is changed, so every client sharing it waits
+    assert limiter.state()['limit'] == 10 and client.remaining_requests == 0
+    assert 19 < limiter.try_acquire() <= 20
@@ -0,0 +1,81 @@
+from nstools.scheduler import IssueScheduler
+from nstools.census_maximizer import IssueRecord, NormalizedScorer
+from nstools.nation import Nation
+from conftest import fixtures
+from itertools import islice
+import time
+import re
+import pytest
+
+
+def nation_response(next_issue_time: int, issues: bool = False) -> bytes:
+    """ The recorded nation, optionally without issues, with another next issue time """
+    xml = (fixtures / "nation.xml").read_text("utf-8")
+    if not issues:
+        xml = re.sub(r"<ISSUES>.*</ISSUES>", "<ISSUES></ISSUES>", xml, flags=re.DOTALL)
+    return re.sub(r"<NEXTISSUETIME>\d+</NEXTISSUETIME>", f"<NEXTISSUETIME>{next_issue_time}</NEXTISSUETIME>", xml).encode()
+
+
+def polls(events: list) -> list:
+    """ The nations of which the issues were requested """
+    return [event.params['nation'] for event in events if event.shards == ("issues", "nextissuetime")]
+
+
+def scheduler(api, predictor, names, **kwargs) -> IssueScheduler:
+    nations = [Nation(api.nation(name, password="tests"), load=False) for name in names]
+    return IssueScheduler(nations, predictor, NormalizedScorer(), **kwargs)
+
+
+def test_nations_are_woken_in_order_of_their_next_issue(server, api, predictor):
+    now = int(time.time())
+    for name, delay in (("a", 2), ("b", 3), ("c", 1)):
+        server.responses[f"nation=nation_{name}"] = nation_response(now + delay)
+    events = []
+    api.client.add_hook(events.append)
+
+    s = scheduler(api, predictor, ["nation_a", "nation_b", "nation_c"], margin=0, retry_interval=100)
+    assert list(s.run(until=now + 3.5)) == []
+
+    # the first wake loads the nations, after that only their issues are requested
+    assert polls(events) == ["nation_c", "nation_a", "nation_b"]
+    assert s.stats == {'polls': 6, 'empty_polls': 6, 'issues': 0, 'failures': 0}
+
+
+def test_stale_next_issue_time_is_retried(server, api, predictor):
+    server.responses["nation"] = nation_response(int(time.time()) - 3600)
+
+    s = scheduler(api, predictor, ["nation_a"], margin=0, retry_interval=0.2)
+    assert list(s.run(until=time.time() + 1)) == []
+    assert 3 <= s.stats['polls'] <= 6
+    assert s.stats['polls'] == s.stats['empty_polls'] and s.stats['failures'] == 0
+
+
+def test_failed_wake_is_retried(server, api, predictor):
+    server.responses["nation"] = nation_response(int(time.time()) + 3600)
+    server.inject(524)
+
+    s = scheduler(api, predictor, ["nation_a"], retry_interval=0.2)
+    assert list(s.run(until=time.time() + 0.5)) == []
+    assert s.stats == {'polls': 2, 'empty_polls': 1, 'issues': 0, 'failures': 1}
+    assert s.nations[0].next_issue_time is not None
+
+
+def test_records_are_yielded_after_one_load(server, api, predictor):
+    server.responses["nation"] = nation_response(int(time.time()) + 3600, issues=True)
+    events = []
+    api.client.add_hook(events.append)
+
+    s = scheduler(api, predictor, ["nation_a"], update_every=10)
+    records = list(islice(s.run(until=time.time() + 10), 5))
+
+    assert len(records) == 5
+    for nation, record in records:
+        assert nation is s.nations[0]
+        assert isinstance(record, IssueRecord) and 'decide' in record.timings
+    # the nation is loaded once, by the scheduler, before the issues are answered
+    assert [event.kind for event in events] == ["nation"] + ["command"] * 5
+
+
+def test_password_is_required(api, predictor):
+    with pytest.raises(ValueError, match="nation_b"):
+        IssueScheduler([Nation(api.nation("nation_b"), load=False)], predictor, NormalizedScorer())
@@ -0,0 +1,97 @@
+from nstools.mockserver import MockNationStates
+from nstools.sse import HappeningsStream, Happening, _split_lines
+from itertools import islice
+import threading
+import asyncio
+import pytest
+
+
+def happening(i: int) -> dict:
+    return {"str": f"@@nation_{i}@@ relocated from %%a%% to %%b%%.", "time": 1700000000 + i}
+
+
+def stream(server, **kwargs) -> HappeningsStream:
+    return HappeningsStream("nstools tests", buckets=["move"], reconnect_delay=0.01, base_url=server.sse_url, **kwargs)
+
+
+def test_resume_after_disconnect():
+    with MockNationStates(stream_limit=2) as server:
+        for i in range(5):
+            server.publish(happening(i))
+
+        events = list(islice(stream(server).events(), 5))
+
+        assert [event.nations for event in events] == [[f"nation_{i}"] for i in range(5)]
+        assert [event.id for event in events] == ["1", "2", "3", "4", "5"]
+        assert [event_id for _, event_id in server.streams[:3]] == [None, "2", "4"]
+
+
+def test_resume_from_given_event():
+    with MockNationStates() as server:
+        for i in range(3):
+            server.publish(happening(i))
+
+        event, = islice(stream(server, last_event_id="2").events(), 1)
+        assert event.id == "3"
+
+
+def test_malformed_payloads_are_skipped():
+    with MockNationStates() as server:
+        for payload in ([], "x", 1, {"str": None}, happening(0)):
+            server.publish(payload)
+
+        s = stream(server)
+        event, = islice(s.events(), 1)
+        assert event.nations == ["nation_0"]
+        assert s.last_event_id == "5"
+
+
+@pytest.mark.parametrize("line_ending", ["\n", "\r\n", "\r"])
+def test_multi_line_events(line_ending):
+    with MockNationStates(line_ending=line_ending) as server:
+        for i in range(3):
+            server.publish(happening(i), indent=2) # every field of the payload on a data line of its own
+
+        events = list(islice(stream(server).events(), 3))
+        assert [event.nations for event in events] == [[f"nation_{i}"] for i in range(3)]
+        assert [event.id for event in events] == ["1", "2", "3"]
+
+
+def test_lines_split_across_reads():
+    pieces = [b"id: 1\r", b"\ndata: {\"str\":", b" \"caf\xc3", b"\xa9\"}\r\n\r", b"\n: keep-alive\n\n"]
+    assert list(_split_lines(pieces)) == ["id: 1", 'data: {"str": "café"}', "", ": keep-alive", ""]
+
+
+@pytest.mark.parametrize("payload", ["[]", '"x"', "1", "null", "{"])
+def test_from_data_rejects_non_objects(payload):
+    with pytest.raises(ValueError):
+        Happening.from_data(payload)
+
+
+def test_small_events_are_not_held_back():
+    with MockNationStates(keep_alive=60) as server:
+        received = []
+        events = stream(server).events()
+        reader = threading.Thread(target=lambda: received.append(next(events)), daemon=True)
+        reader.start()
+
+        server.publish(happening(0)) # far less than a read chunk of 512 bytes
+        reader.join(timeout=5)
+        assert received and received[0].nations == ["nation_0"]
+
+
+def test_async_resume_after_disconnect():
+    pytest.importorskip("aiohttp")
+
+    async def read(s, n):
+        events = []
+        async for event in s:
+            events.append(event)
+            if len(events) == n:
+                return events
+
+    with MockNationStates(stream_limit=2) as server:
+        for i in range(5):
+            server.publish(happening(i))
+        events = asyncio.run(asyncio.wait_for(read(stream(server), 5), timeout=10))
+        assert [event.id for event in events] == ["1", "2", "3", "4", "5"]
@@ -0,0 +1,118 @@
+from nstools import trotterdam
+from nstools.trotterdam import TrotterdamCache, PolicyChange, parse_result
+from nstools.trotterdam_index import crawl, compile_index
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from conftest import fixtures
+import threading
+import requests
+import pytest
+
+
+class _Trotterdam(BaseHTTPRequestHandler):
+    """ Serves the Trotterdam fixtures (or `pages`), or `status` for every page if it is set """
+    status = None
+    pages = None # issue id -> fixture (or the page itself), if not served under their own id
+    failures = {} # issue id -> number of requests answered with a 503
+
+    def do_GET(self):
+        issue_id = int(self.path.rsplit("/", 1)[-1].split(".")[0])
+        page = issue_id if self.pages is None else self.pages.get(issue_id)
+        if not isinstance(page, bytes):
+            page = fixtures / f"trotterdam_{page}.html"
+        if self.failures.get(issue_id, 0) > 0:
+            self.failures[issue_id] -= 1
+            body = b"<html><body>Service Unavailable</body></html>"
+            self.send_response(503)
+        elif self.status is not None or (not isinstance(page, bytes) and not page.exists()):
+            body = b"<html><body>Error</body></html>"
+            self.send_response(self.status or 404)
+        else:
+            body = page if isinstance(page, bytes) else page.read_bytes()
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def trotterdam_server(monkeypatch):
+    handler = type("Handler", (_Trotterdam,), {'failures': {}})
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(trotterdam, "base_url", f"http://127.0.0.1:{httpd.server_port}/{{issue_id}}.html")
+    yield handler
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_error_responses_are_not_stored(trotterdam_server, tmp_path):
+    cache = TrotterdamCache(path=str(tmp_path / "trotterdam.sqlite"))
+    trotterdam_server.status = 503
+    with pytest.raises(requests.HTTPError):
+        cache.get(1000)
+    assert cache.page(1000) is None
+
+    trotterdam_server.status = None
+    assert cache.get(1000).outcomes
+
+
+def test_stale_entries_are_served_when_revalidation_fails(trotterdam_server, tmp_path):
+    cache = TrotterdamCache(path=str(tmp_path / "trotterdam.sqlite"), ttl=0)
+    issue = cache.get(1000)
+
+    trotterdam_server.status = 500
+    assert cache.get(1000).outcomes.keys() == issue.outcomes.keys()
+
+    trotterdam_server.status = 429
+    assert cache.get(1000).title == issue.title
+
+
+def test_stale_entries_are_served_on_network_errors(tmp_path, monkeypatch):
+    cache = TrotterdamCache(path=str(tmp_path / "trotterdam.sqlite"), ttl=0)
+    cache.store(trotterdam.TrotterdamIssue(1000, (fixtures / "trotterdam_1000.html").read_bytes()), (fixtures / "trotterdam_1000.html").read_bytes())
+
+    # nothing listens on this port
+    monkeypatch.setattr(trotterdam, "base_url", "http://127.0.0.1:9/{issue_id}.html")
+    assert cache.get(1000).outcomes
+    with pytest.raises(requests.ConnectionError):
+        cache.get(1001)
+
+
+def test_crawl_retries_transient_errors(trotterdam_server):
+    trotterdam_server.pages = {0: 1000, 1: 1001, 2: 1002}
+    trotterdam_server.failures = {1: 2}
+
+    # a failed download must not count as a missing issue, which would end the crawl at issue 1
+    issues = crawl(workers=1, stop_after=1, backoff=0)
+    assert [issue.issue_id for issue in issues] == [0, 1, 2]
+
+
+def test_crawl_raises_persistent_errors(trotterdam_server):
+    trotterdam_server.pages = {0: 1000, 1: 1001}
+    trotterdam_server.failures = {1: 10}
+    with pytest.raises(requests.HTTPError):
+        crawl([0, 1], workers=2, backoff=0)
+
+
+def test_policy_that_is_added_or_removed():
+    outcome = parse_result("""
+        sometimes adds policy: Gun Control
+        sometimes removes policy: Gun Control
+        adds notability: Compulsory Military Service
+        removes notability: Compulsory Military Service
+    """)
+    assert outcome['policy_changes'] == {"Gun Control": PolicyChange.MAY_ADD_ORR_REMOVE}
+    assert outcome['notability_changes'] == {"Compulsory Military Service": PolicyChange.MAY_ADD_ORR_REMOVE}
+
+
+def test_compile_index_reports_skipped_pages(trotterdam_server, tmp_path):
+    unparsable = b"<html><head><title>#1: Broken</title></head><body><table><tr><th>Option</th></tr><tr><td>x</td></tr></table></body></html>"
+    trotterdam_server.pages = {0: 1000, 1: unparsable, 2: 1002}
+
+    skipped = []
+    index = compile_index(str(tmp_path / "trotterdam.idx"), [0, 1, 2], workers=2, skipped=skipped)
+    assert sorted(index.issues) == [0, 2] and skipped == [1]